@@ -7,6 +7,14 @@ from skill_trust_network.modules.metadata_collector import SkillMetadataCollecto
 from skill_trust_network.modules.trust_scoring import TrustScoring
 from skill_trust_network.modules.security_audit import SecurityAudit
 from skill_trust_network.modules.isnad_chain import IsnadChain
+from skill_trust_network.modules.hash_cache import FileHashCache
+from skill_trust_network.modules.score_cache import TrustScoreCache
+from skill_trust_network.modules.factor_matrix import FactorScoreMatrix
+from skill_trust_network.modules.scoring_factors import FactorRegistry, ScoringFactor
+from skill_trust_network.modules.usage_tracker import UsageTracker
+from skill_trust_network.modules.author_reputation import AuthorReputationGraph
+from skill_trust_network.modules.code_quality import CodeQualityAnalyzer
+from skill_trust_network.modules.skill_watcher import SkillWatcher
 from skill_trust_network.integration.moltbot_integration import MoltbotIntegration
 
 __version__ = "1.0.0"
@@ -19,19 +27,58 @@ class SkillTrustNetwork:
     整合所有模块，提供统一的接口
     """
 
-    def __init__(self, skill_directories: list = ["/opt/moltbot/skills/"]):
+    def __init__(self, skill_directories: list = ["/opt/moltbot/skills/"],
+                 hash_cache_file: str = None, max_workers: int = 1,
+                 hash_mode: str = "flat", isnad_storage: str = "json", score_cache_file: str = None,
+                 factor_matrix_file: str = None, usage_tracker: UsageTracker = None,
+                 author_graph: AuthorReputationGraph = None, code_analyzer: CodeQualityAnalyzer = None):
         """
         初始化技能信任网络
 
         Args:
             skill_directories: 技能目录列表
+            hash_cache_file: 文件哈希缓存路径，为None时不启用缓存
+            max_workers: 批量收集元数据时的线程数
+            hash_mode: 技能哈希模式，"flat"（兼容旧版本）或"merkle"
+            isnad_storage: 传承链存储后端，"json"（整文件）、"lazy"（按需加载的整文件）、
+                           "binary"（二进制快照）、"log"（追加日志）或"sqlite"
+            score_cache_file: 信任评分缓存文件路径，为None时评分只在内存中缓存
+            factor_matrix_file: 因素评分矩阵文件路径，为None时只保存在内存中
+            usage_tracker: 技能使用统计，为None时使用历史评分固定为默认值
+            author_graph: 作者声誉图，为None时只按作者名称评分；用 sync_author_reputation 从传承链更新
+            code_analyzer: 代码质量分析器，为None时只按技能哈希是否存在评分
         """
         self.skill_directories = skill_directories
-        self.metadata_collector = SkillMetadataCollector(skill_directories)
-        self.trust_scoring = TrustScoring()
+        self.moltbot_integration = MoltbotIntegration(skill_directories, hash_cache_file,
+                                                      max_workers, hash_mode, score_cache_file,
+                                                      factor_matrix_file, usage_tracker, author_graph,
+                                                      code_analyzer)
+        # 与集成模块共用同一个收集器和评分器，避免两份哈希缓存/评分缓存互相覆盖
+        self.metadata_collector = self.moltbot_integration.metadata_collector
+        self.trust_scoring = self.moltbot_integration.trust_scoring
         self.security_audit = SecurityAudit()
-        self.isnad_chain = IsnadChain()
-        self.moltbot_integration = MoltbotIntegration(skill_directories)
+        self.isnad_storage = isnad_storage
+        self._isnad_chain = None
+
+    @property
+    def isnad_chain(self) -> IsnadChain:
+        """传承链，第一次使用时才打开，只做评分和审计的调用方不必加载传承链数据"""
+        if self._isnad_chain is None:
+            self._isnad_chain = IsnadChain(storage=self.isnad_storage)
+        return self._isnad_chain
+
+    def close(self):
+        """关闭传承链（提交未完成的组提交并刷写尚未持久化的追加）和评分器使用的进程池"""
+        if self._isnad_chain is not None:
+            self._isnad_chain.close()
+            self._isnad_chain = None
+        self.moltbot_integration.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def collect_skill_metadata(self, skill_name: str):
         """
@@ -45,6 +92,66 @@ class SkillTrustNetwork:
         """
         return self.metadata_collector.collect_metadata(skill_name)
 
+    def get_hash_cache_stats(self):
+        """
+        获取文件哈希缓存的命中统计
+
+        Returns:
+            命中统计字典，未启用缓存时返回None
+        """
+        return self.metadata_collector.get_hash_cache_stats()
+
+    def get_score_cache_stats(self):
+        """
+        获取信任评分缓存的命中统计
+
+        Returns:
+            命中统计字典，未启用缓存时返回None
+        """
+        return self.trust_scoring.get_score_cache_stats()
+
+    def ingest_usage_log(self, log_file: str):
+        """
+        增量消费技能使用事件日志，更新使用历史评分
+
+        Args:
+            log_file: JSONL事件日志路径
+
+        Returns:
+            本次消费的事件数，未设置使用统计时返回None
+        """
+        usage_tracker = self.trust_scoring.usage_tracker
+        if usage_tracker is None:
+            return None
+        count = usage_tracker.ingest_file(log_file)
+        usage_tracker.save()
+        return count
+
+    def sync_author_reputation(self):
+        """
+        把传承链中的新审计记录并入作者声誉图并更新作者评分
+
+        Returns:
+            新读取的记录数量，未设置作者声誉图时返回None
+        """
+        author_graph = self.trust_scoring.author_graph
+        if author_graph is None:
+            return None
+        return author_graph.sync(self.isnad_chain)
+
+    def reweight_trust_scores(self, weights: dict, apply: bool = False):
+        """
+        用新的权重重新计算全部已评分技能的总评分，不重新评估各因素
+
+        Args:
+            weights: 新的权重 {因素名称: 权重}
+            apply: 是否把新权重设为当前权重
+
+        Returns:
+            包含技能数量、各信任级别的技能数量和级别变化明细的字典
+        """
+        return self.trust_scoring.reweight(weights, apply)
+
     def collect_all_metadata(self):
         """
         收集所有技能的元数据
@@ -54,6 +161,15 @@ class SkillTrustNetwork:
         """
         return self.metadata_collector.collect_all_skills_metadata()
 
+    def iter_skills_metadata(self):
+        """
+        流式收集所有技能的元数据
+
+        Returns:
+            技能元数据迭代器
+        """
+        return self.metadata_collector.iter_skills_metadata()
+
     def calculate_trust_score(self, skill_metadata: dict):
         """
         计算技能的信任评分
@@ -91,27 +207,56 @@ class SkillTrustNetwork:
         """
         return self.moltbot_integration.audit_skill(skill_name)
 
-    def audit_all_skills(self):
+    def audit_all_skills(self, include_details: bool = True):
         """
         审计所有技能
 
+        Args:
+            include_details: 是否在汇总报告中保留各技能的报告明细
+
         Returns:
             包含所有技能审计报告的汇总报告
         """
-        return self.moltbot_integration.audit_all_skills()
+        return self.moltbot_integration.audit_all_skills(include_details)
+
+    def iter_audit_reports(self):
+        """
+        流式审计所有技能，每完成一个技能即产出其报告
+
+        Returns:
+            安全审计报告迭代器
+        """
+        return self.moltbot_integration.iter_audit_reports()
+
+    def watch_skills(self, callback, debounce: float = 0.5, poll_interval: float = 1.0,
+                     timeout: float = None):
+        """
+        监视技能目录，只重新审计文件发生变化的技能
+
+        Args:
+            callback: 接收变更事件字典的回调函数
+            debounce: 去抖时长（秒）
+            poll_interval: 无inotify时的轮询间隔（秒）
+            timeout: 最长监视时间（秒），None表示一直监视
+
+        Returns:
+            处理的变更事件数量
+        """
+        return self.moltbot_integration.watch_skills(callback, debounce, poll_interval, timeout)
 
-    def check_skill_before_install(self, skill_name: str, skill_path: str):
+    def check_skill_before_install(self, skill_name: str, skill_path: str, full_report: bool = True):
         """
         在安装技能前进行安全检查
 
         Args:
             skill_name: 技能名称
             skill_path: 技能路径
+            full_report: 是否生成完整的审计报告，为False时只判断技能是否为高风险
 
         Returns:
             安全检查结果字典
         """
-        return self.moltbot_integration.check_skill_before_install(skill_name, skill_path)
+        return self.moltbot_integration.check_skill_before_install(skill_name, skill_path, full_report)
 
     def get_skill_trust_level(self, skill_name: str):
         """
@@ -158,7 +303,7 @@ class SkillTrustNetwork:
         """
         return self.moltbot_integration.generate_security_report_file(output_path)
 
-    def add_audit_to_chain(self, skill_hash: str, auditor: str, audit_result: dict):
+    def add_audit_to_chain(self, skill_hash: str, auditor: str, audit_result: dict, skill_metadata: dict = None):
         """
         向传承链添加审计记录
 
@@ -166,23 +311,102 @@ class SkillTrustNetwork:
             skill_hash: 技能哈希
             auditor: 审计员
             audit_result: 审计结果
+            skill_metadata: 技能元数据，用于按名称查询声誉
 
         Returns:
             添加是否成功
         """
-        return self.isnad_chain.add_audit_to_chain(skill_hash, auditor, audit_result)
+        return self.isnad_chain.add_audit_to_chain(skill_hash, auditor, audit_result, skill_metadata)
+
+    def add_audits_to_chain(self, audits):
+        """
+        批量向传承链添加审计记录
 
-    def verify_isnad_chain(self, skill_hash: str):
+        Args:
+            audits: (技能哈希, 审计员, 审计结果) 的可迭代对象
+
+        Returns:
+            添加的记录数量
+        """
+        return self.isnad_chain.add_audits_to_chain(audits)
+
+    def verify_isnad_chain(self, skill_hash: str, full: bool = False):
         """
         验证技能的传承链
 
         Args:
             skill_hash: 技能哈希
+            full: 是否忽略检查点重新校验整条链
 
         Returns:
             验证结果字典
         """
-        return self.isnad_chain.verify_isnad_chain(skill_hash)
+        return self.isnad_chain.verify_isnad_chain(skill_hash, full)
+
+    def get_skill_reputation(self, skill_name: str, skill_version: str = None):
+        """
+        获取技能基于传承链的整体声誉
+
+        Args:
+            skill_name: 技能名称
+            skill_version: 技能版本，None表示汇总所有版本
+
+        Returns:
+            声誉数据字典
+        """
+        return self.isnad_chain.get_skill_reputation(skill_name, skill_version)
+
+    def query_audits(self, auditor: str = None, since=None, until=None, offset: int = 0, limit: int = None):
+        """
+        按审计员和时间范围查询审计记录
+
+        Args:
+            auditor: 审计员，None表示所有审计员
+            since: 起始时间（含），datetime或ISO格式字符串
+            until: 截止时间（不含），datetime或ISO格式字符串
+            offset: 跳过的记录数
+            limit: 最多返回的记录数
+
+        Returns:
+            审计记录的迭代器
+        """
+        return self.isnad_chain.query_audits(auditor, since, until, offset, limit)
+
+    def stale_skills(self, older_than_days: float):
+        """
+        查询最新一次审计早于指定天数的技能
+
+        Args:
+            older_than_days: 天数
+
+        Returns:
+            技能信息的迭代器
+        """
+        return self.isnad_chain.stale_skills(older_than_days)
+
+    def export_delta(self, since_seq: int = 0):
+        """
+        增量导出本地序号大于since_seq的审计记录，用于在节点之间复制传承链
+
+        Args:
+            since_seq: 水位，上一次导出结果中的seq
+
+        Returns:
+            增量记录字典
+        """
+        return self.isnad_chain.export_delta(since_seq)
+
+    def import_delta(self, delta: dict):
+        """
+        导入其他节点导出的增量记录，按内容摘要去重
+
+        Args:
+            delta: export_delta 的返回值
+
+        Returns:
+            新增的记录数量
+        """
+        return self.isnad_chain.import_delta(delta)
 
     def create_skill_hash(self, skill_metadata: dict):
         """
@@ -203,5 +427,14 @@ __all__ = [
     "TrustScoring",
     "SecurityAudit",
     "IsnadChain",
-    "MoltbotIntegration"
+    "MoltbotIntegration",
+    "FileHashCache",
+    "TrustScoreCache",
+    "FactorScoreMatrix",
+    "FactorRegistry",
+    "ScoringFactor",
+    "UsageTracker",
+    "AuthorReputationGraph",
+    "CodeQualityAnalyzer",
+    "SkillWatcher"
 ]
\ No newline at end of file
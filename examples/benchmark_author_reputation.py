@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Author reputation benchmark: full PageRank build vs. incremental updates
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+from skill_trust_network.modules.isnad_chain import IsnadChain
+from skill_trust_network.modules.author_reputation import AuthorReputationGraph
+
+
+def add_audits(isnad, rng, skill_count, tag, authors, auditors):
+    audits = []
+    for i in range(skill_count):
+        skill = {"name": f"{tag}_{i}", "version": "1.0.0", "author": rng.choice(authors)}
+        skill_hash = isnad.create_skill_hash(skill)
+        for _ in range(rng.randint(1, 4)):
+            audits.append((skill_hash, rng.choice(auditors),
+                           {"total_score": rng.randint(0, 100), "skill_info": skill}))
+    isnad.add_audits_to_chain(audits)
+
+
+def main():
+    skill_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(0)
+    authors = [f"author_{i}" for i in range(skill_count // 20)] + ["verified"]
+    auditors = [f"auditor_{i}" for i in range(200)] + ["trusted"] + authors[:50]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        isnad = IsnadChain(os.path.join(tmp, "isnad_chains.json"), storage="sqlite")
+        add_audits(isnad, rng, skill_count, "skill", authors, auditors)
+
+        graph = AuthorReputationGraph()
+        start = time.perf_counter()
+        records = graph.sync(isnad)
+        print(f"full build from {records} records: {(time.perf_counter() - start) * 1000:8.1f} ms "
+              f"({graph.last_iterations} iterations)")
+
+        for new_skills in (10, 100, 1000):
+            add_audits(isnad, rng, new_skills, f"new_{new_skills}", authors, auditors)
+            start = time.perf_counter()
+            records = graph.sync(isnad)
+            print(f"  incremental {records:5d} records: {(time.perf_counter() - start) * 1000:8.1f} ms "
+                  f"({graph.last_iterations} iterations)")
+
+        start = time.perf_counter()
+        for author in authors:
+            graph.author_score(author)
+        elapsed = time.perf_counter() - start
+        print(f"  author_score lookup: {elapsed / len(authors) * 1e6:.2f} us per author")
+        isnad.close()
+
+
+if __name__ == "__main__":
+    main()
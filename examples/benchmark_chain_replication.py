@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Replication benchmark: delta export/import cost vs. history size
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+from skill_trust_network.modules.isnad_chain import IsnadChain
+
+
+def add_audits(isnad, chain_count, audits_per_chain, tag):
+    audits = []
+    for i in range(chain_count):
+        skill = {"name": f"skill_{i}", "version": "1.0.0", "author": "bench"}
+        skill_hash = isnad.create_skill_hash(skill)
+        for j in range(audits_per_chain):
+            audits.append((skill_hash, f"{tag}_{j % 7}", {"total_score": (i + j) % 100, "skill_info": skill}))
+    isnad.add_audits_to_chain(audits)
+
+
+def main():
+    chain_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    audits_per_chain = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    storage = sys.argv[3] if len(sys.argv) > 3 else "sqlite"
+
+    with tempfile.TemporaryDirectory() as node_a, tempfile.TemporaryDirectory() as node_b:
+        a = IsnadChain(os.path.join(node_a, "isnad_chains.json"), storage=storage)
+        b = IsnadChain(os.path.join(node_b, "isnad_chains.json"), storage=storage)
+        add_audits(a, chain_count, audits_per_chain, "auditor")
+
+        start = time.perf_counter()
+        delta = a.export_delta(0)
+        added = b.import_delta(delta)
+        print(f"{storage}: initial sync of {added} records: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        watermark = delta["seq"]
+        for new_chains in (1, 10, 100):
+            add_audits(a, new_chains, 1, f"round_{new_chains}")
+            start = time.perf_counter()
+            delta = a.export_delta(watermark)
+            added = b.import_delta(delta)
+            elapsed = time.perf_counter() - start
+            watermark = delta["seq"]
+            print(f"  delta of {added:4d} new records: {elapsed * 1000:8.2f} ms")
+
+        # 重复导入同一份增量不会新增记录
+        print(f"  re-import of last delta adds {b.import_delta(delta)} records")
+        a.close()
+        b.close()
+
+
+if __name__ == "__main__":
+    main()
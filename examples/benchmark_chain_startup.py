@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: eager JSON chain store vs. lazy store with an offset index
+and the binary snapshot store
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+from skill_trust_network.modules.isnad_chain import IsnadChain
+from skill_trust_network.modules.chain_snapshot import json_to_snapshot
+
+
+def build_history(chain_file, chain_count, audits_per_chain):
+    isnad = IsnadChain(chain_file, storage="lazy")
+    audits = []
+    for i in range(chain_count):
+        skill = {"name": f"skill_{i}", "version": "1.0.0", "author": "bench"}
+        skill_hash = isnad.create_skill_hash(skill)
+        for j in range(audits_per_chain):
+            audits.append((skill_hash, f"auditor_{j % 7}", {
+                "total_score": (i + j) % 100,
+                "skill_info": {"name": skill["name"], "version": skill["version"], "author": skill["author"]},
+                "security_assessment": {"risk_level": "低风险", "permission_risks": [], "issues_found": 0},
+                "recommendations": ["保持定期审计"]
+            }))
+    isnad.add_audits_to_chain(audits)
+    isnad.close()
+    return skill_hash
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    chain_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    audits_per_chain = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        chain_file = os.path.join(tmp_dir, "isnad_chains.json")
+        skill_hash = build_history(chain_file, chain_count, audits_per_chain)
+        snapshot_file = os.path.splitext(chain_file)[0] + ".isnb"
+        json_to_snapshot(chain_file, snapshot_file)
+        size = os.path.getsize(chain_file)
+        snapshot_size = os.path.getsize(snapshot_file)
+        print(f"{chain_count} chains x {audits_per_chain} audits, "
+              f"json {size / (1024 * 1024):.1f} MiB, snapshot {snapshot_size / (1024 * 1024):.1f} MiB")
+
+        # 删除索引，模拟第一次以lazy模式打开旧数据文件
+        os.remove(os.path.splitext(chain_file)[0] + ".index.json")
+
+        for label, storage in (("eager json          ", "json"),
+                               ("lazy (build index)  ", "lazy"),
+                               ("lazy (index cached) ", "lazy"),
+                               ("binary snapshot     ", "binary")):
+            elapsed, isnad = timed(lambda: IsnadChain(chain_file, storage=storage))
+            first, _ = timed(lambda: isnad.verify_isnad_chain(skill_hash))
+            print(f"  {label}: startup {elapsed * 1000:8.1f} ms, first verify {first * 1000:6.2f} ms")
+            isnad.close()
+
+
+if __name__ == "__main__":
+    main()
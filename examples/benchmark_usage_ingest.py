@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Usage event ingestion benchmark: JSONL throughput and per-skill memory
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+from skill_trust_network.modules.usage_tracker import UsageTracker
+
+
+def write_events(path, count, skill_count, seed=0):
+    rng = random.Random(seed)
+    now = time.time()
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(count):
+            f.write(json.dumps({
+                "skill": f"skill_{rng.randrange(skill_count)}",
+                "event": "failure" if rng.random() < 0.05 else "invocation",
+                "ts": now - rng.random() * 86400 * 30
+            }) + "\n")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    skill_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "usage.jsonl")
+        write_events(log_file, count, skill_count)
+        tracker = UsageTracker()
+
+        start = time.perf_counter()
+        ingested = tracker.ingest_file(log_file)
+        elapsed = time.perf_counter() - start
+        print(f"{ingested} events for {len(tracker)} skills: {elapsed * 1000:.1f} ms "
+              f"({ingested / elapsed:,.0f} events/s)")
+
+        # 追加的事件只读取新增部分
+        write_events(log_file + ".more", count // 10, skill_count, seed=1)
+        with open(log_file, "a", encoding="utf-8") as f, open(log_file + ".more", encoding="utf-8") as more:
+            f.write(more.read())
+        start = time.perf_counter()
+        ingested = tracker.ingest_file(log_file)
+        elapsed = time.perf_counter() - start
+        print(f"  incremental {ingested} events: {elapsed * 1000:.1f} ms")
+
+        names = [f"skill_{i}" for i in range(skill_count)]
+        start = time.perf_counter()
+        for name in names:
+            tracker.usage_score(name)
+        elapsed = time.perf_counter() - start
+        print(f"  usage_score lookup: {elapsed / len(names) * 1e6:.2f} us per skill")
+        stats = tracker.get_stats()
+        print(f"  counter arrays: {stats['array_bytes'] / stats['skills']:.0f} bytes per skill")
+
+
+if __name__ == "__main__":
+    main()
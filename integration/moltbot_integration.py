@@ -1,10 +1,22 @@
 import os
 import json
-from typing import Dict, List, Optional
+import logging
+import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
 
 from skill_trust_network.modules.metadata_collector import SkillMetadataCollector
 from skill_trust_network.modules.trust_scoring import TrustScoring
 from skill_trust_network.modules.security_audit import SecurityAudit
+from skill_trust_network.modules.skill_watcher import SkillWatcher
+from skill_trust_network.modules.usage_tracker import UsageTracker
+from skill_trust_network.modules.author_reputation import AuthorReputationGraph
+from skill_trust_network.modules.code_quality import CodeQualityAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# 低于该总评分的技能为高风险，不允许安装，与 SecurityAudit 的风险划分一致
+INSTALL_MIN_SCORE = 40
 
 class MoltbotIntegration:
     """
@@ -12,16 +24,35 @@ class MoltbotIntegration:
     负责技能信任网络与Moltbot系统的集成
     """
 
-    def __init__(self, skill_directories: List[str] = ["/opt/moltbot/skills/"]):
+    # 流式审计时每批收集的技能数
+    AUDIT_BATCH_SIZE = 256
+
+    def __init__(self, skill_directories: List[str] = ["/opt/moltbot/skills/"],
+                 hash_cache_file: Optional[str] = None, max_workers: int = 1,
+                 hash_mode: str = "flat", score_cache_file: Optional[str] = None,
+                 factor_matrix_file: Optional[str] = None, usage_tracker: Optional[UsageTracker] = None,
+                 author_graph: Optional[AuthorReputationGraph] = None,
+                 code_analyzer: Optional[CodeQualityAnalyzer] = None):
         """
         初始化Moltbot集成模块
 
         Args:
             skill_directories: Moltbot技能目录列表
+            hash_cache_file: 文件哈希缓存路径，为None时不启用缓存
+            max_workers: 批量收集元数据时的线程数
+            hash_mode: 技能哈希模式，"flat"或"merkle"
+            score_cache_file: 信任评分缓存文件路径，为None时评分只在内存中缓存
+            factor_matrix_file: 因素评分矩阵文件路径，为None时只保存在内存中
+            usage_tracker: 技能使用统计，为None时使用历史评分固定为默认值
+            author_graph: 作者声誉图，为None时只按作者名称评分
+            code_analyzer: 代码质量分析器，为None时只按技能哈希是否存在评分
         """
         self.skill_directories = skill_directories
-        self.metadata_collector = SkillMetadataCollector(skill_directories)
-        self.trust_scoring = TrustScoring()
+        self.metadata_collector = SkillMetadataCollector(skill_directories, hash_cache_file,
+                                                         max_workers, hash_mode)
+        self.trust_scoring = TrustScoring(cache_file=score_cache_file, factor_file=factor_matrix_file,
+                                          usage_tracker=usage_tracker, author_graph=author_graph,
+                                          code_analyzer=code_analyzer)
         self.security_audit = SecurityAudit()
 
     def audit_skill(self, skill_name: str) -> Optional[Dict]:
@@ -41,60 +72,124 @@ class MoltbotIntegration:
 
         # 计算信任评分
         trust_scores = self.trust_scoring.calculate_trust_score(metadata)
+        self.trust_scoring.save()
 
         # 生成安全审计报告
         report = self.security_audit.generate_audit_report(metadata, trust_scores)
 
         return report
 
-    def audit_all_skills(self) -> Dict:
+    def iter_audit_reports(self) -> Iterator[Dict]:
+        """
+        流式审计Moltbot系统中的所有技能，每完成一个技能即产出其报告
+
+        Returns:
+            安全审计报告迭代器
+        """
+        skills = self.metadata_collector.iter_skills_metadata()
+        while True:
+            # 按批收集元数据，使一批技能的源文件分析可以在进程池中并行
+            batch = list(islice(skills, self.AUDIT_BATCH_SIZE))
+            if not batch:
+                break
+            self.trust_scoring.prepare(batch)
+            for metadata in batch:
+                trust_scores = self.trust_scoring.calculate_trust_score(metadata)
+                yield self.security_audit.generate_audit_report(metadata, trust_scores)
+        # 命中评分缓存的技能不会用到预先分析的结果，批次结束后丢弃
+        self.trust_scoring.prepare([])
+        self.trust_scoring.save()
+
+    def close(self):
+        """关闭评分器使用的进程池"""
+        self.trust_scoring.close()
+
+    def audit_all_skills(self, include_details: bool = True) -> Dict:
         """
         审计Moltbot系统中的所有技能
 
+        Args:
+            include_details: 是否在汇总报告中保留各技能的报告明细
+
         Returns:
             包含所有技能审计报告的汇总报告
         """
-        # 收集所有技能的元数据
-        all_metadata = self.metadata_collector.collect_all_skills_metadata()
+        return self.security_audit.generate_summary_report(self.iter_audit_reports(), include_details)
 
-        # 计算所有技能的信任评分并生成审计报告
-        skills_data = []
-        reports = []
+    def iter_skill_changes(self, debounce: float = 0.5, poll_interval: float = 1.0,
+                           timeout: Optional[float] = None,
+                           watcher: Optional[SkillWatcher] = None) -> Iterator[Dict]:
+        """
+        监视技能目录，只对文件发生变化的技能重新审计
 
-        for metadata in all_metadata:
-            trust_scores = self.trust_scoring.calculate_trust_score(metadata)
-            skills_data.append({
-                "metadata": metadata,
-                "trust_scores": trust_scores
-            })
-            report = self.security_audit.generate_audit_report(metadata, trust_scores)
-            reports.append(report)
+        Args:
+            debounce: 去抖时长（秒）
+            poll_interval: 无inotify时的轮询间隔（秒）
+            timeout: 最长监视时间（秒），None表示直到监视器被停止
+            watcher: 自定义的技能监视器，默认按技能目录新建
 
-        # 生成汇总报告
-        summary_report = self.security_audit.generate_summary_report(reports)
+        Returns:
+            迭代器，每个变化技能产出一个变更事件字典
+        """
+        if watcher is None:
+            watcher = SkillWatcher(self.skill_directories,
+                                   self.metadata_collector.HASHED_EXTENSIONS,
+                                   debounce, poll_interval)
+        try:
+            for skill_names in watcher.watch(timeout):
+                for skill_name in skill_names:
+                    # 重新收集元数据、评分并生成报告
+                    report = self.audit_skill(skill_name)
+                    yield {
+                        "skill_name": skill_name,
+                        "event": "updated" if report else "removed",
+                        "timestamp": datetime.datetime.now().isoformat(),
+                        "report": report
+                    }
+        finally:
+            watcher.close()
+
+    def watch_skills(self, callback: Callable[[Dict], None], debounce: float = 0.5,
+                     poll_interval: float = 1.0, timeout: Optional[float] = None,
+                     watcher: Optional[SkillWatcher] = None) -> int:
+        """
+        以回调方式监视技能目录，每个变更事件调用一次回调
 
-        return summary_report
+        Args:
+            callback: 接收变更事件字典的回调函数
+            debounce: 去抖时长（秒）
+            poll_interval: 无inotify时的轮询间隔（秒）
+            timeout: 最长监视时间（秒），None表示直到监视器被停止
+            watcher: 自定义的技能监视器，默认按技能目录新建
 
-    def check_skill_before_install(self, skill_name: str, skill_path: str) -> Dict:
+        Returns:
+            处理的变更事件数量
+        """
+        count = 0
+        for event in self.iter_skill_changes(debounce, poll_interval, timeout, watcher):
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Error in skill watch callback")
+            count += 1
+        return count
+
+    def check_skill_before_install(self, skill_name: str, skill_path: str, full_report: bool = True) -> Dict:
         """
         在安装技能前进行安全检查
 
         Args:
             skill_name: 技能名称
             skill_path: 技能路径
+            full_report: 是否生成完整的审计报告；为False时只判断技能是否为高风险，
+                         能确定结果时跳过其余评分因素，返回结果中report为None，
+                         trust_score只在全部因素都计算过时给出
 
         Returns:
             安全检查结果字典
         """
-        # 临时添加技能路径到收集器
-        original_directories = self.metadata_collector.skill_directories
-        self.metadata_collector.skill_directories = [os.path.dirname(skill_path)]
-
-        # 收集技能元数据
-        metadata = self.metadata_collector.collect_metadata(os.path.basename(skill_path))
-
-        # 恢复原始目录
-        self.metadata_collector.skill_directories = original_directories
+        # 直接从待安装路径收集技能元数据，不影响技能目录索引
+        metadata = self.metadata_collector.collect_metadata_from_path(skill_path)
 
         if not metadata:
             return {
@@ -103,8 +198,20 @@ class MoltbotIntegration:
                 "can_install": False
             }
 
+        if not full_report:
+            gate = self.trust_scoring.gate_trust_score(metadata, INSTALL_MIN_SCORE)
+            return {
+                "status": "success",
+                "skill_name": skill_name,
+                "trust_score": gate["total_score"],
+                "risk_level": "高风险" if gate["below_threshold"] else None,
+                "can_install": not gate["below_threshold"],
+                "report": None
+            }
+
         # 计算信任评分
         trust_scores = self.trust_scoring.calculate_trust_score(metadata)
+        self.trust_scoring.save()
 
         # 生成安全审计报告
         report = self.security_audit.generate_audit_report(metadata, trust_scores)
@@ -138,6 +245,7 @@ class MoltbotIntegration:
 
         # 计算信任评分
         trust_scores = self.trust_scoring.calculate_trust_score(metadata)
+        self.trust_scoring.save()
 
         # 获取信任级别
         total_score = trust_scores.get("total_score", 0)
@@ -181,16 +289,14 @@ class MoltbotIntegration:
             skill_name: 技能名称
             security_status: 安全状态字典
         """
-        for skill_dir in self.skill_directories:
-            skill_path = os.path.join(skill_dir, skill_name)
-            if os.path.exists(skill_path):
-                status_file = os.path.join(skill_path, "security_status.json")
-                try:
-                    with open(status_file, 'w', encoding='utf-8') as f:
-                        json.dump(security_status, f, indent=2, ensure_ascii=False)
-                except Exception as e:
-                    print(f"Error saving security status: {e}")
-                break
+        skill_path = self.metadata_collector.find_skill_path(skill_name)
+        if skill_path is not None:
+            status_file = os.path.join(skill_path, "security_status.json")
+            try:
+                with open(status_file, 'w', encoding='utf-8') as f:
+                    json.dump(security_status, f, indent=2, ensure_ascii=False)
+            except Exception as e:
+                print(f"Error saving security status: {e}")
 
     def get_security_dashboard_data(self) -> Dict:
         """
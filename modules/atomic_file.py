@@ -0,0 +1,61 @@
+"""
+原子文件写入
+先写入目标目录中的临时文件再rename覆盖目标文件，读者不会看到写了一半的内容；
+传承链存储和各个缓存文件的持久化共用
+"""
+
+import os
+import logging
+import tempfile
+from typing import Callable, IO
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write(path: str, write: Callable[[IO], None], fsync: bool = True, binary: bool = False):
+    """
+    写入临时文件后rename覆盖目标文件，失败时删除临时文件并抛出异常
+
+    Args:
+        path: 目标文件路径，所在目录不存在时自动创建
+        write: 接收已打开的临时文件并写入内容的函数
+        fsync: rename之前是否fsync临时文件
+        binary: 是否以二进制模式打开临时文件
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", dir=directory)
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            write(f)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_atomically(path: str, write: Callable[[IO], None], description: str, binary: bool = False) -> bool:
+    """
+    原子地保存缓存类文件，写入失败时记录日志而不抛出异常
+
+    缓存丢失只影响性能，不做fsync；保存失败时调用方应恢复未保存标记，下次保存时重试
+
+    Args:
+        path: 目标文件路径
+        write: 接收已打开的临时文件并写入内容的函数
+        description: 日志中使用的文件描述，如 "hash cache"
+        binary: 是否以二进制模式写入
+
+    Returns:
+        保存是否成功
+    """
+    try:
+        atomic_write(path, write, fsync=False, binary=binary)
+        return True
+    except OSError as e:
+        logger.error("Error saving %s %s: %s", description, path, e)
+        return False
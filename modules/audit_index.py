@@ -0,0 +1,115 @@
+"""
+Isnad Chain 审计记录的二级索引
+按审计员和按时间排序的有序列表，配合bisect支持范围查询；
+按最新审计时间排序的传承链列表，用于查找长期未审计的技能；
+以及按本地序号排序的记录列表，用于增量导出
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class AuditIndex:
+    """审计记录的有序二级索引，条目为 (时间戳, 技能哈希, 记录位置)"""
+
+    def __init__(self):
+        # {审计员: [(时间戳, 技能哈希, 位置)]}，按时间戳排序
+        self.by_auditor = {}
+        # 全部审计记录，按时间戳排序
+        self.by_time = []
+        # [(最新审计时间, 技能哈希)]，按时间排序
+        self.by_latest = []
+        self._latest = {}
+        # [(本地序号, 技能哈希, 位置)]，按序号排序
+        self.by_seq = []
+
+    def add_record(self, skill_hash: str, position: int, record: Dict):
+        """
+        索引一条审计记录
+
+        Args:
+            skill_hash: 技能哈希
+            position: 记录在传承链中的位置
+            record: 审计记录
+        """
+        entry = (record.get("timestamp") or "", skill_hash, position)
+        _insert(self.by_time, entry)
+        _insert(self.by_auditor.setdefault(record.get("auditor"), []), entry)
+        if record.get("seq") is not None:
+            _insert(self.by_seq, (record["seq"], skill_hash, position))
+
+    def set_latest(self, skill_hash: str, timestamp: Optional[str]):
+        """
+        更新传承链的最新审计时间
+
+        Args:
+            skill_hash: 技能哈希
+            timestamp: 最新审计时间，None表示没有审计记录
+        """
+        old = self._latest.get(skill_hash)
+        if old is not None:
+            i = bisect_left(self.by_latest, (old, skill_hash))
+            if i < len(self.by_latest) and self.by_latest[i] == (old, skill_hash):
+                del self.by_latest[i]
+        if timestamp is None:
+            self._latest.pop(skill_hash, None)
+            return
+        self._latest[skill_hash] = timestamp
+        _insert(self.by_latest, (timestamp, skill_hash))
+
+    def query(self, auditor: Optional[str] = None, since: Optional[str] = None,
+              until: Optional[str] = None) -> Iterator[Tuple[str, int]]:
+        """
+        按时间顺序产出满足条件的审计记录
+
+        Args:
+            auditor: 审计员，None表示所有审计员
+            since: 起始时间（含），None表示不限
+            until: 截止时间（不含），None表示不限
+
+        Returns:
+            (技能哈希, 记录位置) 的迭代器
+        """
+        entries = self.by_time if auditor is None else self.by_auditor.get(auditor, [])
+        start = bisect_left(entries, (since,)) if since is not None else 0
+        end = bisect_left(entries, (until,)) if until is not None else len(entries)
+        for i in range(start, end):
+            _, skill_hash, position = entries[i]
+            yield skill_hash, position
+
+    def since(self, seq: int) -> Iterator[Tuple[str, int]]:
+        """
+        按本地序号顺序产出序号大于seq的审计记录
+
+        Args:
+            seq: 水位
+
+        Returns:
+            (技能哈希, 记录位置) 的迭代器
+        """
+        start = bisect_left(self.by_seq, (seq + 1,))
+        for i in range(start, len(self.by_seq)):
+            _, skill_hash, position = self.by_seq[i]
+            yield skill_hash, position
+
+    def stale(self, before: str) -> Iterator[str]:
+        """
+        按最新审计时间从早到晚产出最新审计早于before的传承链
+
+        Args:
+            before: 截止时间
+
+        Returns:
+            技能哈希的迭代器
+        """
+        end = bisect_left(self.by_latest, (before,))
+        for i in range(end):
+            yield self.by_latest[i][1]
+
+
+def _insert(entries: List, entry):
+    # 审计记录基本按时间顺序追加，直接放到末尾即可
+    if not entries or entries[-1] <= entry:
+        entries.append(entry)
+    else:
+        insort(entries, entry)
@@ -0,0 +1,311 @@
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# 作者声誉评分的范围，与 TrustScoring 内置规则的范围相同
+MIN_AUTHOR_SCORE = 50
+MAX_AUTHOR_SCORE = 90
+# 有背书的作者的最低评分，与 TrustScoring 按名称给普通作者的评分相同，获得背书不会降低作者评分
+ENDORSED_MIN_SCORE = 70
+
+class AuthorReputationGraph:
+    """
+    作者声誉图模块
+    由传承链审计记录构造 审计员 → 技能 → 作者 的有向图，审计员和作者是同一类节点（主体），
+    作者同时审计其他技能时声誉继续传递，作者审计自己的技能不算作背书；用带预信任主体的
+    PageRank迭代计算主体的声誉，再按声誉值生成作者评分查找表，评分时只需一次字典查询
+
+    新的审计记录到达时只追加边，重新迭代从上一次的结果出发，通常几次迭代即可收敛
+    """
+
+    def __init__(self, damping: float = 0.85, seed_principals: Iterable[str] = ("verified", "trusted"),
+                 tolerance: float = 1e-10, max_iterations: int = 100):
+        """
+        初始化作者声誉图
+
+        Args:
+            damping: 阻尼系数，沿边传递的声誉比例，其余回到预信任主体
+            seed_principals: 预信任的主体，图中没有这些主体时均匀回到全部审计员
+            tolerance: 两次迭代之间声誉变化（L1范数）小于该值时停止
+            max_iterations: 每次更新的最大迭代次数
+        """
+        self.damping = damping
+        self.seed_principals = tuple(seed_principals)
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        # 已读取的传承链记录序号水位
+        self.last_seq = 0
+        # 最近一次更新的迭代次数
+        self.last_iterations = 0
+        # {主体名称: 节点编号} 与 {技能哈希: 节点编号}，两类节点共用编号空间
+        self._principals = {}
+        self._skills = {}
+        self._auditors = set()
+        # 已记录的 (技能节点, 作者节点)，每对只连一条边
+        self._authored = set()
+        # 合并后的边，按键 (起点 << 32 | 终点) 排序，即CSR的顺序
+        self._edge_keys = np.zeros(0, dtype=np.int64)
+        self._edge_weights = np.zeros(0, dtype=np.float64)
+        # 上次更新之后新增的边（COO），更新时并入已合并的边
+        self._src = []
+        self._dst = []
+        self._weight = []
+        self._rank = np.zeros(0, dtype=np.float64)
+        self._dirty = False
+        # {作者: 评分}
+        self._scores = {}
+        self._lock = threading.Lock()
+
+    def _node(self, table: Dict, key: str) -> int:
+        """获取节点编号，新节点追加在末尾，调用方需持有锁"""
+        node = table.get(key)
+        if node is None:
+            node = table[key] = len(self._principals) + len(self._skills)
+        return node
+
+    def add_records(self, records: Iterable[Tuple[str, Dict]]) -> int:
+        """
+        把审计记录加入声誉图
+
+        审计员到技能的边权为审计评分/100，评分不为正的审计不构成背书；
+        技能到作者的边来自审计报告skill_info中的author
+
+        Args:
+            records: (技能哈希, 审计记录) 的可迭代对象
+
+        Returns:
+            加入的记录数量
+        """
+        count = 0
+        with self._lock:
+            for skill_hash, record in records:
+                count += 1
+                auditor = record.get("auditor")
+                result = record.get("result")
+                skill_info = result.get("skill_info") if isinstance(result, dict) else None
+                author = skill_info.get("author") if isinstance(skill_info, dict) else None
+                try:
+                    weight = float(record.get("trust_score") or 0) / 100.0
+                except (TypeError, ValueError):
+                    weight = 0.0
+
+                skill = self._node(self._skills, skill_hash)
+                if isinstance(author, str) and author and author != "unknown":
+                    author_node = self._node(self._principals, author)
+                    if (skill, author_node) not in self._authored:
+                        self._authored.add((skill, author_node))
+                        self._add_edge(skill, author_node, 1.0)
+                if isinstance(auditor, str) and auditor and weight > 0:
+                    auditor_node = self._node(self._principals, auditor)
+                    self._auditors.add(auditor_node)
+                    self._add_edge(auditor_node, skill, weight)
+            if count:
+                self._dirty = True
+        return count
+
+    def _add_edge(self, src: int, dst: int, weight: float):
+        self._src.append(src)
+        self._dst.append(dst)
+        self._weight.append(weight)
+
+    def sync(self, isnad_chain) -> int:
+        """
+        读取传承链中水位之后的新记录并更新声誉
+
+        Args:
+            isnad_chain: IsnadChain实例
+
+        Returns:
+            新读取的记录数量
+        """
+        records = []
+        seq = self.last_seq
+        for skill_hash, record in isnad_chain.store.records_since(self.last_seq):
+            records.append((skill_hash, record))
+            seq = max(seq, record.get("seq", 0))
+        self.add_records(records)
+        self.last_seq = seq
+        self.update()
+        return len(records)
+
+    def update(self) -> int:
+        """
+        有新记录时重新计算声誉和作者评分查找表
+
+        Returns:
+            本次迭代次数，没有新记录时为0
+        """
+        with self._lock:
+            if not self._dirty:
+                return 0
+            count = len(self._principals) + len(self._skills)
+            is_skill = np.zeros(count, dtype=bool)
+            is_skill[np.fromiter(self._skills.values(), dtype=np.int64, count=len(self._skills))] = True
+            indptr, indices, data = self._csr(count, is_skill)
+            teleport = self._teleport(count)
+            rank = np.zeros(count, dtype=np.float64)
+            rank[:len(self._rank)] = self._rank
+            # 新节点从回到预信任主体的份额开始，已有节点沿用上一次的结果
+            rank[len(self._rank):] = teleport[len(self._rank):]
+            total = rank.sum()
+            rank = rank / total if total > 0 else teleport
+
+            iterations = 0
+            out_degree = np.diff(indptr)
+            dangling = out_degree == 0
+            sources = np.repeat(np.arange(count), out_degree)
+            for iterations in range(1, self.max_iterations + 1):
+                spread = np.bincount(indices, weights=data * rank[sources], minlength=count)
+                # 没有出边的节点的声誉回到预信任主体
+                leaked = rank[dangling].sum()
+                new_rank = self.damping * (spread + leaked * teleport) + (1 - self.damping) * teleport
+                delta = np.abs(new_rank - rank).sum()
+                rank = new_rank
+                if delta < self.tolerance:
+                    break
+
+            # 有背书的作者：其技能被其他主体以正的评分审计过
+            audited = np.zeros(count, dtype=bool)
+            audited[indices[~is_skill[sources]]] = True
+            endorsed = np.zeros(count, dtype=bool)
+            endorsed[indices[is_skill[sources] & audited[sources]]] = True
+
+            self._rank = rank
+            self._scores = self._score_table(rank, endorsed)
+            self.last_iterations = iterations
+            self._dirty = False
+            return iterations
+
+    def _csr(self, count: int, is_skill: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        把新增的边并入已合并的边，生成按出边权重归一化的CSR邻接矩阵，调用方需持有锁
+
+        只对新增的边排序，再按位置插入已排好序的边，开销与边数成线性关系；
+        审计员审计自己作为作者的技能的边（存在反向的 技能 → 作者 边）不进入矩阵
+        """
+        if self._src:
+            keys = (np.array(self._src, dtype=np.int64) << 32) | np.array(self._dst, dtype=np.int64)
+            new_keys, inverse = np.unique(keys, return_inverse=True)
+            new_weights = np.bincount(inverse.reshape(-1), weights=np.array(self._weight, dtype=np.float64),
+                                      minlength=len(new_keys))
+            positions = np.searchsorted(self._edge_keys, new_keys)
+            exists = positions < len(self._edge_keys)
+            exists[exists] = self._edge_keys[positions[exists]] == new_keys[exists]
+            # 重复的边（同一审计员多次审计同一技能）累加权重
+            self._edge_weights[positions[exists]] += new_weights[exists]
+            self._edge_keys = np.insert(self._edge_keys, positions[~exists], new_keys[~exists])
+            self._edge_weights = np.insert(self._edge_weights, positions[~exists], new_weights[~exists])
+            self._src = []
+            self._dst = []
+            self._weight = []
+
+        src = self._edge_keys >> 32
+        dst = self._edge_keys & 0xFFFFFFFF
+        merged = self._edge_weights
+        if len(self._edge_keys):
+            reverse = (dst << 32) | src
+            positions = np.minimum(np.searchsorted(self._edge_keys, reverse), len(self._edge_keys) - 1)
+            keep = is_skill[src] | (self._edge_keys[positions] != reverse)
+            src, dst, merged = src[keep], dst[keep], merged[keep]
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=count), out=indptr[1:])
+        out_weight = np.bincount(src, weights=merged, minlength=count)
+        data = merged / out_weight[src]
+        return indptr, dst, data
+
+    def _teleport(self, count: int) -> np.ndarray:
+        """回到预信任主体的概率分布，调用方需持有锁"""
+        teleport = np.zeros(count, dtype=np.float64)
+        seeds = [self._principals[name] for name in self.seed_principals if name in self._principals]
+        if not seeds:
+            seeds = sorted(self._auditors)
+        if not seeds:
+            seeds = list(self._principals.values())
+        if seeds:
+            teleport[seeds] = 1.0 / len(seeds)
+        elif count:
+            teleport[:] = 1.0 / count
+        return teleport
+
+    def _score_table(self, rank: np.ndarray, endorsed: np.ndarray) -> Dict[str, int]:
+        """
+        按声誉值生成作者评分：有背书的作者按其声誉占作者中最高声誉的比例映射到
+        ENDORSED_MIN_SCORE-MAX_AUTHOR_SCORE，声誉相同的作者评分相同；没有背书的作者为最低分，
+        预信任主体固定为最高分
+        """
+        authors = {author for _, author in self._authored}
+        names = {node: name for name, node in self._principals.items()}
+        scores = {}
+        nodes = np.array(sorted(authors), dtype=np.int64)
+        if len(nodes):
+            author_rank = rank[nodes]
+            author_endorsed = endorsed[nodes]
+            values = np.full(len(nodes), float(MIN_AUTHOR_SCORE))
+            top = author_rank[author_endorsed].max() if author_endorsed.any() else 0.0
+            if top > 0:
+                share = author_rank[author_endorsed] / top
+                values[author_endorsed] = ENDORSED_MIN_SCORE + (MAX_AUTHOR_SCORE - ENDORSED_MIN_SCORE) * share
+            values = np.rint(values)
+            for node, value in zip(nodes.tolist(), values.astype(np.int64).tolist()):
+                scores[names[node]] = value
+        for name in self.seed_principals:
+            scores[name] = MAX_AUTHOR_SCORE
+        return scores
+
+    def author_score(self, author: Optional[str]) -> Optional[int]:
+        """
+        查询作者评分
+
+        Args:
+            author: 作者
+
+        Returns:
+            评分 (50-90)，作者不在声誉图中时返回None
+        """
+        return self._scores.get(author)
+
+    def author_scores(self, authors: Iterable[Optional[str]]) -> np.ndarray:
+        """
+        批量查询作者评分
+
+        Args:
+            authors: 作者
+
+        Returns:
+            评分数组 (int64)，作者不在声誉图中时为-1
+        """
+        get = self._scores.get
+        return np.array([get(author, -1) for author in authors], dtype=np.int64)
+
+    def get_reputation(self, principal: str) -> float:
+        """
+        获取主体（审计员或作者）的原始声誉值
+
+        Args:
+            principal: 主体名称
+
+        Returns:
+            声誉值，全部节点之和为1；不在图中时为0
+        """
+        node = self._principals.get(principal)
+        if node is None or node >= len(self._rank):
+            return 0.0
+        return self._rank[node].item()
+
+    def get_stats(self) -> Dict:
+        """
+        获取声誉图的概况
+
+        Returns:
+            包含主体数、技能数、边数、作者评分数、记录水位和最近一次迭代次数的字典
+        """
+        with self._lock:
+            return {
+                "principals": len(self._principals),
+                "skills": len(self._skills),
+                "edges": len(self._edge_keys) + len(self._src),
+                "scored_authors": len(self._scores),
+                "last_seq": self.last_seq,
+                "last_iterations": self.last_iterations
+            }
@@ -0,0 +1,445 @@
+"""
+Isnad Chain 二进制快照格式
+
+文件结构（整数均为小端序）：
+    文件头    magic "ISNB" | 版本 u16 | 保留 u16 | 传承链数量 u32 | 审计员数量 u32
+    审计员表  每项为 长度 u16 + UTF-8字符串，记录中以序号引用
+    传承链    头部长度 u32 + 头部JSON（不含audit_chain）| 记录数量 u32 | 记录区长度 u64 | 记录...
+    记录      长度 u32 + 记录内容，读取者可以按长度跳过而不解码
+
+记录内容以一个标志字节开头，依次是可选的审计员序号 u32、时间戳（微秒）i64、
+信任评分（类型标记 + i64/f64）、前驱摘要和摘要（各32字节）、内容摘要（32字节）、本地序号 u64、
+审计结果JSON，最后是其余字段的JSON。无法紧凑编码的值原样放入其余字段，因此与JSON格式可以无损互转
+"""
+
+import os
+import json
+import struct
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+from skill_trust_network.modules.atomic_file import atomic_write
+from skill_trust_network.modules.chain_store import (
+    JSONChainStore, _file_signature
+)
+
+try:
+    # 安装了orjson时使用更快的JSON解码器
+    import orjson
+
+    def _json_loads(data):
+        # orjson不接受NaN/Infinity，这类文档交给json模块解析
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+except ImportError:
+    _json_loads = json.loads
+
+SNAPSHOT_MAGIC = b"ISNB"
+SNAPSHOT_VERSION = 2
+
+_FILE_HEADER = struct.Struct("<4sHHII")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_RECORD_HEAD = struct.Struct("<IB")
+# {格式版本: 审计者名称的长度前缀}，版本1的两字节前缀容不下64 KiB以上的名称
+_AUDITOR_LENGTH = {1: _U16, 2: _U32}
+
+# 记录标志位
+_HAS_AUDITOR = 0x01
+_HAS_TIMESTAMP = 0x02
+_HAS_INT_SCORE = 0x04
+_HAS_FLOAT_SCORE = 0x08
+_HAS_DIGESTS = 0x10
+_HAS_RESULT = 0x20
+_HAS_SEQ = 0x40
+_HAS_CONTENT_DIGEST = 0x80
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_INT64_RANGE = (-(1 << 63), (1 << 63) - 1)
+_COMPACT_FIELDS = ("auditor", "timestamp", "trust_score", "prev_digest", "content_digest", "digest", "seq",
+                   "result")
+
+
+def write_snapshot(chains: Dict, snapshot_path: str, fsync: bool = True):
+    """
+    把传承链写成二进制快照（临时文件 + rename）
+
+    Args:
+        chains: {skill_hash: chain} 字典
+        snapshot_path: 快照文件路径
+        fsync: 是否在rename前fsync
+    """
+    auditors = {}
+    body = bytearray()
+    for chain in chains.values():
+        _encode_chain(chain, auditors, body)
+
+    head = bytearray(_FILE_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(chains), len(auditors)))
+    for auditor in auditors:
+        encoded = auditor.encode("utf-8")
+        head += _U32.pack(len(encoded))
+        head += encoded
+
+    def write(f):
+        f.write(head)
+        f.write(body)
+
+    atomic_write(snapshot_path, write, fsync, binary=True)
+
+
+def read_snapshot(snapshot_path: str) -> Dict:
+    """
+    读取二进制快照
+
+    Args:
+        snapshot_path: 快照文件路径
+
+    Returns:
+        {skill_hash: chain} 字典
+    """
+    with open(snapshot_path, 'rb') as f:
+        data = f.read()
+    return _decode_chains(data)
+
+
+def iter_snapshot_headers(snapshot_path: str) -> Iterator[Dict]:
+    """
+    只读取每条传承链的聚合信息，审计记录按长度整体跳过
+
+    Args:
+        snapshot_path: 快照文件路径
+
+    Returns:
+        不含audit_chain的传承链字典迭代器
+    """
+    with open(snapshot_path, 'rb') as f:
+        data = f.read()
+    for _, header in _iter_chains(data, with_records=False):
+        yield header
+
+
+def json_to_snapshot(json_path: str, snapshot_path: str):
+    """
+    把原有JSON格式的传承链文件转换为二进制快照
+
+    Args:
+        json_path: JSON文件路径
+        snapshot_path: 快照文件路径
+    """
+    with open(json_path, 'rb') as f:
+        chains = _json_loads(f.read())
+    write_snapshot(chains, snapshot_path)
+
+
+def snapshot_to_json(snapshot_path: str, json_path: str):
+    """
+    把二进制快照转换回原有的JSON格式
+
+    Args:
+        snapshot_path: 快照文件路径
+        json_path: JSON文件路径
+    """
+    chains = read_snapshot(snapshot_path)
+    atomic_write(json_path, lambda f: json.dump(chains, f, indent=2, ensure_ascii=False))
+
+
+class BinaryChainStore(JSONChainStore):
+    """
+    二进制快照存储
+    持久化方式与JSONChainStore相同（整文件重写、咨询锁、与其他进程的写入合并），
+    只是数据文件使用二进制快照格式
+    """
+
+    def __init__(self, snapshot_file: str, legacy_json_file: str = None, flush_interval: float = None):
+        """
+        初始化二进制快照存储
+
+        Args:
+            snapshot_file: 快照文件路径
+            legacy_json_file: 原JSON文件路径，快照不存在且该文件存在时从中导入
+            flush_interval: 后台刷写间隔（秒），None表示每次追加立即持久化
+        """
+        super().__init__(snapshot_file, flush_interval)
+        self.legacy_json_file = legacy_json_file
+
+    def load(self):
+        with self._lock, self.file_lock:
+            if (not os.path.exists(self.chain_file) and self.legacy_json_file
+                    and os.path.exists(self.legacy_json_file)):
+                json_to_snapshot(self.legacy_json_file, self.chain_file)
+        super().load()
+
+    def _read(self):
+        with open(self.chain_file, 'rb') as f:
+            signature = _file_signature(f.fileno())
+            data = f.read()
+        self.chains = dict(_iter_chains(data, with_records=True))
+        self._signature = signature
+        self._upgrade_chains()
+
+    def _write(self):
+        write_snapshot(self.chains, self.chain_file)
+        self._signature = _file_signature(self.chain_file)
+
+
+def _encode_chain(chain: Dict, auditors: Dict[str, int], out: bytearray):
+    header = {key: value for key, value in chain.items() if key != "audit_chain"}
+    encoded = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    out += _U32.pack(len(encoded))
+    out += encoded
+
+    records = chain.get("audit_chain", [])
+    out += _U32.pack(len(records))
+    # 记录区长度在写完记录后回填
+    length_at = len(out)
+    out += _U64.pack(0)
+    for record in records:
+        payload = _encode_record(record, auditors)
+        out += _U32.pack(len(payload))
+        out += payload
+    _U64.pack_into(out, length_at, len(out) - length_at - _U64.size)
+
+
+def _encode_record(record: Dict, auditors: Dict[str, int]) -> bytes:
+    flags = 0
+    parts = []
+    extra = {key: value for key, value in record.items() if key not in _COMPACT_FIELDS}
+
+    auditor = record.get("auditor")
+    if isinstance(auditor, str):
+        flags |= _HAS_AUDITOR
+        auditor_id = auditors.get(auditor)
+        if auditor_id is None:
+            auditor_id = auditors[auditor] = len(auditors)
+        parts.append(_U32.pack(auditor_id))
+    elif "auditor" in record:
+        extra["auditor"] = auditor
+
+    micros = _timestamp_to_micros(record.get("timestamp"))
+    if micros is not None:
+        flags |= _HAS_TIMESTAMP
+        parts.append(_I64.pack(micros))
+    elif "timestamp" in record:
+        extra["timestamp"] = record["timestamp"]
+
+    score = record.get("trust_score")
+    if type(score) is int and _INT64_RANGE[0] <= score <= _INT64_RANGE[1]:
+        flags |= _HAS_INT_SCORE
+        parts.append(_I64.pack(score))
+    elif type(score) is float:
+        flags |= _HAS_FLOAT_SCORE
+        parts.append(_F64.pack(score))
+    elif "trust_score" in record:
+        extra["trust_score"] = score
+
+    digests = _pack_digests(record.get("prev_digest"), record.get("digest"))
+    if digests is not None:
+        flags |= _HAS_DIGESTS
+        parts.append(digests)
+    else:
+        for key in ("prev_digest", "digest"):
+            if key in record:
+                extra[key] = record[key]
+
+    content_digest = _pack_digest(record.get("content_digest"))
+    if content_digest is not None:
+        flags |= _HAS_CONTENT_DIGEST
+        parts.append(content_digest)
+    elif "content_digest" in record:
+        extra["content_digest"] = record["content_digest"]
+
+    seq = record.get("seq")
+    if type(seq) is int and 0 <= seq <= _INT64_RANGE[1]:
+        flags |= _HAS_SEQ
+        parts.append(_U64.pack(seq))
+    elif "seq" in record:
+        extra["seq"] = seq
+
+    if "result" in record:
+        flags |= _HAS_RESULT
+        encoded = json.dumps(record["result"], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        parts.append(_U32.pack(len(encoded)))
+        parts.append(encoded)
+
+    if extra:
+        parts.append(json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return bytes((flags,)) + b"".join(parts)
+
+
+def _timestamp_to_micros(timestamp):
+    """把 datetime.isoformat() 生成的时间戳转换为整数微秒，不能无损还原时返回None"""
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        moment = datetime.fromisoformat(timestamp)
+        micros = (moment - _EPOCH) // _MICROSECOND
+    except (ValueError, TypeError):
+        return None
+    if _micros_to_timestamp(micros) != timestamp:
+        return None
+    return micros
+
+
+# 最近一次还原的 (分钟序号, "YYYY-MM-DDTHH:MM:" 前缀)；同一条传承链的记录按时间排列，前缀经常相同
+_last_minute = (None, None)
+
+
+def _micros_to_timestamp(micros: int) -> str:
+    """整数微秒还原为与 datetime.isoformat() 相同的字符串"""
+    global _last_minute
+    minute, rest = divmod(micros, 60000000)
+    cached_minute, prefix = _last_minute
+    if cached_minute != minute:
+        prefix = (_EPOCH + timedelta(minutes=minute)).isoformat()[:-2]
+        _last_minute = (minute, prefix)
+    second, fraction = divmod(rest, 1000000)
+    if fraction:
+        return f"{prefix}{second:02d}.{fraction:06d}"
+    return f"{prefix}{second:02d}"
+
+
+def _pack_digests(prev_digest, digest):
+    """两个64位小写十六进制摘要打包为64字节，格式不符时返回None"""
+    prev_packed = _pack_digest(prev_digest)
+    packed = _pack_digest(digest)
+    if prev_packed is None or packed is None:
+        return None
+    return prev_packed + packed
+
+
+def _pack_digest(digest):
+    """64位小写十六进制摘要打包为32字节，格式不符时返回None"""
+    if not isinstance(digest, str) or len(digest) != 64:
+        return None
+    try:
+        packed = bytes.fromhex(digest)
+    except ValueError:
+        return None
+    if packed.hex() != digest:
+        return None
+    return packed
+
+
+def _iter_chains(data: bytes, with_records: bool) -> Iterator:
+    magic, version, _, chain_count, auditor_count = _FILE_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or version not in _AUDITOR_LENGTH:
+        raise ValueError(f"Unsupported isnad snapshot format (magic={magic!r}, version={version})")
+    pos = _FILE_HEADER.size
+
+    auditor_length = _AUDITOR_LENGTH[version]
+    auditors = []
+    for _ in range(auditor_count):
+        (length,) = auditor_length.unpack_from(data, pos)
+        pos += auditor_length.size
+        auditors.append(data[pos:pos + length].decode("utf-8"))
+        pos += length
+
+    view = memoryview(data)
+    for _ in range(chain_count):
+        (length,) = _U32.unpack_from(data, pos)
+        pos += _U32.size
+        chain = _json_loads(view[pos:pos + length].tobytes())
+        pos += length
+        (record_count,) = _U32.unpack_from(data, pos)
+        (records_length,) = _U64.unpack_from(data, pos + _U32.size)
+        pos += _U32.size + _U64.size
+
+        if with_records:
+            chain["audit_chain"] = _decode_records(data, pos, record_count, auditors)
+        pos += records_length
+        yield chain["skill_hash"], chain
+
+
+def _decode_chains(data: bytes) -> Dict:
+    return dict(_iter_chains(data, with_records=True))
+
+
+# {标志字节: 记录定长部分的Struct}
+_layouts = {}
+
+
+def _record_layout(flags: int) -> struct.Struct:
+    layout = _layouts.get(flags)
+    if layout is None:
+        fmt = "<"
+        if flags & _HAS_AUDITOR:
+            fmt += "I"
+        if flags & _HAS_TIMESTAMP:
+            fmt += "q"
+        if flags & _HAS_INT_SCORE:
+            fmt += "q"
+        elif flags & _HAS_FLOAT_SCORE:
+            fmt += "d"
+        if flags & _HAS_DIGESTS:
+            fmt += "32s32s"
+        if flags & _HAS_CONTENT_DIGEST:
+            fmt += "32s"
+        if flags & _HAS_SEQ:
+            fmt += "Q"
+        if flags & _HAS_RESULT:
+            fmt += "I"
+        layout = _layouts[flags] = struct.Struct(fmt)
+    return layout
+
+
+def _decode_records(data: bytes, pos: int, count: int, auditors: List[str]) -> List[Dict]:
+    records = []
+    for _ in range(count):
+        length, flags = _RECORD_HEAD.unpack_from(data, pos)
+        end = pos + _U32.size + length
+        layout = _layouts.get(flags) or _record_layout(flags)
+        values = layout.unpack_from(data, pos + _RECORD_HEAD.size)
+        pos += _RECORD_HEAD.size + layout.size
+
+        # 按原有的字段顺序还原：auditor, timestamp, result, trust_score, 其余字段,
+        # prev_digest, content_digest, digest, seq
+        record = {}
+        i = 0
+        if flags & _HAS_AUDITOR:
+            record["auditor"] = auditors[values[i]]
+            i += 1
+        if flags & _HAS_TIMESTAMP:
+            record["timestamp"] = _micros_to_timestamp(values[i])
+            i += 1
+        score = None
+        if flags & (_HAS_INT_SCORE | _HAS_FLOAT_SCORE):
+            score = values[i]
+            i += 1
+        digests = None
+        if flags & _HAS_DIGESTS:
+            digests = values[i], values[i + 1]
+            i += 2
+        content_digest = None
+        if flags & _HAS_CONTENT_DIGEST:
+            content_digest = values[i]
+            i += 1
+        seq = None
+        if flags & _HAS_SEQ:
+            seq = values[i]
+            i += 1
+        if flags & _HAS_RESULT:
+            result_end = pos + values[i]
+            record["result"] = _json_loads(data[pos:result_end])
+            pos = result_end
+        if score is not None:
+            record["trust_score"] = score
+        if pos < end:
+            record.update(_json_loads(data[pos:end]))
+        if digests is not None:
+            record["prev_digest"] = digests[0].hex()
+        if content_digest is not None:
+            record["content_digest"] = content_digest.hex()
+        if digests is not None:
+            record["digest"] = digests[1].hex()
+        if seq is not None:
+            record["seq"] = seq
+
+        records.append(record)
+        pos = end
+    return records
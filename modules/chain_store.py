@@ -0,0 +1,1071 @@
+"""
+Isnad Chain 存储后端
+JSONChainStore 保持原有的整文件JSON格式；AppendLogChainStore 以追加日志记录每次审计，
+定期压缩为快照，追加一条记录的开销只与记录本身大小有关；
+基于SQLite的后端见 sqlite_chain_store 模块
+"""
+
+import os
+import abc
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+import weakref
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from skill_trust_network.modules.atomic_file import atomic_write
+from skill_trust_network.modules.audit_index import AuditIndex
+
+try:
+    import fcntl
+except ImportError:
+    # 没有fcntl的平台上不做进程间加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 传承链第一条记录的前驱摘要
+GENESIS_DIGEST = "0" * 64
+
+# 参与记录内容摘要的字段；链接字段和复制元数据（本地序号seq）不在其中
+RECORD_CONTENT_FIELDS = ("auditor", "timestamp", "result", "trust_score")
+
+
+def record_skill_identity(record: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """
+    获取审计记录所属技能的名称和版本
+
+    优先使用记录上的skill_name/skill_version，否则从审计报告的skill_info中读取
+
+    Args:
+        record: 审计记录
+
+    Returns:
+        (技能名称, 技能版本)，未知时为None
+    """
+    if record.get("skill_name"):
+        return record["skill_name"], record.get("skill_version")
+    result = record.get("result")
+    skill_info = result.get("skill_info") if isinstance(result, dict) else None
+    if isinstance(skill_info, dict) and skill_info.get("name"):
+        return skill_info["name"], skill_info.get("version")
+    return None, None
+
+
+def record_content_digest(record: Dict) -> str:
+    """
+    计算审计记录内容的摘要，与记录在链中的位置无关
+
+    Args:
+        record: 审计记录
+
+    Returns:
+        十六进制摘要
+    """
+    content = {field: record.get(field) for field in RECORD_CONTENT_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def link_digest(prev_digest: str, record: Dict) -> str:
+    """
+    计算审计记录的链接摘要：前驱摘要与记录内容摘要的哈希
+
+    Args:
+        prev_digest: 前一条记录的摘要
+        record: 审计记录
+
+    Returns:
+        十六进制摘要
+    """
+    return _chain_digest(prev_digest, record_content_digest(record))
+
+
+def link_record(record: Dict, prev_digest: str) -> str:
+    """
+    把审计记录链接到前驱摘要之后：填入前驱摘要、内容摘要和链接摘要
+
+    内容摘要随记录持久化，复制时按它判断记录是否已存在，不必重新计算已有记录的摘要
+
+    Args:
+        record: 审计记录（原地修改）
+        prev_digest: 前一条记录的摘要
+
+    Returns:
+        记录的链接摘要
+    """
+    content_digest = record_content_digest(record)
+    record["prev_digest"] = prev_digest
+    record["content_digest"] = content_digest
+    record["digest"] = _chain_digest(prev_digest, content_digest)
+    return record["digest"]
+
+
+def stored_content_digest(record: Dict) -> str:
+    """已持久化记录的内容摘要，缺少该字段的记录按内容计算"""
+    return record.get("content_digest") or record_content_digest(record)
+
+
+def _chain_digest(prev_digest: str, content_digest: str) -> str:
+    return hashlib.sha256((prev_digest + content_digest).encode("ascii")).hexdigest()
+
+
+def new_chain(skill_hash: str, created_at: str) -> Dict:
+    """
+    创建一条空的传承链，包含运行聚合和校验检查点
+
+    Args:
+        skill_hash: 技能哈希
+        created_at: 创建时间
+
+    Returns:
+        传承链字典
+    """
+    return {
+        "skill_hash": skill_hash,
+        "created_at": created_at,
+        "skill_name": None,
+        "skill_version": None,
+        "audit_count": 0,
+        "score_sum": 0,
+        "head_digest": GENESIS_DIGEST,
+        "latest_timestamp": None,
+        "verified_count": 0,
+        "verified_digest": GENESIS_DIGEST,
+        "verified_score_sum": 0,
+        "audit_chain": []
+    }
+
+
+def upgrade_chain(chain: Dict) -> Dict:
+    """
+    为原有格式（没有记录链接）的传承链补齐记录链接、聚合字段和技能名称
+
+    旧记录按当前内容建立链接（首次使用即信任）；检查点归零，下一次校验从头检查整条链。
+    已是当前格式的传承链原样返回
+
+    Args:
+        chain: 传承链字典（原地修改）
+
+    Returns:
+        同一个传承链字典
+    """
+    if "head_digest" in chain:
+        return chain
+
+    chain["skill_name"] = chain["skill_version"] = None
+    prev = GENESIS_DIGEST
+    score_sum = 0
+    for record in chain.get("audit_chain", []):
+        if not chain["skill_name"]:
+            name, version = record_skill_identity(record)
+            if name:
+                chain["skill_name"], chain["skill_version"] = name, version
+        prev = link_record(record, prev)
+        score_sum += record.get("trust_score", 0)
+
+    records = chain.setdefault("audit_chain", [])
+    chain["audit_count"] = len(records)
+    chain["score_sum"] = score_sum
+    chain["head_digest"] = prev
+    chain["latest_timestamp"] = records[-1].get("timestamp") if records else None
+    chain["verified_count"] = 0
+    chain["verified_digest"] = GENESIS_DIGEST
+    chain["verified_score_sum"] = 0
+    return chain
+
+
+def sequence_records(chains: Iterable[Dict], last_seq: int = 0) -> int:
+    """
+    为原有格式的记录分配本地序号
+
+    序号在一个存储内单调递增，增量导出以它为水位。原有记录按传承链和记录的顺序
+    排在已有序号之后，同一份数据在不同进程中得到相同的编号
+
+    Args:
+        chains: 传承链字典的可迭代对象（原地修改）
+        last_seq: 这些传承链之外已经分配的最大序号
+
+    Returns:
+        分配后的最大序号
+    """
+    unsequenced = []
+    for chain in chains:
+        for record in chain.get("audit_chain", []):
+            seq = record.get("seq")
+            if seq is None:
+                unsequenced.append(record)
+            elif seq > last_seq:
+                last_seq = seq
+    for record in unsequenced:
+        last_seq += 1
+        record["seq"] = last_seq
+    return last_seq
+
+
+class ChainStore(abc.ABC):
+    """
+    传承链存储后端基类
+    chains 提供 {skill_hash: chain} 的映射视图，具体存放方式由子类决定；
+    子类需实现全部抽象方法，缺少任何一个时在创建实例时即报错
+    """
+
+    chains = None
+
+    @abc.abstractmethod
+    def load(self):
+        """从持久化存储加载（或打开）传承链数据"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save(self):
+        """将全部传承链完整写入持久化存储"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_chain(self, skill_hash: str) -> Optional[Dict]:
+        """
+        获取技能的传承链
+
+        Args:
+            skill_hash: 技能哈希
+
+        Returns:
+            传承链字典，不存在时返回None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_chain_header(self, skill_hash: str) -> Optional[Dict]:
+        """
+        获取传承链的聚合信息和校验检查点，不必读取审计记录
+
+        Args:
+            skill_hash: 技能哈希
+
+        Returns:
+            包含audit_count、score_sum、head_digest、latest_timestamp、
+            verified_count、verified_digest、verified_score_sum的字典，不存在时返回None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_records(self, skill_hash: str, start: int = 0) -> List[Dict]:
+        """
+        获取传承链中从start开始的审计记录
+
+        Args:
+            skill_hash: 技能哈希
+            start: 起始位置
+
+        Returns:
+            审计记录列表
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_auditors(self, skill_hash: str) -> List[str]:
+        """
+        按顺序获取传承链的审计员列表
+
+        Args:
+            skill_hash: 技能哈希
+
+        Returns:
+            审计员列表
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def find_chains(self, skill_name: str, skill_version: Optional[str] = None) -> List[str]:
+        """
+        通过名称反向索引查找技能的传承链
+
+        Args:
+            skill_name: 技能名称
+            skill_version: 技能版本，None表示所有版本
+
+        Returns:
+            技能哈希列表
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def query_audits(self, auditor: Optional[str] = None, since: Optional[str] = None,
+                     until: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        按时间顺序查询审计记录
+
+        Args:
+            auditor: 审计员，None表示所有审计员
+            since: 起始时间（ISO格式，含），None表示不限
+            until: 截止时间（ISO格式，不含），None表示不限
+
+        Returns:
+            (技能哈希, 审计记录) 的迭代器
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stale_chains(self, before: str) -> Iterator[str]:
+        """
+        查询最新审计早于before的传承链，按最新审计时间从早到晚排列
+
+        Args:
+            before: 截止时间（ISO格式）
+
+        Returns:
+            技能哈希的迭代器
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def records_since(self, seq: int) -> Iterator[Tuple[str, Dict]]:
+        """
+        按本地序号顺序产出序号大于seq的审计记录
+
+        Args:
+            seq: 水位，0表示全部记录
+
+        Returns:
+            (技能哈希, 审计记录) 的迭代器
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def has_content(self, skill_hash: str, content_digest: str) -> bool:
+        """
+        传承链中是否已有内容摘要相同的审计记录
+
+        Args:
+            skill_hash: 技能哈希
+            content_digest: 记录内容摘要（record_content_digest）
+
+        Returns:
+            是否已存在
+        """
+        raise NotImplementedError
+
+    def new_records(self, items: Iterable[Tuple[str, Dict, str]]) -> List[Tuple[str, Dict, str]]:
+        """
+        过滤掉传承链中已有相同内容的待追加记录，用于复制和合并时去重
+
+        每条记录按内容摘要查询一次，开销与待追加记录数量成正比
+
+        Args:
+            items: (技能哈希, 审计记录, 创建时间) 的可迭代对象
+
+        Returns:
+            需要追加的记录，保持原有顺序；同一批中内容重复的记录只保留第一条
+        """
+        seen = set()
+        result = []
+        for item in items:
+            key = (item[0], record_content_digest(item[1]))
+            if key not in seen and not self.has_content(*key):
+                seen.add(key)
+                result.append(item)
+        return result
+
+    @abc.abstractmethod
+    def update_checkpoint(self, skill_hash: str, verified_count: int, verified_digest: str,
+                          verified_score_sum: float):
+        """
+        记录校验检查点：前verified_count条记录已校验，最后一条的摘要为verified_digest，
+        这些记录的评分之和为verified_score_sum
+
+        Args:
+            skill_hash: 技能哈希
+            verified_count: 已校验的记录数
+            verified_digest: 最后一条已校验记录的摘要
+            verified_score_sum: 已校验记录的评分之和
+        """
+        raise NotImplementedError
+
+    def append_record(self, skill_hash: str, record: Dict, created_at: str):
+        """
+        向传承链追加一条审计记录，传承链不存在时自动创建
+
+        Args:
+            skill_hash: 技能哈希
+            record: 审计记录
+            created_at: 新建传承链时使用的创建时间
+        """
+        self.append_records([(skill_hash, record, created_at)])
+
+    @abc.abstractmethod
+    def append_records(self, items: Iterable[Tuple[str, Dict, str]]):
+        """
+        批量追加审计记录，全部记录在一次写入/事务中持久化
+
+        Args:
+            items: (技能哈希, 审计记录, 创建时间) 的可迭代对象
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def replace_all(self, chains: Dict):
+        """
+        用给定的传承链替换当前全部内容并持久化
+
+        Args:
+            chains: {skill_hash: chain} 字典
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """释放存储占用的资源"""
+
+    def export_json(self, output_path: str):
+        """
+        以原有的JSON格式导出全部传承链
+
+        Args:
+            output_path: 输出文件路径
+        """
+        chains = dict(self.chains.items())
+        atomic_write(output_path, lambda f: json.dump(chains, f, indent=2, ensure_ascii=False))
+
+    def import_json(self, input_path: str):
+        """
+        从原有的JSON格式导入传承链，替换当前全部内容并持久化
+
+        Args:
+            input_path: JSON文件路径
+        """
+        with open(input_path, 'r', encoding='utf-8') as f:
+            self.replace_all(json.load(f))
+
+
+class MemoryChainStore(ChainStore):
+    """数据以字典形式常驻内存的存储后端基类"""
+
+    def __init__(self):
+        self.chains = {}
+        # 反向索引 {技能名称: {技能版本: [技能哈希]}}
+        self.name_index = {}
+        self.audit_index = AuditIndex()
+        # 全部记录的 (技能哈希, 内容摘要)
+        self.content_keys = set()
+        # 最后分配的本地记录序号
+        self.last_seq = 0
+
+    def get_chain(self, skill_hash: str) -> Optional[Dict]:
+        return self.chains.get(skill_hash)
+
+    def get_chain_header(self, skill_hash: str) -> Optional[Dict]:
+        # 内存中的传承链字典本身就带有聚合字段
+        return self.chains.get(skill_hash)
+
+    def get_records(self, skill_hash: str, start: int = 0) -> List[Dict]:
+        chain = self.chains.get(skill_hash)
+        return chain["audit_chain"][start:] if chain else []
+
+    def get_auditors(self, skill_hash: str) -> List[str]:
+        chain = self.chains.get(skill_hash)
+        return [record["auditor"] for record in chain["audit_chain"]] if chain else []
+
+    def find_chains(self, skill_name: str, skill_version: Optional[str] = None) -> List[str]:
+        versions = self.name_index.get(skill_name)
+        if not versions:
+            return []
+        if skill_version is not None:
+            return list(versions.get(skill_version, ()))
+        return [skill_hash for hashes in versions.values() for skill_hash in hashes]
+
+    def query_audits(self, auditor: Optional[str] = None, since: Optional[str] = None,
+                     until: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        for skill_hash, position in self.audit_index.query(auditor, since, until):
+            yield skill_hash, self.chains[skill_hash]["audit_chain"][position]
+
+    def stale_chains(self, before: str) -> Iterator[str]:
+        return self.audit_index.stale(before)
+
+    def records_since(self, seq: int) -> Iterator[Tuple[str, Dict]]:
+        for skill_hash, position in self.audit_index.since(seq):
+            yield skill_hash, self.chains[skill_hash]["audit_chain"][position]
+
+    def has_content(self, skill_hash: str, content_digest: str) -> bool:
+        return (skill_hash, content_digest) in self.content_keys
+
+    def update_checkpoint(self, skill_hash: str, verified_count: int, verified_digest: str,
+                          verified_score_sum: float):
+        chain = self.chains.get(skill_hash)
+        if chain is not None:
+            chain["verified_count"] = verified_count
+            chain["verified_digest"] = verified_digest
+            chain["verified_score_sum"] = verified_score_sum
+
+    def replace_all(self, chains: Dict):
+        self.chains = chains
+        self._upgrade_chains()
+        self.save()
+
+    def _upgrade_chains(self):
+        """为加载的原有格式传承链补齐链接、聚合字段和本地序号，并重建名称索引、审计索引和内容摘要集合"""
+        self.name_index = {}
+        self.audit_index = AuditIndex()
+        self.content_keys = set()
+        for chain in self.chains.values():
+            upgrade_chain(chain)
+        self.last_seq = sequence_records(self.chains.values())
+        for skill_hash, chain in self.chains.items():
+            self._index_chain(chain)
+            for position, record in enumerate(chain["audit_chain"]):
+                self.audit_index.add_record(skill_hash, position, record)
+                self.content_keys.add((skill_hash, stored_content_digest(record)))
+            self.audit_index.set_latest(skill_hash, chain["latest_timestamp"])
+
+    def _index_chain(self, chain: Dict):
+        """把传承链加入名称索引"""
+        if chain.get("skill_name"):
+            versions = self.name_index.setdefault(chain["skill_name"], {})
+            versions.setdefault(chain.get("skill_version"), []).append(chain["skill_hash"])
+
+    def _link(self, items: List[Tuple[str, Dict, str]]):
+        """为一批待追加的记录依次填入前驱摘要、内容摘要、链接摘要和本地序号"""
+        heads = {}
+        seq = self.last_seq
+        for skill_hash, record, _ in items:
+            prev = heads.get(skill_hash)
+            if prev is None:
+                chain = self.chains.get(skill_hash)
+                prev = chain["head_digest"] if chain else GENESIS_DIGEST
+            heads[skill_hash] = link_record(record, prev)
+            seq += 1
+            record["seq"] = seq
+
+    def _apply(self, skill_hash: str, record: Dict, created_at: str) -> Dict:
+        """在内存中应用一条已链接的追加操作，并更新运行聚合"""
+        chain = self.chains.get(skill_hash)
+        if chain is None:
+            chain = new_chain(skill_hash, created_at)
+            self.chains[skill_hash] = chain
+        if not chain["skill_name"]:
+            name, version = record_skill_identity(record)
+            if name:
+                chain["skill_name"], chain["skill_version"] = name, version
+                self._index_chain(chain)
+        self.last_seq = max(self.last_seq, record["seq"])
+        self.audit_index.add_record(skill_hash, len(chain["audit_chain"]), record)
+        self.content_keys.add((skill_hash, stored_content_digest(record)))
+        chain["audit_chain"].append(record)
+        chain["audit_count"] += 1
+        chain["score_sum"] += record.get("trust_score", 0)
+        chain["head_digest"] = record["digest"]
+        chain["latest_timestamp"] = record.get("timestamp")
+        self.audit_index.set_latest(skill_hash, chain["latest_timestamp"])
+        return chain
+
+
+class JSONChainStore(MemoryChainStore):
+    """
+    整文件JSON存储，每次持久化都重写整个文件
+
+    多个进程可以共享同一个文件：写入时持有咨询锁，若磁盘上的文件已被其他进程更新，
+    先重新读取，再把本进程尚未持久化的追加重新链接到磁盘状态之后，最后写入临时文件并rename
+    """
+
+    def __init__(self, chain_file: str, flush_interval: Optional[float] = None):
+        """
+        初始化JSON存储
+
+        Args:
+            chain_file: 传承链JSON文件路径
+            flush_interval: 后台刷写间隔（秒），设置后追加只进入内存，由后台线程合并持久化；
+                            None表示每次追加立即持久化
+        """
+        super().__init__()
+        self.chain_file = chain_file
+        self.file_lock = FileLock(chain_file + ".lock")
+        self.flush_interval = flush_interval
+        # 尚未持久化的追加
+        self._pending = []
+        # 最近一次读取或写入时数据文件的 (inode, 大小, 修改时间)
+        self._signature = None
+        self._lock = threading.RLock()
+        self._flusher = None
+
+    def load(self):
+        with self._lock, self.file_lock:
+            self._pending = []
+            try:
+                self._read()
+            except FileNotFoundError:
+                self.chains = {}
+                self._write()
+        if self.flush_interval is not None and self._flusher is None:
+            self._flusher = BackgroundFlusher(self.flush, self.flush_interval)
+            _close_at_exit.add(self)
+
+    def save(self):
+        self.flush()
+
+    def flush(self):
+        """持久化尚未写入的追加，与其他进程的写入合并"""
+        with self._lock, self.file_lock:
+            if _file_signature(self.chain_file) != self._signature:
+                pending = self._pending
+                self._read()
+                self._merge(pending)
+            self._write()
+            self._pending = []
+
+    def append_records(self, items: Iterable[Tuple[str, Dict, str]]):
+        items = list(items)
+        with self._lock:
+            self._link(items)
+            for skill_hash, record, created_at in items:
+                self._apply(skill_hash, record, created_at)
+            self._pending.extend(items)
+            if self._flusher is None:
+                self.flush()
+        if self._flusher is not None:
+            self._flusher.notify()
+
+    def replace_all(self, chains: Dict):
+        with self._lock, self.file_lock:
+            self.chains = chains
+            self._upgrade_chains()
+            self._pending = []
+            self._write()
+
+    def records_since(self, seq: int) -> Iterator[Tuple[str, Dict]]:
+        with self._lock:
+            if self._pending:
+                # 尚未持久化的追加在与其他进程的写入合并时会重新编号，导出前先持久化
+                self.flush()
+        return super().records_since(seq)
+
+    def close(self):
+        _close_at_exit.discard(self)
+        if self._flusher is not None:
+            self._flusher.close()
+            self._flusher = None
+        if self._pending:
+            self.flush()
+
+    def _read(self):
+        with open(self.chain_file, 'r', encoding='utf-8') as f:
+            signature = _file_signature(f.fileno())
+            self.chains = json.load(f)
+        self._signature = signature
+        self._upgrade_chains()
+
+    def _write(self):
+        atomic_write(self.chain_file, lambda f: json.dump(self.chains, f, indent=2, ensure_ascii=False))
+        self._signature = _file_signature(self.chain_file)
+
+    def _merge(self, pending: List[Tuple[str, Dict, str]]):
+        """把本进程尚未持久化的追加重新链接到刚读取的磁盘状态之后，已存在的记录跳过"""
+        items = self.new_records(pending)
+        self._link(items)
+        for skill_hash, record, created_at in items:
+            self._apply(skill_hash, record, created_at)
+
+
+class AppendLogChainStore(MemoryChainStore):
+    """
+    追加日志存储
+
+    每次追加向日志文件写入一行JSON并fsync；追加次数达到compact_every时，
+    把内存状态写成快照（临时文件 + rename）并清空日志。快照记录其包含的最后一个
+    日志序号，压缩过程中崩溃时，重放会跳过已进入快照的日志条目
+
+    多个进程可以共享同一组文件：追加和压缩都持有咨询锁，先重放其他进程写入的日志条目
+    （快照被其他进程替换时重新读取快照），再在最新状态之后链接和写入，压缩不会丢弃其他进程的追加
+    """
+
+    SNAPSHOT_FORMAT = "isnad-snapshot"
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, chain_file: str, compact_every: int = 1000, fsync: bool = True):
+        """
+        初始化追加日志存储
+
+        Args:
+            chain_file: 原JSON文件路径，快照和日志文件与其同名放在同一目录；
+                        首次使用时若该JSON文件存在则从中导入
+            compact_every: 累计多少次追加后自动压缩，0表示不自动压缩
+            fsync: 每次追加后是否fsync，保证崩溃后已返回的追加不丢失
+        """
+        super().__init__()
+        self.chain_file = chain_file
+        base = os.path.splitext(chain_file)[0]
+        self.snapshot_file = base + ".snapshot.jsonl"
+        self.log_file = base + ".wal.jsonl"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.file_lock = FileLock(base + ".lock")
+        self.seq = 0
+        self._appends_since_compact = 0
+        self._log_fd = None
+        # 已重放到的日志位置，以及读取或写入快照时快照文件的 (inode, 大小, 修改时间)
+        self._log_offset = 0
+        self._snapshot_signature = None
+
+    def load(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_file)), exist_ok=True)
+        with self.file_lock:
+            if (not os.path.exists(self.snapshot_file) and not os.path.exists(self.log_file)
+                    and os.path.exists(self.chain_file)):
+                # 从原有的JSON文件迁移
+                with open(self.chain_file, 'r', encoding='utf-8') as f:
+                    self.chains = json.load(f)
+                self.seq = 0
+                self._upgrade_chains()
+                self._write_snapshot()
+            self._reload()
+            self._open_log()
+
+    def save(self):
+        self.compact()
+
+    def compact(self):
+        """先重放其他进程的追加，再将内存状态写成快照并清空日志"""
+        with self.file_lock:
+            self._catch_up()
+            self._compact_locked()
+
+    def replace_all(self, chains: Dict):
+        with self.file_lock:
+            self.chains = chains
+            self._upgrade_chains()
+            self._compact_locked()
+
+    def append_records(self, items: Iterable[Tuple[str, Dict, str]]):
+        items = list(items)
+        if not items:
+            return
+        with self.file_lock:
+            self._catch_up()
+            self._append_locked(items)
+        if self.compact_every and self._appends_since_compact >= self.compact_every:
+            self.compact()
+
+    def _compact_locked(self):
+        """将内存状态写成快照并清空日志，调用方需持有文件锁"""
+        self._write_snapshot()
+        self._open_log()
+        os.ftruncate(self._log_fd, 0)
+        if self.fsync:
+            os.fsync(self._log_fd)
+        self._log_offset = 0
+        self._appends_since_compact = 0
+
+    def _append_locked(self, items: List[Tuple[str, Dict, str]]):
+        """在已重放到最新状态之后链接并写入记录，调用方需持有文件锁"""
+        self._link(items)
+
+        lines = []
+        seq = self.seq
+        for skill_hash, record, created_at in items:
+            seq += 1
+            entry = {
+                "seq": seq,
+                "skill_hash": skill_hash,
+                "created_at": created_at,
+                "record": record
+            }
+            lines.append(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        # 一批记录只做一次write和一次fsync
+        self._write_log("".join(lines).encode("utf-8"))
+        self._log_offset = os.fstat(self._log_fd).st_size
+        self.seq = seq
+
+        for skill_hash, record, created_at in items:
+            self._apply(skill_hash, record, created_at)
+        self._appends_since_compact += len(items)
+
+    def _reload(self):
+        """重新读取快照并重放全部日志，调用方需持有文件锁"""
+        self.chains = {}
+        self.seq = 0
+        self._log_offset = 0
+        self._appends_since_compact = 0
+        if os.path.exists(self.snapshot_file):
+            self._load_snapshot()
+        self._upgrade_chains()
+        self._replay_log()
+
+    def _catch_up(self):
+        """重放其他进程写入的日志条目；快照已被替换（其他进程做了压缩）时整体重新读取，调用方需持有文件锁"""
+        if _file_signature(self.snapshot_file) != self._snapshot_signature:
+            self._reload()
+        else:
+            self._replay_log()
+
+    def close(self):
+        if self._log_fd is not None:
+            os.close(self._log_fd)
+            self._log_fd = None
+
+    def _open_log(self):
+        if self._log_fd is None:
+            self._log_fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _write_log(self, data: bytes):
+        self._open_log()
+        view = memoryview(data)
+        while view:
+            written = os.write(self._log_fd, view)
+            view = view[written:]
+        if self.fsync:
+            os.fsync(self._log_fd)
+
+    def _load_snapshot(self):
+        with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+            self._snapshot_signature = _file_signature(f.fileno())
+            header = json.loads(f.readline())
+            if header.get("format") != self.SNAPSHOT_FORMAT or header.get("version") != self.SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot format in {self.snapshot_file}")
+            self.seq = header.get("seq", 0)
+            for line in f:
+                chain = json.loads(line)
+                self.chains[chain["skill_hash"]] = chain
+
+    def _write_snapshot(self):
+        header = {"format": self.SNAPSHOT_FORMAT, "version": self.SNAPSHOT_VERSION, "seq": self.seq}
+
+        def write(f):
+            f.write(json.dumps(header) + "\n")
+            for chain in self.chains.values():
+                f.write(json.dumps(chain, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+        atomic_write(self.snapshot_file, write, self.fsync)
+        self._snapshot_signature = _file_signature(self.snapshot_file)
+
+    def _replay_log(self):
+        """从上次重放到的位置重放日志中快照之后的追加；末尾写了一半的行被截断丢弃，调用方需持有文件锁"""
+        try:
+            f = open(self.log_file, 'rb')
+        except FileNotFoundError:
+            self._log_offset = 0
+            return
+
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            if size < self._log_offset:
+                # 日志已被其他进程清空，其中的条目都已进入快照
+                self._log_offset = 0
+            valid_end = self._log_offset
+            f.seek(valid_end)
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("torn log entry")
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                valid_end += len(line)
+                if entry["seq"] <= self.seq:
+                    continue
+                self.seq = entry["seq"]
+                self._apply(entry["skill_hash"], entry["record"], entry["created_at"])
+                self._appends_since_compact += 1
+
+        if valid_end < size:
+            logger.warning("Truncating torn tail of isnad log %s at byte %d", self.log_file, valid_end)
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(valid_end)
+        self._log_offset = valid_end
+
+
+class GroupCommitter:
+    """
+    组提交器
+    并发线程提交的追加先进入队列，后台线程在一个很短的时间窗口内把它们合并成一次
+    append_records（一次写入/一次fsync/一个事务），提交方阻塞到所在批次持久化完成
+    """
+
+    def __init__(self, store: ChainStore, window: float = 0.005):
+        """
+        初始化组提交器
+
+        Args:
+            store: 存储后端
+            window: 合并时间窗口（秒）
+        """
+        self.store = store
+        self.window = window
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="isnad-group-commit", daemon=True)
+        self._thread.start()
+        _close_at_exit.add(self)
+
+    def submit(self, items: List[Tuple[str, Dict, str]]):
+        """
+        提交一组追加并等待其持久化
+
+        Args:
+            items: (技能哈希, 审计记录, 创建时间) 列表
+        """
+        ticket = _CommitTicket()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("group committer is closed")
+            self._pending.append((items, ticket))
+            self._cond.notify()
+        ticket.event.wait()
+        if ticket.error is not None:
+            raise ticket.error
+
+    def close(self):
+        """提交剩余的追加并停止后台线程"""
+        _close_at_exit.discard(self)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+            # 等待一个时间窗口，让并发的提交进入同一批次
+            if self.window > 0:
+                time.sleep(self.window)
+            with self._cond:
+                batch, self._pending = self._pending, []
+
+            error = None
+            try:
+                self.store.append_records([item for items, _ in batch for item in items])
+            except Exception as e:
+                error = e
+            for _, ticket in batch:
+                ticket.error = error
+                ticket.event.set()
+
+
+class _CommitTicket:
+    __slots__ = ("event", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.error = None
+
+
+class BackgroundFlusher:
+    """
+    后台刷写线程
+    被通知后等待一个时间间隔，把期间累积的所有修改合并为一次flush
+    """
+
+    def __init__(self, flush: Callable[[], None], interval: float):
+        """
+        初始化后台刷写线程
+
+        Args:
+            flush: 执行持久化的函数
+            interval: 合并时间间隔（秒）
+        """
+        self.flush = flush
+        self.interval = interval
+        self._event = threading.Event()
+        self._stop = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="isnad-flusher", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """通知有新的修改需要持久化"""
+        self._event.set()
+
+    def close(self):
+        """停止后台线程，剩余的修改由调用方自行flush"""
+        self._closed = True
+        self._stop.set()
+        self._event.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._closed:
+            self._event.wait()
+            if self._closed:
+                return
+            # 合并一个间隔内的修改；关闭时立即结束等待
+            if self._stop.wait(self.interval):
+                return
+            self._event.clear()
+            try:
+                self.flush()
+            except Exception:
+                # 尚未持久化的追加保留在内存中，下一次flush时重试
+                logger.exception("Error flushing isnad chains")
+
+
+class FileLock:
+    """
+    基于flock的进程间咨询锁
+    同一进程内可重入，持锁期间其他进程对同一锁文件的加锁会阻塞
+    """
+
+    def __init__(self, lock_file: str):
+        """
+        初始化文件锁
+
+        Args:
+            lock_file: 锁文件路径
+        """
+        self.lock_file = lock_file
+        self._fd = None
+        self._depth = 0
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            if self._depth == 0:
+                os.makedirs(os.path.dirname(os.path.abspath(self.lock_file)), exist_ok=True)
+                fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                self._fd = fd
+            self._depth += 1
+        except BaseException:
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+
+# 持有后台线程的组提交器和存储，解释器退出时仍未关闭的由 _close_writers_at_exit 关闭，
+# 避免守护线程随进程结束而丢失尚未持久化的追加
+_close_at_exit = weakref.WeakSet()
+
+
+@atexit.register
+def _close_writers_at_exit():
+    # 先关闭组提交器，其剩余的追加进入存储后再由存储刷写
+    writers = sorted(_close_at_exit, key=lambda writer: not isinstance(writer, GroupCommitter))
+    for writer in writers:
+        try:
+            writer.close()
+        except Exception:
+            logger.exception("Error closing %s at exit", type(writer).__name__)
+
+
+def _file_signature(file) -> Optional[Tuple[int, int, int]]:
+    """文件的 (inode, 大小, 修改时间)，原子替换后inode必然变化；文件不存在时返回None"""
+    try:
+        st = os.fstat(file) if isinstance(file, int) else os.stat(file)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
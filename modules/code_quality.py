@@ -0,0 +1,368 @@
+import os
+import ast
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from skill_trust_network.modules.atomic_file import save_atomically
+from skill_trust_network.modules.hash_cache import FileHashCache
+
+logger = logging.getLogger(__name__)
+
+# 参与分析的源文件扩展名
+ANALYZED_EXTENSIONS = (".py",)
+
+# 圈复杂度超过该值的函数开始扣分
+COMPLEXITY_LIMIT = 10
+
+# 非空行数超过该值的技能开始扣分
+SIZE_LIMIT = 1000
+
+# 增加圈复杂度的语法节点
+_BRANCH_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler,
+                 ast.Assert, ast.comprehension)
+_MATCH_CASE = getattr(ast, "match_case", None)
+
+
+def analyze_source(source: bytes) -> Dict:
+    """
+    分析一个Python源文件
+
+    Args:
+        source: 文件内容
+
+    Returns:
+        指标字典：parse_error（是否无法解析）、lines（非空行数）、functions（函数数）、
+        max_complexity（函数的最大圈复杂度，模块顶层代码也作为一个单元）、bare_excepts（裸except数）
+    """
+    lines = sum(1 for line in source.splitlines() if line.strip())
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return {"parse_error": True, "lines": lines, "functions": 0, "max_complexity": 0, "bare_excepts": 0}
+
+    functions = 0
+    bare_excepts = 0
+    # (节点, 所属单元的复杂度计数下标)；函数定义开启新的单元
+    complexity = [1]
+    stack = [(tree, 0)]
+    while stack:
+        node, unit = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            child_unit = unit
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+                functions += 1
+                complexity.append(1)
+                child_unit = len(complexity) - 1
+            elif isinstance(child, _BRANCH_NODES) or (_MATCH_CASE is not None and isinstance(child, _MATCH_CASE)):
+                complexity[unit] += 1
+                if isinstance(child, ast.ExceptHandler) and child.type is None:
+                    bare_excepts += 1
+                elif isinstance(child, ast.comprehension):
+                    complexity[unit] += len(child.ifs)
+            elif isinstance(child, ast.BoolOp):
+                complexity[unit] += len(child.values) - 1
+            stack.append((child, child_unit))
+    return {"parse_error": False, "lines": lines, "functions": functions,
+            "max_complexity": max(complexity), "bare_excepts": bare_excepts}
+
+
+def score_metrics(metrics: Dict) -> int:
+    """
+    由技能的汇总指标计算代码质量评分 (0-100)
+
+    无法解析的文件扣40分；最大圈复杂度超过上限时每超出1扣2分，最多扣25分；
+    每个裸except扣5分，最多扣20分；非空行数超过上限时每超出200行扣1分，最多扣15分
+
+    Args:
+        metrics: analyze_skill 返回的汇总指标
+
+    Returns:
+        代码质量评分
+    """
+    score = 100
+    if metrics["parse_errors"]:
+        score -= 40
+    score -= min(25, 2 * max(0, metrics["max_complexity"] - COMPLEXITY_LIMIT))
+    score -= min(20, 5 * metrics["bare_excepts"])
+    score -= min(15, max(0, metrics["lines"] - SIZE_LIMIT) // 200)
+    return max(0, score)
+
+
+def _analyze_batch(sources: List[bytes]) -> List[Dict]:
+    """进程池中执行的分析任务，一次处理多个文件以减少进程间通信"""
+    return [analyze_source(source) for source in sources]
+
+
+class CodeQualityAnalyzer:
+    """
+    代码质量分析模块
+    用ast对技能中的Python文件做静态分析（解析错误、圈复杂度、规模、裸except），
+    分析结果按文件内容摘要缓存，文件的stat身份未变时连摘要也不必重新计算；
+    需要分析的文件较多时在进程池中并行解析
+    """
+
+    # 缓存文件格式版本，分析规则变化时递增，旧缓存整体失效
+    CACHE_VERSION = 1
+
+    # 需要解析的文件少于该数量时在当前进程中解析，避免进程池的启动和通信开销
+    POOL_THRESHOLD = 16
+
+    # 每个进程池任务处理的文件数
+    BATCH_SIZE = 32
+
+    def __init__(self, cache_file: Optional[str] = None, max_workers: Optional[int] = None):
+        """
+        初始化代码质量分析器
+
+        Args:
+            cache_file: 分析结果缓存文件路径，为None时只在内存中缓存
+            max_workers: 进程池的进程数，None表示CPU核数
+        """
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        # 本进程中实际解析的文件数
+        self.parsed = 0
+        # {文件路径: (stat身份, 内容摘要)}
+        self._files = {}
+        # {内容摘要: 指标字典}
+        self._results = {}
+        # 本进程中stat成功的文件路径，保存时只需检查其余的缓存条目是否仍然存在
+        self._seen = set()
+        # prepare 预先分析的一批技能 {技能目录路径: 汇总指标和评分或None}，每个结果只使用一次
+        self._prepared = {}
+        self._executor = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        if cache_file:
+            self.load()
+
+    def analyze_skill(self, skill_path: str) -> Optional[Dict]:
+        """
+        分析单个技能目录
+
+        Args:
+            skill_path: 技能目录路径
+
+        Returns:
+            汇总指标和评分，技能中没有Python文件时返回None
+        """
+        return self.analyze_skills([skill_path])[skill_path]
+
+    def skill_score(self, skill_path: str) -> Optional[int]:
+        """
+        获取技能的代码质量评分
+
+        Args:
+            skill_path: 技能目录路径
+
+        Returns:
+            代码质量评分，技能中没有Python文件时返回None
+        """
+        with self._lock:
+            prepared = skill_path in self._prepared
+            result = self._prepared.pop(skill_path, None)
+        if not prepared:
+            result = self.analyze_skill(skill_path)
+        return result["score"] if result is not None else None
+
+    def prepare(self, skill_paths: Iterable[str]):
+        """
+        预先分析一批技能，之后对这些技能的 skill_score 直接使用分析结果，
+        不再遍历目录和stat文件；上一批尚未使用的结果被丢弃
+
+        Args:
+            skill_paths: 技能目录路径
+        """
+        paths = list(skill_paths)
+        prepared = self.analyze_skills(paths) if paths else {}
+        with self._lock:
+            self._prepared = prepared
+
+    def analyze_skills(self, skill_paths: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """
+        分析多个技能目录，全部技能中需要解析的文件一起分配到进程池
+
+        Args:
+            skill_paths: 技能目录路径
+
+        Returns:
+            {技能目录路径: 汇总指标和评分或None}
+        """
+        skill_files = {path: self._list_files(path) for path in skill_paths}
+        digests = {}
+        pending = {}
+        for files in skill_files.values():
+            for file_path in files:
+                if file_path in digests:
+                    continue
+                digest, source = self._file_digest(file_path)
+                digests[file_path] = digest
+                if digest is not None and digest not in self._results and digest not in pending:
+                    pending[digest] = source
+
+        if pending:
+            self._analyze_pending(pending)
+
+        results = {}
+        for skill_path, files in skill_files.items():
+            metrics = [self._results[digests[file_path]] for file_path in files
+                       if digests[file_path] is not None]
+            results[skill_path] = self._aggregate(metrics) if metrics else None
+        return results
+
+    def _list_files(self, skill_path: str) -> List[str]:
+        """列出技能目录中参与分析的文件，按路径排序"""
+        files = []
+        for root, _, names in os.walk(skill_path):
+            for name in names:
+                if name.endswith(ANALYZED_EXTENSIONS):
+                    files.append(os.path.join(root, name))
+        files.sort()
+        return files
+
+    def _file_digest(self, file_path: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """
+        获取文件内容摘要，stat身份与缓存一致时不读取文件
+
+        Returns:
+            (内容摘要, 读取到的文件内容)；未读取文件时内容为None，读取失败时均为None
+        """
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            with self._lock:
+                if self._files.pop(file_path, None) is not None:
+                    self._dirty = True
+            return None, None
+        ident = FileHashCache.stat_key(st)
+        with self._lock:
+            self._seen.add(file_path)
+            cached = self._files.get(file_path)
+        if cached is not None and cached[0] == ident and cached[1] in self._results:
+            return cached[1], None
+
+        try:
+            with open(file_path, 'rb') as f:
+                source = f.read()
+        except OSError as e:
+            logger.warning("Error reading source file %s: %s", file_path, e)
+            return None, None
+        digest = hashlib.sha256(source).hexdigest()
+        # mtime过近的文件之后的写入可能无法被stat察觉，不记录其stat身份
+        if not FileHashCache.is_racy(st):
+            with self._lock:
+                self._files[file_path] = (ident, digest)
+                self._dirty = True
+        return digest, source
+
+    def _analyze_pending(self, pending: Dict[str, bytes]):
+        """解析尚无缓存结果的文件，数量较多时使用进程池"""
+        digests = list(pending)
+        sources = [pending[digest] for digest in digests]
+        if len(sources) < self.POOL_THRESHOLD:
+            metrics = _analyze_batch(sources)
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            batches = [sources[i:i + self.BATCH_SIZE] for i in range(0, len(sources), self.BATCH_SIZE)]
+            metrics = [result for batch in self._executor.map(_analyze_batch, batches) for result in batch]
+        with self._lock:
+            self._results.update(zip(digests, metrics))
+            self.parsed += len(digests)
+            self._dirty = True
+
+    @staticmethod
+    def _aggregate(metrics: List[Dict]) -> Dict:
+        """汇总一个技能各文件的指标并计算评分"""
+        result = {
+            "files": len(metrics),
+            "parse_errors": sum(1 for m in metrics if m["parse_error"]),
+            "lines": sum(m["lines"] for m in metrics),
+            "functions": sum(m["functions"] for m in metrics),
+            "max_complexity": max(m["max_complexity"] for m in metrics),
+            "bare_excepts": sum(m["bare_excepts"] for m in metrics)
+        }
+        result["score"] = score_metrics(result)
+        return result
+
+    def close(self):
+        """关闭进程池，丢弃尚未使用的预先分析结果"""
+        with self._lock:
+            self._prepared = {}
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def load(self):
+        """加载磁盘上的缓存，版本不符或文件损坏时从空缓存开始"""
+        with self._lock:
+            self._files = {}
+            self._results = {}
+            self._seen = set()
+            self._dirty = False
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                return
+            except (OSError, ValueError) as e:
+                logger.warning("Error loading code quality cache %s: %s", self.cache_file, e)
+                return
+
+            if not isinstance(data, dict) or data.get("version") != self.CACHE_VERSION:
+                return
+            self._results = data.get("results", {})
+            self._files = {path: (tuple(ident), digest) for path, (ident, digest) in data.get("files", {}).items()}
+
+    def save(self) -> bool:
+        """
+        将缓存原子地写回磁盘（临时文件 + rename），未设置缓存文件时不做任何事；
+        去掉已不存在的文件，只保留仍被某个文件引用的分析结果
+
+        Returns:
+            保存是否成功
+        """
+        if not self.cache_file:
+            return True
+        # 本进程中未见过的文件逐个确认是否仍然存在，每个文件只确认一次
+        with self._lock:
+            unseen = [path for path in self._files if path not in self._seen]
+        missing = [path for path in unseen if not os.path.exists(path)]
+        with self._lock:
+            self._seen.update(unseen)
+            for path in missing:
+                if self._files.pop(path, None) is not None:
+                    self._dirty = True
+            if not self._dirty:
+                return True
+            referenced = {digest for _, digest in self._files.values()}
+            data = {
+                "version": self.CACHE_VERSION,
+                "files": {path: [list(ident), digest] for path, (ident, digest) in self._files.items()},
+                "results": {digest: metrics for digest, metrics in self._results.items() if digest in referenced}
+            }
+            self._dirty = False
+
+        if save_atomically(self.cache_file, lambda f: json.dump(data, f, separators=(",", ":")), "code quality cache"):
+            return True
+        with self._lock:
+            self._dirty = True
+        return False
+
+    def get_stats(self) -> Dict:
+        """
+        获取分析器的统计
+
+        Returns:
+            包含已知文件数、缓存的分析结果数和本进程解析的文件数的字典
+        """
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "results": len(self._results),
+                "parsed": self.parsed
+            }
@@ -0,0 +1,198 @@
+import logging
+import operator
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from skill_trust_network.modules.atomic_file import save_atomically
+
+logger = logging.getLogger(__name__)
+
+class FactorScoreMatrix:
+    """
+    因素评分矩阵模块
+    以技能哈希为键保存各技能的各因素评分，修改权重时只需用新的权重向量
+    对整个矩阵做一次向量化计算，不必重新评估各因素
+    """
+
+    # 矩阵文件格式版本，格式变化时旧文件整体失效
+    FILE_VERSION = 1
+
+    def __init__(self, factors: Iterable[str], matrix_file: Optional[str] = None):
+        """
+        初始化因素评分矩阵
+
+        Args:
+            factors: 因素名称，决定矩阵列的顺序
+            matrix_file: 矩阵文件路径（.npz），为None时只保存在内存中
+        """
+        self.factors = tuple(factors)
+        # 从评分字典中按因素顺序取出一行评分
+        self._row_of = operator.itemgetter(*self.factors) if len(self.factors) > 1 else \
+            (lambda scores: (scores[self.factors[0]],))
+        self.matrix_file = matrix_file
+        # {技能哈希: (技能名称, 各因素评分元组)}
+        self._rows = {}
+        # {技能名称: 技能哈希}，技能内容变化后旧哈希的评分由新哈希替换
+        self._by_name = {}
+        # 由_rows生成的 (技能哈希列表, 技能名称列表, 评分矩阵)，记录变化后重新生成
+        self._arrays = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        if matrix_file:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def record(self, skill_hash: str, skill_name: Optional[str], scores: Dict):
+        """
+        记录一个技能的各因素评分
+
+        Args:
+            skill_hash: 技能哈希
+            skill_name: 技能名称
+            scores: 评分字典，需包含全部因素
+        """
+        entry = (skill_name, self._row_of(scores))
+        with self._lock:
+            if self._rows.get(skill_hash) != entry:
+                self._store(skill_hash, entry)
+
+    def record_rows(self, rows: Iterable[Tuple[str, Optional[str], Tuple]]):
+        """
+        批量记录评分行
+
+        Args:
+            rows: (技能哈希, 技能名称, 按factors顺序排列的评分元组) 的可迭代对象
+        """
+        with self._lock:
+            current = self._rows
+            for skill_hash, skill_name, row in rows:
+                entry = (skill_name, row)
+                if current.get(skill_hash) != entry:
+                    self._store(skill_hash, entry)
+
+    def _store(self, skill_hash: str, entry: Tuple):
+        """记录一行评分，同名技能的旧哈希被替换，调用方需持有锁"""
+        skill_name = entry[0]
+        if skill_name is not None:
+            previous = self._by_name.get(skill_name)
+            if previous is not None and previous != skill_hash:
+                self._rows.pop(previous, None)
+            self._by_name[skill_name] = skill_hash
+        self._rows[skill_hash] = entry
+        self._arrays = None
+        self._dirty = True
+
+    def remove(self, skill_hash: str):
+        """
+        删除一个技能的评分
+
+        Args:
+            skill_hash: 技能哈希
+        """
+        with self._lock:
+            entry = self._rows.pop(skill_hash, None)
+            if entry is None:
+                return
+            if self._by_name.get(entry[0]) == skill_hash:
+                del self._by_name[entry[0]]
+            self._arrays = None
+            self._dirty = True
+
+    def arrays(self) -> Tuple[List[str], List[Optional[str]], np.ndarray]:
+        """
+        获取矩阵形式的评分
+
+        Returns:
+            (技能哈希列表, 技能名称列表, 形状为 技能数 x 因素数 的评分矩阵)
+        """
+        with self._lock:
+            if self._arrays is None:
+                hashes = list(self._rows)
+                names = [self._rows[skill_hash][0] for skill_hash in hashes]
+                scores = np.array([self._rows[skill_hash][1] for skill_hash in hashes], dtype=np.float64)
+                self._arrays = (hashes, names, scores.reshape(len(hashes), len(self.factors)))
+            return self._arrays
+
+    def totals(self, weights: Dict[str, float]) -> np.ndarray:
+        """
+        用给定的权重计算全部技能的总评分（未取整）
+
+        按因素顺序逐列累加，浮点运算顺序与逐个计算时相同，取整后结果一致
+
+        Args:
+            weights: {因素名称: 权重}
+
+        Returns:
+            总评分数组，顺序与 arrays() 的技能顺序一致
+        """
+        _, _, scores = self.arrays()
+        total = np.zeros(len(scores))
+        for column, factor in enumerate(self.factors):
+            total += scores[:, column] * weights[factor]
+        return total
+
+    def load(self):
+        """加载磁盘上的矩阵，版本或因素不符、文件损坏时从空矩阵开始"""
+        with self._lock:
+            self._rows = {}
+            self._by_name = {}
+            self._arrays = None
+            self._dirty = False
+            try:
+                with np.load(self.matrix_file, allow_pickle=False) as data:
+                    if int(data["version"]) != self.FILE_VERSION or tuple(data["factors"].tolist()) != self.factors:
+                        return
+                    hashes = data["hashes"].tolist()
+                    names = data["names"].tolist()
+                    has_name = data["has_name"].tolist()
+                    scores = data["scores"]
+            except FileNotFoundError:
+                return
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Error loading factor matrix %s: %s", self.matrix_file, e)
+                return
+
+            names = [name if named else None for name, named in zip(names, has_name)]
+            for skill_hash, name, row in zip(hashes, names, map(tuple, scores.tolist())):
+                self._rows[skill_hash] = (name, row)
+                if name is not None:
+                    self._by_name[name] = skill_hash
+            # 文件中的矩阵可以直接使用，加载后第一次重新计算权重时不必再由_rows生成
+            if len(self._rows) == len(hashes):
+                self._arrays = (hashes, names, scores.reshape(len(hashes), len(self.factors)))
+
+    def save(self) -> bool:
+        """
+        将矩阵原子地写回磁盘（临时文件 + rename），未设置矩阵文件时不做任何事
+
+        Returns:
+            保存是否成功
+        """
+        if not self.matrix_file:
+            return True
+        with self._lock:
+            if not self._dirty:
+                return True
+            self._dirty = False
+        hashes, names, scores = self.arrays()
+
+        def write(f):
+            np.savez_compressed(
+                f,
+                version=np.array(self.FILE_VERSION),
+                factors=np.array(self.factors),
+                hashes=np.array(hashes, dtype=str),
+                names=np.array([name or "" for name in names], dtype=str),
+                has_name=np.array([name is not None for name in names], dtype=bool),
+                scores=scores
+            )
+
+        if save_atomically(self.matrix_file, write, "factor matrix", binary=True):
+            return True
+        with self._lock:
+            self._dirty = True
+        return False
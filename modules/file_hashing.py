@@ -0,0 +1,81 @@
+"""
+文件哈希后端
+小文件使用可复用缓冲区的readinto读取，大文件使用mmap整体交给hashlib，
+避免逐块分配新的bytes对象
+"""
+
+import os
+import mmap
+import hashlib
+import threading
+from typing import Sequence
+
+# 读取缓冲区大小
+BUFFER_SIZE = 64 * 1024
+
+# 不小于该大小的文件使用mmap
+MMAP_THRESHOLD = 1024 * 1024
+
+_local = threading.local()
+
+
+def _get_buffer() -> memoryview:
+    """获取当前线程复用的读取缓冲区"""
+    view = getattr(_local, "view", None)
+    if view is None:
+        view = memoryview(bytearray(BUFFER_SIZE))
+        _local.view = view
+    return view
+
+
+def update_hashers_from_file(file_path: str, hashers: Sequence, mmap_threshold: int = MMAP_THRESHOLD) -> int:
+    """
+    读取文件内容并依次更新多个哈希对象
+
+    Args:
+        file_path: 文件路径
+        hashers: hashlib哈希对象序列，每个都会收到完整的文件内容
+        mmap_threshold: 使用mmap的文件大小阈值，0表示从不使用mmap
+
+    Returns:
+        读取的字节数
+    """
+    with open(file_path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if mmap_threshold and size >= mmap_threshold:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for hasher in hashers:
+                        hasher.update(mm)
+                    return len(mm)
+            except (OSError, ValueError):
+                # 部分文件系统不支持mmap，退回普通读取
+                f.seek(0)
+
+        view = _get_buffer()
+        total = 0
+        while True:
+            n = f.readinto(view)
+            if not n:
+                break
+            chunk = view[:n]
+            for hasher in hashers:
+                hasher.update(chunk)
+            total += n
+        return total
+
+
+def hash_file(file_path: str, mmap_threshold: int = MMAP_THRESHOLD) -> str:
+    """
+    计算单个文件内容的SHA-256摘要
+
+    Args:
+        file_path: 文件路径
+        mmap_threshold: 使用mmap的文件大小阈值，0表示从不使用mmap
+
+    Returns:
+        十六进制摘要
+    """
+    hasher = hashlib.sha256()
+    update_hashers_from_file(file_path, (hasher,), mmap_threshold)
+    return hasher.hexdigest()
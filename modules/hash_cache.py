@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from skill_trust_network.modules.atomic_file import save_atomically
+
+logger = logging.getLogger(__name__)
+
+class FileHashCache:
+    """
+    文件哈希缓存模块
+    以文件路径和stat身份(inode, size, mtime_ns)为键，持久化保存文件摘要，
+    使未变化的文件无需重新读取即可复用摘要
+    """
+
+    # 缓存文件格式版本，格式变化时旧缓存整体失效
+    CACHE_VERSION = 1
+
+    # mtime距哈希时刻过近的文件不写入缓存：同一时间戳粒度内的后续写入无法被stat察觉
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, cache_file: str):
+        """
+        初始化文件哈希缓存
+
+        Args:
+            cache_file: 缓存文件路径
+        """
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self._files = {}
+        self._trees = {}
+        self._merkle = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+        """
+        提取文件的stat身份
+
+        Args:
+            st: 文件的stat结果
+
+        Returns:
+            (inode, size, mtime_ns) 元组
+        """
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    @classmethod
+    def is_racy(cls, st: os.stat_result) -> bool:
+        """
+        判断文件是否处于不可安全缓存的时间窗口内
+
+        Args:
+            st: 文件的stat结果
+
+        Returns:
+            文件mtime过近时返回True
+        """
+        return time.time_ns() - st.st_mtime_ns < cls.RACY_WINDOW_NS
+
+    def load(self):
+        """加载磁盘上的缓存，版本不符或文件损坏时从空缓存开始"""
+        with self._lock:
+            self._files = {}
+            self._trees = {}
+            self._merkle = {}
+            self._dirty = False
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                return
+            except (OSError, ValueError) as e:
+                logger.warning("Error loading hash cache %s: %s", self.cache_file, e)
+                return
+
+            if not isinstance(data, dict) or data.get("version") != self.CACHE_VERSION:
+                return
+            self._files = data.get("files", {})
+            self._trees = data.get("trees", {})
+            self._merkle = data.get("merkle", {})
+
+    def save(self) -> bool:
+        """
+        将缓存原子地写回磁盘（临时文件 + rename）
+
+        Returns:
+            保存是否成功
+        """
+        with self._lock:
+            if not self._dirty:
+                return True
+            data = {
+                "version": self.CACHE_VERSION,
+                "files": self._files,
+                "trees": self._trees,
+                "merkle": self._merkle
+            }
+            self._dirty = False
+
+        if save_atomically(self.cache_file, lambda f: json.dump(data, f, separators=(",", ":")), "hash cache"):
+            return True
+        with self._lock:
+            self._dirty = True
+        return False
+
+    def get_file_digest(self, file_path: str, st: os.stat_result) -> Optional[str]:
+        """
+        查询单个文件的缓存摘要
+
+        Args:
+            file_path: 文件路径
+            st: 文件当前的stat结果
+
+        Returns:
+            stat身份一致时返回缓存的摘要，否则返回None
+        """
+        with self._lock:
+            entry = self._files.get(file_path)
+            if entry is not None and tuple(entry[:3]) == self.stat_key(st):
+                self.hits += 1
+                return entry[3]
+            self.misses += 1
+            return None
+
+    def put_file_digest(self, file_path: str, st: os.stat_result, digest: str):
+        """
+        记录单个文件的摘要
+
+        Args:
+            file_path: 文件路径
+            st: 计算摘要前获取的stat结果
+            digest: 文件摘要
+        """
+        if self.is_racy(st):
+            return
+        with self._lock:
+            self._files[file_path] = list(self.stat_key(st)) + [digest]
+            self._dirty = True
+
+    def get_tree_digest(self, skill_path: str, signature: str) -> Optional[str]:
+        """
+        查询整个技能目录的缓存摘要
+
+        Args:
+            skill_path: 技能目录路径
+            signature: 目录内全部文件的stat身份签名
+
+        Returns:
+            签名一致时返回缓存的摘要，否则返回None
+        """
+        with self._lock:
+            entry = self._trees.get(skill_path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put_tree_digest(self, skill_path: str, signature: str, digest: str):
+        """
+        记录整个技能目录的摘要
+
+        Args:
+            skill_path: 技能目录路径
+            signature: 目录内全部文件的stat身份签名
+            digest: 技能摘要
+        """
+        with self._lock:
+            self._trees[skill_path] = [signature, digest]
+            self._dirty = True
+
+    def get_merkle_tree(self, skill_path: str) -> Optional[Dict]:
+        """
+        获取技能目录上一次构建的Merkle树
+
+        Args:
+            skill_path: 技能目录路径
+
+        Returns:
+            Merkle树根节点，不存在时返回None
+        """
+        with self._lock:
+            return self._merkle.get(skill_path)
+
+    def put_merkle_tree(self, skill_path: str, tree: Dict):
+        """
+        记录技能目录的Merkle树
+
+        Args:
+            skill_path: 技能目录路径
+            tree: Merkle树根节点
+        """
+        with self._lock:
+            self._merkle[skill_path] = tree
+            self._dirty = True
+
+    def invalidate(self, path: str):
+        """
+        使某个文件或技能目录的缓存失效
+
+        Args:
+            path: 文件路径或技能目录路径
+        """
+        with self._lock:
+            if self._files.pop(path, None) is not None:
+                self._dirty = True
+            if self._trees.pop(path, None) is not None:
+                self._dirty = True
+            if self._merkle.pop(path, None) is not None:
+                self._dirty = True
+
+    def clear(self):
+        """清空全部缓存条目"""
+        with self._lock:
+            self._files = {}
+            self._trees = {}
+            self._merkle = {}
+            self._dirty = True
+
+    def get_stats(self) -> Dict:
+        """
+        获取缓存命中统计
+
+        Returns:
+            包含命中数、未命中数、命中率和条目数的字典
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+                "file_entries": len(self._files),
+                "tree_entries": len(self._trees),
+                "merkle_entries": len(self._merkle)
+            }
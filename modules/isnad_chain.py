@@ -4,65 +4,241 @@ Isnad Chain (传承链) 验证模块
 基于@eudaemon_0提出的概念，实现技能的传承链验证
 """
 
+import os
+import math
 import hashlib
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from skill_trust_network.modules.chain_store import (
+    ChainStore, JSONChainStore, AppendLogChainStore, GroupCommitter, GENESIS_DIGEST, link_digest
+)
+from skill_trust_network.modules.sqlite_chain_store import SQLiteChainStore
+from skill_trust_network.modules.lazy_chain_store import LazyJSONChainStore
+from skill_trust_network.modules.chain_snapshot import BinaryChainStore, read_snapshot, write_snapshot
+
+DEFAULT_CHAIN_FILE = "/home/admin/clawd/skill_trust_network/data/isnad_chains.json"
 
 class IsnadChain:
     """技能传承链验证类"""
-    
-    def __init__(self):
-        self.chain_file = "/home/admin/clawd/skill_trust_network/data/isnad_chains.json"
+
+    # 可选的存储后端：json为原有的整文件JSON，lazy为带偏移索引、按需解析的同格式JSON，
+    # binary为二进制快照，log为追加日志+快照，sqlite为SQLite数据库
+    STORAGE_BACKENDS = ("json", "lazy", "binary", "log", "sqlite")
+
+    def __init__(self, chain_file: str = DEFAULT_CHAIN_FILE, storage: Union[str, ChainStore] = "json",
+                 group_commit_window: Optional[float] = None, flush_interval: Optional[float] = None):
+        """
+        初始化传承链
+
+        Args:
+            chain_file: 传承链数据文件路径
+            storage: 存储后端名称，或自定义的ChainStore实例
+            group_commit_window: 组提交时间窗口（秒），设置后并发的追加会在窗口内
+                                 合并为一次持久化；None表示每次追加立即持久化
+            flush_interval: json/lazy/binary存储的后台刷写间隔（秒），设置后追加立即返回，
+                            由后台线程合并写入；None表示每次追加立即写入
+        """
+        self.chain_file = chain_file
+        if isinstance(storage, ChainStore):
+            self.store = storage
+        elif storage == "json":
+            self.store = JSONChainStore(chain_file, flush_interval)
+        elif storage == "lazy":
+            self.store = LazyJSONChainStore(chain_file, flush_interval)
+        elif storage == "binary":
+            self.store = BinaryChainStore(os.path.splitext(chain_file)[0] + ".isnb", chain_file, flush_interval)
+        elif storage == "log":
+            self.store = AppendLogChainStore(chain_file)
+        elif storage == "sqlite":
+            self.store = SQLiteChainStore(os.path.splitext(chain_file)[0] + ".sqlite3", chain_file)
+        else:
+            raise ValueError(f"Unsupported isnad storage backend: {storage}")
         self.load_chains()
-    
+        self.group_committer = GroupCommitter(self.store, group_commit_window) \
+            if group_commit_window is not None else None
+
+    @property
+    def chains(self) -> Dict:
+        """全部传承链，{skill_hash: chain}"""
+        return self.store.chains
+
     def load_chains(self):
         """加载现有的传承链数据"""
-        try:
-            with open(self.chain_file, 'r', encoding='utf-8') as f:
-                self.chains = json.load(f)
-        except FileNotFoundError:
-            self.chains = {}
-            self.save_chains()
-    
+        self.store.load()
+
     def save_chains(self):
-        """保存传承链数据"""
-        # 确保目录存在
-        import os
-        os.makedirs(os.path.dirname(self.chain_file), exist_ok=True)
-        
-        with open(self.chain_file, 'w', encoding='utf-8') as f:
-            json.dump(self.chains, f, indent=2, ensure_ascii=False)
-    
+        """保存传承链数据，与其他进程已写入的内容合并"""
+        self.store.save()
+
+    def export_chains(self, output_path: str):
+        """
+        以JSON格式导出全部传承链
+
+        Args:
+            output_path: 输出文件路径
+        """
+        self.store.export_json(output_path)
+
+    def import_chains(self, input_path: str):
+        """
+        从JSON格式导入传承链，替换当前全部内容
+
+        Args:
+            input_path: JSON文件路径
+        """
+        self.store.import_json(input_path)
+
+    def export_snapshot(self, output_path: str):
+        """
+        以二进制快照格式导出全部传承链
+
+        Args:
+            output_path: 输出文件路径
+        """
+        write_snapshot(dict(self.store.chains.items()), output_path)
+
+    def import_snapshot(self, input_path: str):
+        """
+        从二进制快照导入传承链，替换当前全部内容
+
+        Args:
+            input_path: 快照文件路径
+        """
+        self.store.replace_all(read_snapshot(input_path))
+
+    def export_delta(self, since_seq: int = 0) -> Dict:
+        """
+        增量导出本地序号大于since_seq的审计记录，用于在节点之间复制传承链
+
+        每条记录在写入本地存储时分配单调递增的序号（不参与摘要），导出只读取水位之后的记录，
+        开销与新增记录数量成正比。接收方为每个来源节点保存上次导入的seq，
+        即按节点的向量时钟，下次从该水位继续导出
+
+        Args:
+            since_seq: 水位，上一次导出结果中的seq；0表示导出全部记录
+
+        Returns:
+            {"since": 起始水位, "seq": 新的水位,
+             "records": [{"seq", "skill_hash", "created_at", "record"}]}
+        """
+        records = []
+        created = {}
+        seq = since_seq
+        for skill_hash, record in self.store.records_since(since_seq):
+            if skill_hash not in created:
+                created[skill_hash] = self.store.get_chain_header(skill_hash)["created_at"]
+            seq = record["seq"]
+            records.append({
+                "seq": seq,
+                "skill_hash": skill_hash,
+                "created_at": created[skill_hash],
+                "record": record
+            })
+        return {"since": since_seq, "seq": seq, "records": records}
+
+    def import_delta(self, delta: Dict) -> int:
+        """
+        导入其他节点导出的增量记录
+
+        记录按内容摘要去重，同一份增量重复导入不会产生重复记录；新记录链接到本地传承链的末尾，
+        并分配本地序号
+
+        Args:
+            delta: export_delta 的返回值
+
+        Returns:
+            新增的记录数量
+        """
+        items = [(entry["skill_hash"], dict(entry["record"]), entry["created_at"]) for entry in delta["records"]]
+        items = self.store.new_records(items)
+        if items:
+            self.store.append_records(items)
+        return len(items)
+
+    def close(self):
+        """提交未完成的组提交、刷写尚未持久化的追加并关闭存储后端"""
+        if self.group_committer is not None:
+            self.group_committer.close()
+            self.group_committer = None
+        self.store.close()
+
     def create_skill_hash(self, skill_metadata: Dict) -> str:
         """为技能创建唯一哈希值"""
         # 使用技能的关键信息创建哈希
         hash_input = f"{skill_metadata.get('name', '')}:{skill_metadata.get('version', '')}:{skill_metadata.get('author', '')}"
         return hashlib.sha256(hash_input.encode()).hexdigest()
     
-    def add_audit_to_chain(self, skill_hash: str, auditor: str, audit_result: Dict) -> bool:
-        """向传承链添加审计记录"""
-        if skill_hash not in self.chains:
-            self.chains[skill_hash] = {
-                "skill_hash": skill_hash,
-                "created_at": datetime.now().isoformat(),
-                "audit_chain": []
+    def add_audit_to_chain(self, skill_hash: str, auditor: str, audit_result: Dict,
+                           skill_metadata: Optional[Dict] = None) -> bool:
+        """
+        向传承链添加审计记录
+
+        Args:
+            skill_hash: 技能哈希
+            auditor: 审计员
+            audit_result: 审计结果
+            skill_metadata: 技能元数据，提供name/version用于名称索引；
+                            省略时从审计报告的skill_info中读取
+
+        Returns:
+            是否添加成功
+        """
+        return self.add_audits_to_chain([(skill_hash, auditor, audit_result, skill_metadata)]) == 1
+
+    def add_audits_to_chain(self, audits: Iterable[Tuple]) -> int:
+        """
+        批量向传承链添加审计记录，全部记录在一次写入/事务中持久化
+
+        Args:
+            audits: (技能哈希, 审计员, 审计结果) 或 (技能哈希, 审计员, 审计结果, 技能元数据)
+                    的可迭代对象
+
+        Returns:
+            添加的记录数量
+        """
+        items = []
+        for audit in audits:
+            skill_hash, auditor, audit_result = audit[:3]
+            skill_metadata = audit[3] if len(audit) > 3 else None
+            now = datetime.now().isoformat()
+            audit_record = {
+                "auditor": auditor,
+                "timestamp": now,
+                "result": audit_result,
+                "trust_score": audit_result.get("total_score", 0)
             }
-        
-        audit_record = {
-            "auditor": auditor,
-            "timestamp": datetime.now().isoformat(),
-            "result": audit_result,
-            "trust_score": audit_result.get("total_score", 0)
-        }
-        
-        self.chains[skill_hash]["audit_chain"].append(audit_record)
-        self.save_chains()
-        return True
-    
-    def verify_isnad_chain(self, skill_hash: str) -> Dict:
-        """验证技能的传承链"""
-        if skill_hash not in self.chains:
+            if skill_metadata and skill_metadata.get("name"):
+                audit_record["skill_name"] = skill_metadata["name"]
+                audit_record["skill_version"] = skill_metadata.get("version")
+            items.append((skill_hash, audit_record, now))
+
+        if not items:
+            return 0
+        if self.group_committer is not None:
+            self.group_committer.submit(items)
+        else:
+            self.store.append_records(items)
+        return len(items)
+
+    def verify_isnad_chain(self, skill_hash: str, full: bool = False) -> Dict:
+        """
+        验证技能的传承链
+
+        每条审计记录都链接到前一条记录的摘要；校验只检查上次检查点之后新增的记录，
+        并由检查点和新增记录重新累计评分，与运行聚合一致时平均评分直接由运行聚合得出
+
+        Args:
+            skill_hash: 技能哈希
+            full: 是否忽略检查点，从第一条记录开始重新校验整条链
+
+        Returns:
+            验证结果
+        """
+        header = self.store.get_chain_header(skill_hash)
+        if header is None:
             return {
                 "verified": False,
                 "message": "未找到该技能的传承链记录",
@@ -71,10 +247,9 @@ class IsnadChain:
                 "auditors": []
             }
         
-        chain = self.chains[skill_hash]
-        audit_chain = chain["audit_chain"]
+        chain_length = header["audit_count"]
         
-        if not audit_chain:
+        if not chain_length:
             return {
                 "verified": False,
                 "message": "传承链为空",
@@ -83,26 +258,81 @@ class IsnadChain:
                 "auditors": []
             }
         
-        # 计算平均信任评分
-        total_score = sum(record["trust_score"] for record in audit_chain)
-        avg_score = total_score / len(audit_chain)
+        failure = self._verify_new_records(skill_hash, header, full)
+        if failure is not None:
+            result = {
+                "verified": False,
+                "message": failure["message"],
+                "chain_length": chain_length,
+                "average_trust_score": 0,
+                "auditors": []
+            }
+            if "tampered_index" in failure:
+                result["tampered_index"] = failure["tampered_index"]
+            return result
         
-        # 获取审计员列表
-        auditors = [record["auditor"] for record in audit_chain]
+        # 平均信任评分来自已与记录核对过的运行聚合
+        avg_score = header["score_sum"] / chain_length
         
         return {
             "verified": True,
-            "message": f"传承链验证成功，包含{len(audit_chain)}次审计记录",
-            "chain_length": len(audit_chain),
+            "message": f"传承链验证成功，包含{chain_length}次审计记录",
+            "chain_length": chain_length,
             "average_trust_score": round(avg_score, 2),
-            "auditors": auditors,
-            "latest_audit": audit_chain[-1]["timestamp"]
+            "auditors": self.store.get_auditors(skill_hash),
+            "latest_audit": header["latest_timestamp"]
         }
-    
-    def get_skill_reputation(self, skill_name: str) -> Dict:
-        """获取技能的整体声誉评分"""
-        # 这里需要遍历所有技能找到匹配的
-        # 简化版本：返回基于传承链的声誉
+
+    def _verify_new_records(self, skill_hash: str, header: Dict, full: bool = False) -> Optional[Dict]:
+        """
+        校验检查点之后新增的记录链接，并由检查点的评分累计和新增记录的评分核对运行聚合，
+        全部通过时推进检查点
+
+        Args:
+            skill_hash: 技能哈希
+            header: 传承链的聚合信息
+            full: 是否从第一条记录开始校验
+
+        Returns:
+            失败原因（message，记录被篡改时还有tampered_index），全部通过时返回None
+        """
+        chain_length = header["audit_count"]
+        # 没有评分累计的检查点（旧格式）不可信，从第一条记录开始校验
+        if full or header.get("verified_score_sum") is None:
+            start, prev, score_sum = 0, GENESIS_DIGEST, 0
+        else:
+            start, prev, score_sum = header["verified_count"], header["verified_digest"], header["verified_score_sum"]
+        index = start
+        for record in self.store.get_records(skill_hash, start):
+            if record.get("prev_digest") != prev or record.get("digest") != link_digest(prev, record):
+                return _tampered(index)
+            prev = record["digest"]
+            score_sum += record.get("trust_score", 0)
+            index += 1
+
+        if index != chain_length or prev != header["head_digest"]:
+            return _tampered(min(index, chain_length - 1))
+        if not math.isclose(score_sum, header["score_sum"], rel_tol=1e-9, abs_tol=1e-9):
+            return {"message": "传承链校验失败：评分聚合与审计记录不符"}
+
+        if header["verified_count"] != chain_length or header.get("verified_score_sum") is None:
+            self.store.update_checkpoint(skill_hash, chain_length, prev, score_sum)
+        return None
+
+    def get_skill_reputation(self, skill_name: str, skill_version: Optional[str] = None) -> Dict:
+        """
+        获取技能的整体声誉评分
+
+        通过名称反向索引定位技能的传承链，由各链的运行聚合汇总，
+        不需要遍历全部传承链
+
+        Args:
+            skill_name: 技能名称
+            skill_version: 技能版本，None表示汇总所有版本
+
+        Returns:
+            声誉数据字典
+        """
         reputation_data = {
             "skill_name": skill_name,
             "isnad_verified": False,
@@ -110,10 +340,98 @@ class IsnadChain:
             "audit_count": 0,
             "risk_level": "未知"
         }
-        
-        # 在实际实现中，这里会查询具体的技能哈希
+        if skill_version is not None:
+            reputation_data["skill_version"] = skill_version
+
+        audit_count = 0
+        score_sum = 0
+        verified = True
+        for skill_hash in self.store.find_chains(skill_name, skill_version):
+            header = self.store.get_chain_header(skill_hash)
+            if not header or not header["audit_count"]:
+                continue
+            audit_count += header["audit_count"]
+            score_sum += header["score_sum"]
+            # 只校验上次检查点之后新增的记录
+            if self._verify_new_records(skill_hash, header) is not None:
+                verified = False
+
+        if not audit_count:
+            return reputation_data
+
+        community_trust = round(score_sum / audit_count, 2)
+        risk_level = "低风险"
+        if community_trust < 40:
+            risk_level = "高风险"
+        elif community_trust < 60:
+            risk_level = "中风险"
+
+        reputation_data.update({
+            "isnad_verified": verified,
+            "community_trust": community_trust,
+            "audit_count": audit_count,
+            "risk_level": risk_level
+        })
         return reputation_data
 
+    def query_audits(self, auditor: Optional[str] = None, since: Union[str, datetime, None] = None,
+                     until: Union[str, datetime, None] = None, offset: int = 0,
+                     limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        按审计员和时间范围查询审计记录，结果按时间顺序逐条产出
+
+        例如最近7天审计员X的全部审计：
+        query_audits("X", since=datetime.now() - timedelta(days=7))
+
+        Args:
+            auditor: 审计员，None表示所有审计员
+            since: 起始时间（含），datetime或ISO格式字符串
+            until: 截止时间（不含），datetime或ISO格式字符串
+            offset: 跳过的记录数，用于分页
+            limit: 最多返回的记录数，None表示不限
+
+        Returns:
+            审计记录的迭代器，每条记录附带skill_hash字段
+        """
+        results = self.store.query_audits(auditor, _iso(since), _iso(until))
+        stop = offset + limit if limit is not None else None
+        for skill_hash, record in islice(results, offset, stop):
+            audit = dict(record)
+            audit["skill_hash"] = skill_hash
+            yield audit
+
+    def stale_skills(self, older_than_days: float) -> Iterator[Dict]:
+        """
+        查询最新一次审计早于指定天数的技能，按最新审计时间从早到晚产出
+
+        Args:
+            older_than_days: 天数
+
+        Returns:
+            包含skill_hash、skill_name、skill_version、latest_audit、audit_count的字典迭代器
+        """
+        before = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+        for skill_hash in self.store.stale_chains(before):
+            header = self.store.get_chain_header(skill_hash)
+            yield {
+                "skill_hash": skill_hash,
+                "skill_name": header["skill_name"],
+                "skill_version": header["skill_version"],
+                "latest_audit": header["latest_timestamp"],
+                "audit_count": header["audit_count"]
+            }
+
+
+def _tampered(index: int) -> Dict:
+    """第index条记录被篡改时的失败原因"""
+    return {"message": f"传承链校验失败：第{index + 1}条审计记录被篡改", "tampered_index": index}
+
+
+def _iso(value: Union[str, datetime, None]) -> Optional[str]:
+    """把datetime转换为与审计记录时间戳相同的ISO格式"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
 def main():
     """测试IsnadChain功能"""
     isnad = IsnadChain()
@@ -135,7 +453,7 @@ def main():
         "compliance_status": True
     }
     
-    isnad.add_audit_to_chain(skill_hash, "xiaomi_cat", test_audit)
+    isnad.add_audit_to_chain(skill_hash, "xiaomi_cat", test_audit, test_skill)
     print("审计记录已添加到传承链")
     
     # 验证传承链
@@ -0,0 +1,486 @@
+"""
+按需加载的Isnad Chain存储后端
+数据文件保持原有的整文件JSON格式，旁边维护一个偏移索引文件，
+记录每条传承链在数据文件中的字节范围和聚合信息；启动时只读取索引，
+某条传承链第一次被访问时才解析它。另有一个记录摘要文件保存每条记录的本地序号和内容摘要，
+增量导出和复制去重只读取它，不必解析全部传承链
+"""
+
+import os
+import re
+import json
+import threading
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from skill_trust_network.modules.atomic_file import atomic_write
+from skill_trust_network.modules.audit_index import AuditIndex
+from skill_trust_network.modules.chain_store import (
+    BackgroundFlusher, ChainStore, FileLock, link_record, new_chain, record_skill_identity, sequence_records,
+    stored_content_digest, upgrade_chain, _close_at_exit, _file_signature
+)
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class LazyJSONChainStore(ChainStore):
+    """
+    按需加载的JSON存储
+
+    偏移索引以数据文件的inode、大小和修改时间为键，数据文件被其他程序改写后自动重建。
+    保存时未加载的传承链直接复制原有字节，只有加载过并修改的传承链需要重新序列化。
+    与JSONChainStore一样，写入时持有咨询锁并与其他进程的写入合并
+
+    数据文件仍是整文件JSON，传承链增长后无法原地追加，每次保存都会重写整个数据文件和偏移索引，
+    追加的代价与文件大小成正比。这个后端面向读多写少的场景；大量写入审计记录时应使用
+    追加日志（"log"，AppendLogChainStore）或SQLite（"sqlite"）后端
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, chain_file: str, flush_interval: Optional[float] = None):
+        """
+        初始化按需加载的JSON存储
+
+        Args:
+            chain_file: 传承链JSON文件路径，偏移索引保存在同名的 .index.json 文件中，
+                        记录摘要保存在同名的 .records.json 文件中
+            flush_interval: 后台刷写间隔（秒），None表示每次追加立即持久化
+        """
+        self.chain_file = chain_file
+        self.file_lock = FileLock(chain_file + ".lock")
+        self.flush_interval = flush_interval
+        base = os.path.splitext(chain_file)[0]
+        self.index_file = base + ".index.json"
+        self.records_file = base + ".records.json"
+        self.chains = _LazyChainsView(self)
+        # {技能哈希: (起始字节, 结束字节)}，保持数据文件中的顺序
+        self._offsets = {}
+        # {技能哈希: 不含审计记录的聚合信息}
+        self._headers = {}
+        # 已解析的传承链
+        self._loaded = {}
+        # 需要重新序列化的传承链
+        self._dirty = set()
+        # 反向索引 {技能名称: {技能版本: [技能哈希]}}
+        self.name_index = {}
+        # 最新审计时间的索引在打开时由聚合信息建立；审计记录的索引在第一次查询时建立，
+        # 此时需要解析全部传承链
+        self.audit_index = AuditIndex()
+        self._records_indexed = False
+        # 数据文件中各传承链的 {技能哈希: [[本地序号, 内容摘要]]}，第一次需要时读取记录摘要文件
+        self._saved_keys = None
+        # 按序号排序的 [(本地序号, 技能哈希, 位置)] 和 {(技能哈希, 内容摘要)}，由记录摘要建立
+        self._seq_index = None
+        self._content_keys = None
+        # 最后分配的本地记录序号，保存在偏移索引中
+        self.last_seq = 0
+        # 尚未持久化的追加
+        self._pending = []
+        self._file = None
+        self._lock = threading.RLock()
+        self._flusher = None
+
+    def load(self):
+        with self._lock, self.file_lock:
+            self._open()
+        if self.flush_interval is not None and self._flusher is None:
+            self._flusher = BackgroundFlusher(self.save, self.flush_interval)
+            _close_at_exit.add(self)
+
+    def save(self):
+        with self._lock, self.file_lock:
+            current = _file_signature(self._file.fileno()) if self._file is not None else None
+            if _file_signature(self.chain_file) != current:
+                # 其他进程已更新数据文件：重新打开，再把本进程尚未持久化的追加接到其后
+                pending = self._pending
+                self._open()
+                self._apply_records(self.new_records(pending))
+
+            order = list(self._offsets)
+            order.extend(skill_hash for skill_hash in self._loaded if skill_hash not in self._offsets)
+            keys = {skill_hash: self._chain_keys(skill_hash) for skill_hash in order}
+            offsets = {}
+
+            def write(f):
+                if not order:
+                    f.write(b"{}")
+                    return
+                position = f.write(b"{\n")
+                for i, skill_hash in enumerate(order):
+                    prefix = ("  " + json.dumps(skill_hash) + ": ").encode("utf-8")
+                    position += f.write(prefix)
+                    body = self._chain_bytes(skill_hash)
+                    offsets[skill_hash] = (position, position + len(body))
+                    position += f.write(body)
+                    position += f.write(b",\n" if i < len(order) - 1 else b"\n")
+                f.write(b"}")
+
+            atomic_write(self.chain_file, write, binary=True)
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.chain_file, 'rb')
+            self._offsets = offsets
+            self._saved_keys = keys
+            for skill_hash in self._dirty:
+                self._headers[skill_hash] = _chain_header(self._loaded[skill_hash])
+            self._dirty = set()
+            self._pending = []
+            self._write_index()
+
+    def get_chain(self, skill_hash: str) -> Optional[Dict]:
+        with self._lock:
+            chain = self._loaded.get(skill_hash)
+            if chain is None and skill_hash in self._offsets:
+                chain = self._read_chain(skill_hash)
+                self._loaded[skill_hash] = chain
+            return chain
+
+    def get_chain_header(self, skill_hash: str) -> Optional[Dict]:
+        with self._lock:
+            return self._loaded.get(skill_hash) or self._headers.get(skill_hash)
+
+    def get_records(self, skill_hash: str, start: int = 0) -> List[Dict]:
+        chain = self.get_chain(skill_hash)
+        return chain["audit_chain"][start:] if chain else []
+
+    def get_auditors(self, skill_hash: str) -> List[str]:
+        chain = self.get_chain(skill_hash)
+        return [record["auditor"] for record in chain["audit_chain"]] if chain else []
+
+    def find_chains(self, skill_name: str, skill_version: Optional[str] = None) -> List[str]:
+        versions = self.name_index.get(skill_name)
+        if not versions:
+            return []
+        if skill_version is not None:
+            return list(versions.get(skill_version, ()))
+        return [skill_hash for hashes in versions.values() for skill_hash in hashes]
+
+    def query_audits(self, auditor: Optional[str] = None, since: Optional[str] = None,
+                     until: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        self._index_records()
+        for skill_hash, position in self.audit_index.query(auditor, since, until):
+            yield skill_hash, self.get_chain(skill_hash)["audit_chain"][position]
+
+    def records_since(self, seq: int) -> Iterator[Tuple[str, Dict]]:
+        with self._lock:
+            if self._pending:
+                # 尚未持久化的追加在与其他进程的写入合并时会重新编号，导出前先持久化
+                self.save()
+            self._index_contents()
+            entries = self._seq_index[bisect_left(self._seq_index, (seq + 1,)):]
+        # 只解析含有新记录的传承链，未加载的传承链不放入缓存
+        chains = {}
+        for _, skill_hash, position in entries:
+            chain = chains.get(skill_hash)
+            if chain is None:
+                with self._lock:
+                    chain = self._loaded.get(skill_hash) or self._read_chain(skill_hash)
+                chains[skill_hash] = chain
+            yield skill_hash, chain["audit_chain"][position]
+
+    def has_content(self, skill_hash: str, content_digest: str) -> bool:
+        with self._lock:
+            self._index_contents()
+            return (skill_hash, content_digest) in self._content_keys
+
+    def stale_chains(self, before: str) -> Iterator[str]:
+        return self.audit_index.stale(before)
+
+    def update_checkpoint(self, skill_hash: str, verified_count: int, verified_digest: str,
+                          verified_score_sum: float):
+        with self._lock:
+            chain = self.get_chain(skill_hash)
+            if chain is not None:
+                chain["verified_count"] = verified_count
+                chain["verified_digest"] = verified_digest
+                chain["verified_score_sum"] = verified_score_sum
+                self._dirty.add(skill_hash)
+
+    def append_records(self, items: Iterable[Tuple[str, Dict, str]]):
+        items = list(items)
+        with self._lock:
+            self._apply_records(items)
+            self._pending.extend(items)
+            if self._flusher is None:
+                self.save()
+        if self._flusher is not None:
+            self._flusher.notify()
+
+    def replace_all(self, chains: Dict):
+        with self._lock, self.file_lock:
+            # 先与磁盘同步，避免save时再合并
+            self._open()
+            self._offsets, self._headers = {}, {}
+            self._loaded = {skill_hash: upgrade_chain(chain) for skill_hash, chain in chains.items()}
+            self.last_seq = sequence_records(self._loaded.values())
+            self._dirty = set(self._loaded)
+            self.save()
+            self._rebuild_indexes()
+
+    def close(self):
+        _close_at_exit.discard(self)
+        if self._flusher is not None:
+            self._flusher.close()
+            self._flusher = None
+        with self._lock:
+            if self._pending:
+                self.save()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def iter_hashes(self) -> Iterator[str]:
+        """按数据文件中的顺序产出技能哈希，尚未保存的新传承链排在最后"""
+        with self._lock:
+            hashes = list(self._offsets)
+            hashes.extend(skill_hash for skill_hash in self._loaded if skill_hash not in self._offsets)
+        return iter(hashes)
+
+    def count(self) -> int:
+        """传承链数量"""
+        with self._lock:
+            return len(self._offsets) + sum(1 for skill_hash in self._loaded if skill_hash not in self._offsets)
+
+    def _open(self):
+        """打开数据文件并读取（必要时重建）偏移索引"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._offsets, self._headers, self._loaded, self._dirty = {}, {}, {}, set()
+        self._pending = []
+        self.name_index = {}
+        self.audit_index = AuditIndex()
+        self._records_indexed = False
+        self._saved_keys = self._seq_index = self._content_keys = None
+        self.last_seq = 0
+        try:
+            self._file = open(self.chain_file, 'rb')
+        except FileNotFoundError:
+            self.save()
+            return
+
+        if not self._load_index():
+            self._rebuild_index()
+            if self._dirty:
+                # 原有格式的传承链已升级，写回后索引随之更新
+                self.save()
+            else:
+                self._write_index()
+        self._rebuild_indexes()
+
+    def _apply_records(self, items: List[Tuple[str, Dict, str]]):
+        """链接并应用追加的记录，更新运行聚合"""
+        for skill_hash, record, created_at in items:
+            chain = self.get_chain(skill_hash)
+            if chain is None:
+                chain = new_chain(skill_hash, created_at)
+                self._loaded[skill_hash] = chain
+
+            link_record(record, chain["head_digest"])
+            self.last_seq += 1
+            record["seq"] = self.last_seq
+            if not chain["skill_name"]:
+                name, version = record_skill_identity(record)
+                if name:
+                    chain["skill_name"], chain["skill_version"] = name, version
+                    self._index_name(chain)
+            if self._records_indexed:
+                self.audit_index.add_record(skill_hash, len(chain["audit_chain"]), record)
+            if self._seq_index is not None:
+                # 新记录的序号大于已有序号，直接放到末尾
+                self._seq_index.append((record["seq"], skill_hash, len(chain["audit_chain"])))
+                self._content_keys.add((skill_hash, record["content_digest"]))
+            chain["audit_chain"].append(record)
+            chain["audit_count"] += 1
+            chain["score_sum"] += record.get("trust_score", 0)
+            chain["head_digest"] = record["digest"]
+            chain["latest_timestamp"] = record.get("timestamp")
+            self.audit_index.set_latest(skill_hash, chain["latest_timestamp"])
+            self._dirty.add(skill_hash)
+
+    def _read_chain(self, skill_hash: str) -> Dict:
+        """从数据文件解析一条传承链，不放入缓存"""
+        start, end = self._offsets[skill_hash]
+        self._file.seek(start)
+        return json.loads(self._file.read(end - start))
+
+    def _chain_keys(self, skill_hash: str) -> List[List]:
+        """传承链各记录的 [本地序号, 内容摘要]，已加载的传承链以内存中的内容为准"""
+        chain = self._loaded.get(skill_hash)
+        if chain is not None:
+            return _record_keys(chain)
+        if self._saved_keys is None:
+            self._saved_keys = self._load_saved_keys()
+        return self._saved_keys[skill_hash]
+
+    def _load_saved_keys(self) -> Dict[str, List[List]]:
+        """读取记录摘要文件，文件不存在或与数据文件不匹配时解析数据文件重建"""
+        try:
+            with open(self.records_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if (saved.get("version") == self.INDEX_VERSION
+                    and saved.get("file") == list(_file_signature(self._file.fileno()))):
+                return saved["chains"]
+        except (OSError, ValueError):
+            pass
+        return {skill_hash: _record_keys(self._read_chain(skill_hash)) for skill_hash in self._offsets}
+
+    def _index_contents(self):
+        """第一次增量导出或复制去重时由记录摘要建立序号索引和内容摘要集合"""
+        if self._seq_index is not None:
+            return
+        seq_index, content_keys = [], set()
+        for skill_hash in self.iter_hashes():
+            for position, (seq, content_digest) in enumerate(self._chain_keys(skill_hash)):
+                seq_index.append((seq, skill_hash, position))
+                content_keys.add((skill_hash, content_digest))
+        seq_index.sort()
+        self._seq_index, self._content_keys = seq_index, content_keys
+
+    def _chain_bytes(self, skill_hash: str) -> bytes:
+        """传承链在数据文件中的字节表示，与 json.dump(chains, indent=2) 的输出一致"""
+        if skill_hash not in self._dirty and skill_hash in self._offsets:
+            start, end = self._offsets[skill_hash]
+            self._file.seek(start)
+            return self._file.read(end - start)
+        text = json.dumps(self._loaded[skill_hash], indent=2, ensure_ascii=False)
+        return text.replace("\n", "\n  ").encode("utf-8")
+
+    def _load_index(self) -> bool:
+        """读取偏移索引，索引不存在或与数据文件不匹配时返回False"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if index.get("version") != self.INDEX_VERSION or index.get("file") != list(_file_signature(self._file.fileno())):
+            return False
+        for skill_hash, start, end, header in index["chains"]:
+            self._offsets[skill_hash] = (start, end)
+            self._headers[skill_hash] = header
+        self.last_seq = index["seq"]
+        return True
+
+    def _write_index(self):
+        index = {
+            "version": self.INDEX_VERSION,
+            "file": list(_file_signature(self._file.fileno())),
+            "seq": self.last_seq,
+            "chains": [[skill_hash, start, end, self._headers[skill_hash]]
+                       for skill_hash, (start, end) in self._offsets.items()]
+        }
+        atomic_write(self.index_file, lambda f: json.dump(index, f, ensure_ascii=False, separators=(",", ":")),
+                      fsync=False)
+        if self._saved_keys is not None:
+            saved = {"version": self.INDEX_VERSION, "file": index["file"], "chains": self._saved_keys}
+            atomic_write(self.records_file, lambda f: json.dump(saved, f, separators=(",", ":")), fsync=False)
+
+    def _rebuild_index(self):
+        """完整扫描数据文件，记录每条传承链的字节范围、聚合信息和最大本地序号"""
+        self._file.seek(0)
+        text = self._file.read().decode("utf-8")
+        decoder = json.JSONDecoder()
+
+        # 逐个解码顶层对象的键值，同时累计字符位置对应的字节位置
+        char_pos = byte_pos = 0
+
+        def to_bytes(pos):
+            nonlocal char_pos, byte_pos
+            byte_pos += len(text[char_pos:pos].encode("utf-8"))
+            char_pos = pos
+            return byte_pos
+
+        pos = _WHITESPACE.match(text, 0).end()
+        if text[pos:pos + 1] != "{":
+            raise ValueError(f"Invalid isnad chain file {self.chain_file}")
+        pos = _WHITESPACE.match(text, pos + 1).end()
+        last_seq = 0
+        legacy = []
+        saved_keys = {}
+        while text[pos:pos + 1] != "}":
+            skill_hash, pos = decoder.raw_decode(text, pos)
+            pos = _WHITESPACE.match(text, pos).end()
+            if text[pos:pos + 1] != ":":
+                raise ValueError(f"Invalid isnad chain file {self.chain_file}")
+            start = _WHITESPACE.match(text, pos + 1).end()
+            chain, end = decoder.raw_decode(text, start)
+            self._offsets[skill_hash] = (to_bytes(start), to_bytes(end))
+
+            if "head_digest" not in chain:
+                # 原有格式的传承链：补齐链接和聚合字段，随后分配序号并写回
+                self._loaded[skill_hash] = upgrade_chain(chain)
+                self._dirty.add(skill_hash)
+                legacy.append(chain)
+            else:
+                if chain["audit_chain"]:
+                    # 同一条传承链中的序号随位置递增
+                    last_seq = max(last_seq, chain["audit_chain"][-1]["seq"])
+                saved_keys[skill_hash] = _record_keys(chain)
+            self._headers[skill_hash] = _chain_header(chain)
+
+            pos = _WHITESPACE.match(text, end).end()
+            if text[pos:pos + 1] == ",":
+                pos = _WHITESPACE.match(text, pos + 1).end()
+
+        # 原有记录的序号排在已有序号之后；已加载的原有格式传承链的记录摘要由内存中的内容得到
+        self.last_seq = sequence_records(legacy, last_seq)
+        self._saved_keys = saved_keys
+
+    def _rebuild_indexes(self):
+        """由聚合信息重建名称索引和最新审计时间索引"""
+        self.name_index = {}
+        self.audit_index = AuditIndex()
+        self._records_indexed = False
+        for skill_hash in self.iter_hashes():
+            header = self.get_chain_header(skill_hash)
+            self._index_name(header)
+            self.audit_index.set_latest(skill_hash, header["latest_timestamp"])
+
+    def _index_records(self):
+        """第一次按记录查询时解析全部传承链，建立审计记录的索引"""
+        with self._lock:
+            if not self._records_indexed:
+                for skill_hash in self.iter_hashes():
+                    for position, record in enumerate(self.get_chain(skill_hash)["audit_chain"]):
+                        self.audit_index.add_record(skill_hash, position, record)
+                self._records_indexed = True
+
+    def _index_name(self, chain: Dict):
+        """把传承链加入名称索引"""
+        if chain.get("skill_name"):
+            versions = self.name_index.setdefault(chain["skill_name"], {})
+            versions.setdefault(chain.get("skill_version"), []).append(chain["skill_hash"])
+
+
+def _record_keys(chain: Dict) -> List[List]:
+    """传承链各记录的 [本地序号, 内容摘要]"""
+    return [[record["seq"], stored_content_digest(record)] for record in chain["audit_chain"]]
+
+
+def _chain_header(chain: Dict) -> Dict:
+    """传承链去掉审计记录后的聚合信息"""
+    return {key: value for key, value in chain.items() if key != "audit_chain"}
+
+
+class _LazyChainsView(Mapping):
+    """把按需加载的传承链呈现为只读映射，访问某条传承链时才解析它"""
+
+    def __init__(self, store: LazyJSONChainStore):
+        self._store = store
+
+    def __getitem__(self, skill_hash: str) -> Dict:
+        chain = self._store.get_chain(skill_hash)
+        if chain is None:
+            raise KeyError(skill_hash)
+        return chain
+
+    def __contains__(self, skill_hash) -> bool:
+        return self._store.get_chain_header(skill_hash) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return self._store.iter_hashes()
+
+    def __len__(self) -> int:
+        return self._store.count()
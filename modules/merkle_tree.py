@@ -0,0 +1,173 @@
+"""
+技能内容的Merkle树哈希
+按相对路径排序构建：每个文件是一个叶子，每个目录是一个内部节点，
+根节点摘要与文件系统的遍历顺序无关，且可以精确定位变化的文件
+"""
+
+import os
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 节点摘要的域分隔前缀，避免叶子与内部节点的摘要互相冒充
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def leaf_digest(content_digest: str) -> str:
+    """
+    由文件内容摘要计算叶子节点摘要
+
+    Args:
+        content_digest: 文件内容的SHA-256十六进制摘要
+
+    Returns:
+        叶子节点摘要
+    """
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(content_digest)).hexdigest()
+
+
+def node_digest(children: Dict[str, Dict]) -> str:
+    """
+    由子节点计算目录节点摘要
+
+    Args:
+        children: 子节点名称到节点的映射
+
+    Returns:
+        目录节点摘要
+    """
+    hasher = hashlib.sha256(NODE_PREFIX)
+    for name in sorted(children):
+        child = children[name]
+        kind = b"D" if "children" in child else b"F"
+        hasher.update(kind + name.encode("utf-8", "surrogateescape") + b"\x00")
+        hasher.update(bytes.fromhex(child["digest"]))
+    return hasher.hexdigest()
+
+
+def build_merkle_tree(skill_path: str,
+                      extensions: Tuple[str, ...],
+                      hash_file: Callable[[str, os.stat_result], Optional[str]],
+                      previous: Optional[Dict] = None,
+                      is_racy: Optional[Callable[[os.stat_result], bool]] = None,
+                      diagnostics: Optional[List[Dict]] = None) -> Dict:
+    """
+    构建技能目录的Merkle树
+
+    叶子节点记录文件的stat身份；与上一棵树中stat身份一致的文件直接复用其摘要，
+    子节点全部被复用的目录直接复用上一棵树中的节点；无法读取的文件不进入树中
+
+    Args:
+        skill_path: 技能目录路径
+        extensions: 参与哈希的文件后缀
+        hash_file: 计算文件内容摘要的函数，读取失败时抛出OSError
+        previous: 上一次构建的Merkle树
+        is_racy: 判断文件stat是否过新而不可复用的函数
+        diagnostics: 诊断信息列表，无法读取的文件以 {"file", "error"} 追加到其中
+
+    Returns:
+        根节点，形如 {"digest": ..., "children": {...}}
+    """
+    if diagnostics is None:
+        diagnostics = []
+    return _build_dir(skill_path, extensions, hash_file, previous, is_racy, diagnostics)
+
+
+def _build_dir(dir_path: str, extensions: Tuple[str, ...], hash_file, previous, is_racy,
+               diagnostics: List[Dict]) -> Dict:
+    previous_children = previous.get("children", {}) if previous else {}
+    children = {}
+
+    try:
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        entries = []
+
+    for entry in entries:
+        name = entry.name
+        prev_child = previous_children.get(name)
+        if entry.is_dir():
+            # 与os.walk一致：不进入指向目录的符号链接
+            if entry.is_symlink():
+                continue
+            prev_dir = prev_child if prev_child and "children" in prev_child else None
+            child = _build_dir(entry.path, extensions, hash_file, prev_dir, is_racy, diagnostics)
+            if child["children"]:
+                children[name] = child
+        elif name.endswith(extensions):
+            try:
+                st = entry.stat()
+                ident = [st.st_ino, st.st_size, st.st_mtime_ns]
+                if prev_child and prev_child.get("stat") == ident:
+                    children[name] = prev_child
+                    continue
+                content = hash_file(entry.path, st)
+            except OSError as e:
+                diagnostics.append({"file": entry.path, "error": f"{type(e).__name__}: {e}"})
+                continue
+            racy = is_racy(st) if is_racy else False
+            children[name] = {
+                "digest": leaf_digest(content),
+                # 过新的文件不记录stat身份，下次必定重新读取
+                "stat": None if racy else ident
+            }
+
+    if previous and _same_children(previous.get("children", {}), children):
+        return previous
+    return {"digest": node_digest(children), "children": children}
+
+
+def _same_children(old: Dict[str, Dict], new: Dict[str, Dict]) -> bool:
+    if old.keys() != new.keys():
+        return False
+    return all(old[name] is new[name] for name in new)
+
+
+def diff_merkle_trees(old: Optional[Dict], new: Dict) -> Dict[str, List[str]]:
+    """
+    比较两棵Merkle树，找出变化的文件
+
+    摘要相同的子树整体跳过，因此比较开销只与变化部分的大小有关
+
+    Args:
+        old: 旧树，为None时视为空树
+        new: 新树
+
+    Returns:
+        包含added、removed、modified三个相对路径列表的字典
+    """
+    changes = {"added": [], "removed": [], "modified": []}
+    _diff_nodes(old or {"children": {}}, new, "", changes)
+    return changes
+
+
+def _diff_nodes(old: Dict, new: Dict, prefix: str, changes: Dict[str, List[str]]):
+    if old.get("digest") is not None and old.get("digest") == new.get("digest"):
+        return
+
+    old_children = old.get("children", {})
+    new_children = new.get("children", {})
+    for name in sorted(set(old_children) | set(new_children)):
+        path = prefix + name
+        old_child = old_children.get(name)
+        new_child = new_children.get(name)
+        if old_child is None:
+            _collect_files(new_child, path, changes["added"])
+        elif new_child is None:
+            _collect_files(old_child, path, changes["removed"])
+        elif "children" in old_child and "children" in new_child:
+            _diff_nodes(old_child, new_child, path + "/", changes)
+        elif "children" in old_child or "children" in new_child:
+            _collect_files(old_child, path, changes["removed"])
+            _collect_files(new_child, path, changes["added"])
+        elif old_child["digest"] != new_child["digest"]:
+            changes["modified"].append(path)
+
+
+def _collect_files(node: Dict, path: str, out: List[str]):
+    if "children" not in node:
+        out.append(path)
+        return
+    for name in sorted(node["children"]):
+        _collect_files(node["children"][name], path + "/" + name, out)
@@ -1,7 +1,29 @@
 import os
+import copy
 import json
+import time
 import hashlib
-from typing import Dict, List, Optional
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from skill_trust_network.modules.hash_cache import FileHashCache
+from skill_trust_network.modules.file_hashing import hash_file, update_hashers_from_file
+from skill_trust_network.modules.merkle_tree import build_merkle_tree, diff_merkle_trees
+
+try:
+    # 安装了orjson时使用更快的JSON解码器
+    import orjson
+
+    def _json_loads(data):
+        # orjson不接受NaN/Infinity，这类文档交给json模块解析
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+except ImportError:
+    _json_loads = json.loads
 
 class SkillMetadataCollector:
     """
@@ -9,14 +31,48 @@ class SkillMetadataCollector:
     负责从技能目录中收集技能的元数据信息
     """
 
-    def __init__(self, skill_directories: List[str] = ["/opt/moltbot/skills/"]):
+    # 参与技能哈希计算的文件后缀
+    HASHED_EXTENSIONS = (".py", ".json", ".js")
+
+    # 技能清单文件，按此顺序合并
+    MANIFEST_FILES = ("package.json", "skill.json", "manifest.json")
+
+    # 从清单文件中读取的元数据字段
+    MANIFEST_FIELDS = ("name", "version", "author", "permissions", "trust_chain")
+
+    # 清单解析缓存的最大条目数，超出时淘汰最久未使用的条目
+    MANIFEST_CACHE_SIZE = 4096
+
+    # 支持的技能哈希模式：flat为兼容旧版本的整体流式哈希，merkle为按文件构建的Merkle树
+    HASH_MODES = ("flat", "merkle")
+
+    def __init__(self, skill_directories: List[str] = ["/opt/moltbot/skills/"],
+                 hash_cache_file: Optional[str] = None, max_workers: int = 1,
+                 hash_mode: str = "flat"):
         """
         初始化元数据收集器
 
         Args:
             skill_directories: 技能目录列表
+            hash_cache_file: 文件哈希缓存路径，为None时不启用缓存
+            max_workers: 批量收集时的线程数，1表示在当前线程中串行收集
+            hash_mode: 技能哈希模式，"flat"或"merkle"
         """
+        if hash_mode not in self.HASH_MODES:
+            raise ValueError(f"Unsupported hash mode: {hash_mode}")
+
         self.skill_directories = skill_directories
+        self.max_workers = max(1, max_workers)
+        self.hash_mode = hash_mode
+        self.hash_cache = FileHashCache(hash_cache_file) if hash_cache_file else None
+        # 每个技能目录最近一次构建的Merkle树，用于复用未变化的子树和定位变化的文件
+        self._merkle_trees = {}
+        # 技能名称到路径的索引，以及建立索引时各技能目录的mtime
+        self._skill_index = {}
+        self._index_state = None
+        # 清单文件路径到 (stat身份, 解析结果, 错误信息) 的LRU缓存，解析结果只保留MANIFEST_FIELDS中的字段
+        self._manifest_cache = OrderedDict()
+        self._manifest_lock = threading.Lock()
 
     def collect_metadata(self, skill_name: str) -> Optional[Dict]:
         """
@@ -28,11 +84,90 @@ class SkillMetadataCollector:
         Returns:
             技能元数据字典，如果技能不存在则返回None
         """
+        skill_path = self.find_skill_path(skill_name)
+        if skill_path is None:
+            return None
+        return self.collect_metadata_from_path(skill_path, skill_name)
+
+    def collect_metadata_from_path(self, skill_path: str, skill_name: Optional[str] = None) -> Optional[Dict]:
+        """
+        从指定路径收集技能的元数据，不经过技能目录查找
+
+        Args:
+            skill_path: 技能路径
+            skill_name: 技能名称，默认取路径的最后一级
+
+        Returns:
+            技能元数据字典，如果路径不存在则返回None
+        """
+        if not os.path.exists(skill_path):
+            return None
+        if skill_name is None:
+            skill_name = os.path.basename(os.path.normpath(skill_path))
+        metadata = self._extract_metadata(skill_path, skill_name)
+        self._save_hash_cache()
+        return metadata
+
+    def find_skill_path(self, skill_name: str) -> Optional[str]:
+        """
+        查找技能所在的路径
+
+        使用技能名称索引，仅在某个技能目录的mtime变化时重建索引；
+        多个技能目录中存在同名技能时，以靠前的目录为准
+
+        Args:
+            skill_name: 技能名称
+
+        Returns:
+            技能路径，如果技能不存在则返回None
+        """
+        # 含路径分隔符的名称不在索引范围内，按原方式逐个目录探测
+        if os.sep in skill_name or (os.altsep and os.altsep in skill_name):
+            for skill_dir in self.skill_directories:
+                skill_path = os.path.join(skill_dir, skill_name)
+                if os.path.exists(skill_path):
+                    return skill_path
+            return None
+
+        self._refresh_skill_index()
+        return self._skill_index.get(skill_name)
+
+    def _directory_state(self) -> Tuple:
+        """
+        获取各技能目录的mtime快照
+
+        Returns:
+            (技能目录, mtime_ns) 元组组成的元组，目录不存在时mtime为None
+        """
+        state = []
         for skill_dir in self.skill_directories:
-            skill_path = os.path.join(skill_dir, skill_name)
-            if os.path.exists(skill_path):
-                return self._extract_metadata(skill_path, skill_name)
-        return None
+            try:
+                mtime = os.stat(skill_dir).st_mtime_ns
+            except OSError:
+                mtime = None
+            state.append((skill_dir, mtime))
+        return tuple(state)
+
+    def _refresh_skill_index(self):
+        """在技能目录列表或任一目录的mtime变化时重建技能名称索引"""
+        state = self._directory_state()
+        if state == self._index_state:
+            return
+
+        index = {}
+        for skill_dir in self.skill_directories:
+            try:
+                with os.scandir(skill_dir) as it:
+                    for entry in it:
+                        index.setdefault(entry.name, entry.path)
+            except OSError:
+                continue
+
+        self._skill_index = index
+        # mtime过新的目录可能在同一时间戳粒度内再次变化，此时下次查找仍重建索引
+        racy = any(mtime is not None and time.time_ns() - mtime < FileHashCache.RACY_WINDOW_NS
+                   for _, mtime in state)
+        self._index_state = None if racy else state
 
     def _extract_metadata(self, skill_path: str, skill_name: str) -> Dict:
         """
@@ -46,68 +181,278 @@ class SkillMetadataCollector:
             技能元数据字典
         """
         # 尝试从package.json或skill.json中读取元数据
-        metadata_files = ["package.json", "skill.json", "manifest.json"]
         metadata = {
             "name": skill_name,
             "version": "1.0.0",
             "author": "unknown",
             "permissions": [],
             "trust_chain": [],
-            "hash": ""
+            "hash": "",
+            "path": skill_path
         }
+        diagnostics = []
 
-        for meta_file in metadata_files:
+        # 按顺序合并各清单文件，后出现的文件覆盖先出现的字段
+        for meta_file in self.MANIFEST_FILES:
             meta_path = os.path.join(skill_path, meta_file)
-            if os.path.exists(meta_path):
-                try:
-                    with open(meta_path, 'r', encoding='utf-8') as f:
-                        file_metadata = json.load(f)
-                        # 更新元数据
-                        if "name" in file_metadata:
-                            metadata["name"] = file_metadata["name"]
-                        if "version" in file_metadata:
-                            metadata["version"] = file_metadata["version"]
-                        if "author" in file_metadata:
-                            metadata["author"] = file_metadata["author"]
-                        if "permissions" in file_metadata:
-                            metadata["permissions"] = file_metadata["permissions"]
-                        if "trust_chain" in file_metadata:
-                            metadata["trust_chain"] = file_metadata["trust_chain"]
-                except Exception as e:
-                    print(f"Error reading metadata file {meta_path}: {e}")
+            file_metadata, error = self._load_manifest(meta_path)
+            if error is not None:
+                diagnostics.append({"file": meta_path, "error": error})
+                continue
+            if file_metadata is None:
+                continue
+            for field in self.MANIFEST_FIELDS:
+                if field in file_metadata:
+                    value = file_metadata[field]
+                    # 缓存中的解析结果会被复用，容器类型的值需要复制
+                    metadata[field] = copy.deepcopy(value) if isinstance(value, (list, dict)) else value
 
         # 计算技能的哈希值
-        metadata["hash"] = self._calculate_skill_hash(skill_path)
+        if self.hash_mode == "merkle":
+            tree, previous = self._calculate_skill_merkle_tree(skill_path, diagnostics)
+            metadata["hash"] = tree["digest"]
+            if previous is not None:
+                metadata["changed_files"] = diff_merkle_trees(previous, tree)
+        else:
+            metadata["hash"] = self._calculate_skill_hash(skill_path, diagnostics)
+
+        if diagnostics:
+            metadata["diagnostics"] = diagnostics
 
         return metadata
 
-    def _calculate_skill_hash(self, skill_path: str) -> str:
+    def _load_manifest(self, meta_path: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        读取并解析清单文件，按stat身份缓存解析结果
+
+        Args:
+            meta_path: 清单文件路径
+
+        Returns:
+            (MANIFEST_FIELDS中存在的字段组成的字典, 错误信息) 元组；文件不存在时两者均为None
+        """
+        try:
+            st = os.stat(meta_path)
+        except FileNotFoundError:
+            return None, None
+        except OSError as e:
+            return None, str(e)
+
+        ident = FileHashCache.stat_key(st)
+        with self._manifest_lock:
+            cached = self._manifest_cache.get(meta_path)
+            if cached is not None and cached[0] == ident:
+                self._manifest_cache.move_to_end(meta_path)
+                return cached[1], cached[2]
+
+        try:
+            with open(meta_path, 'rb') as f:
+                file_metadata = _json_loads(f.read())
+            if not isinstance(file_metadata, dict):
+                raise ValueError("manifest must be a JSON object")
+            result = ({field: file_metadata[field] for field in self.MANIFEST_FIELDS if field in file_metadata}, None)
+        except Exception as e:
+            result = (None, f"{type(e).__name__}: {e}")
+
+        # 过新的文件可能在同一时间戳粒度内再次变化，不缓存
+        if not FileHashCache.is_racy(st):
+            with self._manifest_lock:
+                self._manifest_cache[meta_path] = (ident,) + result
+                self._manifest_cache.move_to_end(meta_path)
+                while len(self._manifest_cache) > self.MANIFEST_CACHE_SIZE:
+                    self._manifest_cache.popitem(last=False)
+        return result
+
+    def _calculate_skill_hash(self, skill_path: str, diagnostics: Optional[List[Dict]] = None) -> str:
         """
         计算技能的哈希值，用于完整性验证
 
         Args:
             skill_path: 技能目录路径
+            diagnostics: 诊断信息列表，无法读取的文件追加到其中
 
         Returns:
             技能的哈希值
         """
+        if diagnostics is None:
+            diagnostics = []
+        if self.hash_cache is not None:
+            return self._calculate_skill_hash_cached(skill_path, diagnostics)
+
         hasher = hashlib.sha256()
 
         # 遍历技能目录中的所有文件
         for root, _, files in os.walk(skill_path):
             for file in files:
-                if file.endswith(".py") or file.endswith(".json") or file.endswith(".js"):
+                if file.endswith(self.HASHED_EXTENSIONS):
                     file_path = os.path.join(root, file)
                     try:
-                        with open(file_path, 'rb') as f:
-                            # 读取文件内容并更新哈希
-                            while chunk := f.read(8192):
-                                hasher.update(chunk)
-                    except Exception as e:
-                        print(f"Error hashing file {file_path}: {e}")
+                        # 读取文件内容并更新哈希
+                        update_hashers_from_file(file_path, (hasher,))
+                    except OSError as e:
+                        diagnostics.append({"file": file_path, "error": f"{type(e).__name__}: {e}"})
 
         return hasher.hexdigest()
 
+    def _calculate_skill_hash_cached(self, skill_path: str, diagnostics: List[Dict]) -> str:
+        """
+        借助文件哈希缓存计算技能的哈希值
+
+        先只对文件做stat，目录内全部文件的stat身份与缓存一致时直接复用技能哈希；
+        否则重新读取全部文件。flat哈希是全部文件内容拼接后的摘要，无法由单个文件的摘要组合，
+        因此只缓存整个目录的摘要。结果与不使用缓存时完全一致。
+
+        Args:
+            skill_path: 技能目录路径
+            diagnostics: 诊断信息列表，无法读取的文件追加到其中
+
+        Returns:
+            技能的哈希值
+        """
+        file_stats = []
+        signature = hashlib.sha256()
+        for root, _, files in os.walk(skill_path):
+            for file in files:
+                if file.endswith(self.HASHED_EXTENSIONS):
+                    file_path = os.path.join(root, file)
+                    try:
+                        st = os.stat(file_path)
+                    except OSError:
+                        st = None
+                    file_stats.append((file_path, st))
+                    ident = FileHashCache.stat_key(st) if st is not None else ()
+                    signature.update(f"{file_path}\0{ident}\n".encode("utf-8", "surrogateescape"))
+
+        signature_hex = signature.hexdigest()
+        cached = self.hash_cache.get_tree_digest(skill_path, signature_hex)
+        if cached is not None:
+            return cached
+
+        hasher = hashlib.sha256()
+        cacheable = True
+        for file_path, st in file_stats:
+            try:
+                update_hashers_from_file(file_path, (hasher,))
+            except OSError as e:
+                diagnostics.append({"file": file_path, "error": f"{type(e).__name__}: {e}"})
+                cacheable = False
+                continue
+            if st is None or self.hash_cache.is_racy(st):
+                cacheable = False
+
+        digest = hasher.hexdigest()
+        if cacheable:
+            self.hash_cache.put_tree_digest(skill_path, signature_hex, digest)
+        return digest
+
+    def _calculate_skill_merkle_tree(self, skill_path: str, diagnostics: Optional[List[Dict]] = None):
+        """
+        构建技能目录的Merkle树
+
+        Args:
+            skill_path: 技能目录路径
+            diagnostics: 诊断信息列表，无法读取的文件追加到其中
+
+        Returns:
+            (新的Merkle树, 上一次的Merkle树或None) 元组
+        """
+        previous = self._merkle_trees.get(skill_path)
+        if previous is None and self.hash_cache is not None:
+            previous = self.hash_cache.get_merkle_tree(skill_path)
+
+        tree = build_merkle_tree(skill_path, self.HASHED_EXTENSIONS, self._hash_file,
+                                 previous, FileHashCache.is_racy, diagnostics)
+
+        self._merkle_trees[skill_path] = tree
+        if self.hash_cache is not None and tree is not previous:
+            self.hash_cache.put_merkle_tree(skill_path, tree)
+        return tree, previous
+
+    def _hash_file(self, file_path: str, st: os.stat_result) -> str:
+        """
+        计算单个文件内容的SHA-256摘要，优先使用文件哈希缓存
+
+        Args:
+            file_path: 文件路径
+            st: 文件的stat结果
+
+        Returns:
+            文件摘要；读取失败时抛出OSError，由Merkle树的构建记入诊断信息
+        """
+        if self.hash_cache is not None:
+            cached = self.hash_cache.get_file_digest(file_path, st)
+            if cached is not None:
+                return cached
+
+        digest = hash_file(file_path)
+
+        if self.hash_cache is not None:
+            self.hash_cache.put_file_digest(file_path, st, digest)
+        return digest
+
+    def _save_hash_cache(self):
+        """将文件哈希缓存写回磁盘（未启用缓存时不做任何事）"""
+        if self.hash_cache is not None:
+            self.hash_cache.save()
+
+    def get_hash_cache_stats(self) -> Optional[Dict]:
+        """
+        获取文件哈希缓存的命中统计
+
+        Returns:
+            命中统计字典，未启用缓存时返回None
+        """
+        if self.hash_cache is None:
+            return None
+        return self.hash_cache.get_stats()
+
+    def _discover_skills(self) -> Iterator[Tuple[str, str]]:
+        """
+        逐个技能目录发现技能
+
+        使用os.scandir的目录项类型判断子目录，避免对每个条目额外stat；
+        同一技能目录内按名称排序，保证结果顺序与文件系统无关
+
+        Returns:
+            (技能名称, 技能路径) 迭代器
+        """
+        for skill_dir in self.skill_directories:
+            try:
+                with os.scandir(skill_dir) as it:
+                    entries = [(entry.name, entry.path) for entry in it if entry.is_dir()]
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            entries.sort()
+            yield from entries
+
+    def iter_skills_metadata(self) -> Iterator[Dict]:
+        """
+        流式收集所有技能的元数据
+
+        max_workers大于1时在线程池中并行提取（hashlib计算时会释放GIL），
+        同时在途的任务数不超过线程数的两倍，因此内存占用与技能总数无关；
+        产出顺序与发现顺序一致，不受完成先后影响
+
+        Returns:
+            技能元数据迭代器
+        """
+        skills = self._discover_skills()
+        try:
+            if self.max_workers > 1:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    pending = deque()
+                    for skill_name, skill_path in skills:
+                        pending.append(executor.submit(self._extract_metadata, skill_path, skill_name))
+                        if len(pending) >= self.max_workers * 2:
+                            yield pending.popleft().result()
+                    while pending:
+                        yield pending.popleft().result()
+            else:
+                for skill_name, skill_path in skills:
+                    yield self._extract_metadata(skill_path, skill_name)
+        finally:
+            self._save_hash_cache()
+
     def collect_all_skills_metadata(self) -> List[Dict]:
         """
         收集所有技能的元数据
@@ -115,14 +460,4 @@ class SkillMetadataCollector:
         Returns:
             所有技能的元数据列表
         """
-        all_metadata = []
-
-        for skill_dir in self.skill_directories:
-            if os.path.exists(skill_dir):
-                for skill_name in os.listdir(skill_dir):
-                    skill_path = os.path.join(skill_dir, skill_name)
-                    if os.path.isdir(skill_path):
-                        metadata = self._extract_metadata(skill_path, skill_name)
-                        all_metadata.append(metadata)
-
-        return all_metadata
\ No newline at end of file
+        return list(self.iter_skills_metadata())
@@ -0,0 +1,176 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from skill_trust_network.modules.atomic_file import save_atomically
+
+logger = logging.getLogger(__name__)
+
+class TrustScoreCache:
+    """
+    信任评分缓存模块
+    以技能内容哈希、参与评分的元数据字段和评分策略版本为键缓存评分结果，
+    输入不变的技能无需重新评分；条目数量有上限，按最近最少使用淘汰，可选持久化到磁盘
+    """
+
+    # 缓存文件格式版本，格式变化时旧缓存整体失效
+    CACHE_VERSION = 1
+
+    def __init__(self, max_entries: int = 1024, cache_file: Optional[str] = None):
+        """
+        初始化信任评分缓存
+
+        Args:
+            max_entries: 最多缓存的评分条目数
+            cache_file: 缓存文件路径，为None时只在内存中缓存
+        """
+        self.max_entries = max_entries
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # {键: 评分字典}，按最近使用的先后排列，最久未使用的在最前
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._lock = threading.Lock()
+        if cache_file:
+            self.load()
+
+    @staticmethod
+    def make_key(content_hash: str, fields: List[Tuple[str, Any]], policy_version: str) -> Tuple:
+        """
+        生成缓存键
+
+        元数据字段来自JSON清单，列表值转换为元组后整个键可以直接哈希；
+        含有嵌套容器、无法哈希的字段退回到其repr
+
+        Args:
+            content_hash: 技能内容哈希
+            fields: 参与评分的元数据字段 [(字段名, 值)]
+            policy_version: 评分策略版本标签
+
+        Returns:
+            可哈希的缓存键
+        """
+        key = (content_hash,
+               tuple([(name, tuple(value)) if type(value) is list else (name, value) for name, value in fields]),
+               policy_version)
+        try:
+            hash(key)
+        except TypeError:
+            key = (content_hash, repr(fields), policy_version)
+        return key
+
+    def load(self):
+        """加载磁盘上的缓存，版本不符或文件损坏时从空缓存开始"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._dirty = False
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                return
+            except (OSError, ValueError) as e:
+                logger.warning("Error loading score cache %s: %s", self.cache_file, e)
+                return
+
+            if not isinstance(data, dict) or data.get("version") != self.CACHE_VERSION:
+                return
+            # 文件中按最近使用的先后保存，只保留最近的max_entries条
+            for key, scores in data.get("entries", [])[-self.max_entries:]:
+                self._entries[_key_from_json(key)] = scores
+
+    def save(self) -> bool:
+        """
+        将缓存原子地写回磁盘（临时文件 + rename），未设置缓存文件时不做任何事
+
+        Returns:
+            保存是否成功
+        """
+        if not self.cache_file:
+            return True
+        with self._lock:
+            if not self._dirty:
+                return True
+            data = {
+                "version": self.CACHE_VERSION,
+                "entries": [[list(key), scores] for key, scores in self._entries.items()]
+            }
+            self._dirty = False
+
+        if save_atomically(self.cache_file, lambda f: json.dump(data, f, ensure_ascii=False, separators=(",", ":")),
+                           "score cache"):
+            return True
+        with self._lock:
+            self._dirty = True
+        return False
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        """
+        查询缓存的评分
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            评分字典的副本，未命中时返回None
+        """
+        with self._lock:
+            scores = self._entries.get(key)
+            if scores is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(scores)
+
+    def put(self, key: Tuple, scores: Dict):
+        """
+        记录评分，超出上限时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键
+            scores: 评分字典
+        """
+        with self._lock:
+            self._entries[key] = dict(scores)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+
+    def clear(self):
+        """清空全部缓存条目"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._dirty = True
+
+    def get_stats(self) -> Dict:
+        """
+        获取缓存命中统计
+
+        Returns:
+            包含命中数、未命中数、命中率、淘汰数和条目数的字典
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries
+            }
+
+
+def _key_from_json(key: List) -> Tuple:
+    """把从缓存文件读出的键还原为 make_key 生成的元组形式"""
+    content_hash, fields, policy_version = key
+    if isinstance(fields, list):
+        fields = tuple((name, tuple(value) if isinstance(value, list) else value) for name, value in fields)
+    return (content_hash, fields, policy_version)
@@ -0,0 +1,157 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+class ScoringFactor:
+    """
+    评分因素
+    描述一个参与信任评分的因素：评分函数、默认权重、评分范围和评估成本
+    """
+
+    def __init__(self, name: str, compute: Callable[[Dict], float], weight: float,
+                 min_score: float = 0, max_score: float = 100, cost: float = 1.0,
+                 input_fields: Iterable[str] = ()):
+        """
+        初始化评分因素
+
+        Args:
+            name: 因素名称，也是评分字典和权重字典中的键
+            compute: 评分函数，参数为技能元数据字典，返回该因素的评分
+            weight: 注册到评分器时使用的权重
+            min_score: 评分下限，门限评估据此判断剩余因素最少能贡献多少
+            max_score: 评分上限，门限评估据此判断剩余因素最多能贡献多少
+            cost: 相对评估成本，门限评估先运行成本低的因素
+            input_fields: 除技能哈希外评分函数读取的元数据字段，会加入评分缓存的键
+        """
+        if min_score > max_score:
+            raise ValueError(f"Invalid score bounds for factor {name}: {min_score} > {max_score}")
+        self.name = name
+        self.compute = compute
+        self.weight = weight
+        self.min_score = min_score
+        self.max_score = max_score
+        self.cost = cost
+        self.input_fields = tuple(input_fields)
+
+    def signature(self) -> str:
+        """
+        评分函数的标识，替换评分函数后评分策略版本随之变化
+
+        Returns:
+            "因素名称=模块.限定名" 形式的字符串
+        """
+        func = getattr(self.compute, "__func__", self.compute)
+        module = getattr(func, "__module__", None) or type(func).__module__
+        qualname = getattr(func, "__qualname__", None) or type(func).__qualname__
+        return f"{self.name}={module}.{qualname}"
+
+
+class FactorRegistry:
+    """
+    评分因素注册表
+    按注册顺序保存评分因素，总评分按该顺序累加；同名因素注册时原位替换
+    """
+
+    def __init__(self, factors: Iterable[ScoringFactor] = ()):
+        """
+        初始化评分因素注册表
+
+        Args:
+            factors: 初始的评分因素
+        """
+        self._factors = {}
+        # 每次注册或注销时递增，依赖注册表内容的缓存据此失效
+        self.version = 0
+        for factor in factors:
+            self.register(factor)
+
+    def register(self, factor: ScoringFactor):
+        """
+        注册评分因素，已有同名因素时原位替换
+
+        Args:
+            factor: 评分因素
+        """
+        self._factors[factor.name] = factor
+        self.version += 1
+
+    def unregister(self, name: str) -> Optional[ScoringFactor]:
+        """
+        注销评分因素
+
+        Args:
+            name: 因素名称
+
+        Returns:
+            被注销的评分因素，不存在时返回None
+        """
+        factor = self._factors.pop(name, None)
+        if factor is not None:
+            self.version += 1
+        return factor
+
+    def get(self, name: str) -> Optional[ScoringFactor]:
+        """
+        获取评分因素
+
+        Args:
+            name: 因素名称
+
+        Returns:
+            评分因素，不存在时返回None
+        """
+        return self._factors.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factors
+
+    def __iter__(self) -> Iterator[ScoringFactor]:
+        return iter(self._factors.values())
+
+    def __len__(self) -> int:
+        return len(self._factors)
+
+    def names(self) -> Tuple[str, ...]:
+        """
+        获取全部因素名称
+
+        Returns:
+            按注册顺序排列的因素名称元组
+        """
+        return tuple(self._factors)
+
+    def input_fields(self) -> Tuple[str, ...]:
+        """
+        获取全部因素读取的元数据字段
+
+        Returns:
+            去重后的字段名元组，保持首次出现的顺序
+        """
+        fields = []
+        for factor in self._factors.values():
+            for field in factor.input_fields:
+                if field not in fields:
+                    fields.append(field)
+        return tuple(fields)
+
+    def signature(self) -> str:
+        """
+        注册表的标识，由各因素的名称、评分函数和评分范围组成
+
+        Returns:
+            标识字符串
+        """
+        return ";".join(f"{factor.signature()}[{factor.min_score},{factor.max_score}]"
+                        for factor in self._factors.values())
+
+    def evaluation_order(self, weights: Dict[str, float]) -> List[ScoringFactor]:
+        """
+        门限评估的因素顺序：成本低的在前，成本相同时对总评分影响范围大的在前
+
+        Args:
+            weights: 当前权重 {因素名称: 权重}
+
+        Returns:
+            排序后的评分因素列表
+        """
+        factors = list(self._factors.values())
+        return sorted(factors, key=lambda factor: (
+            factor.cost, -abs(weights.get(factor.name, 0)) * (factor.max_score - factor.min_score)))
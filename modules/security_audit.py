@@ -1,6 +1,6 @@
 import json
 import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 
 class SecurityAudit:
     """
@@ -25,15 +25,23 @@ class SecurityAudit:
         Returns:
             安全审计报告字典
         """
+        skill_info = {
+            "name": skill_metadata.get("name"),
+            "version": skill_metadata.get("version"),
+            "author": skill_metadata.get("author"),
+            "hash": skill_metadata.get("hash")
+        }
+        # Merkle哈希模式下附带相对上一次审计变化的文件
+        if "changed_files" in skill_metadata:
+            skill_info["changed_files"] = skill_metadata["changed_files"]
+        # 清单文件解析失败等收集阶段的诊断信息
+        if "diagnostics" in skill_metadata:
+            skill_info["diagnostics"] = skill_metadata["diagnostics"]
+
         report = {
             "report_id": self._generate_report_id(),
             "timestamp": datetime.datetime.now().isoformat(),
-            "skill_info": {
-                "name": skill_metadata.get("name"),
-                "version": skill_metadata.get("version"),
-                "author": skill_metadata.get("author"),
-                "hash": skill_metadata.get("hash")
-            },
+            "skill_info": skill_info,
             "trust_scores": trust_scores,
             "security_assessment": self._assess_security(skill_metadata, trust_scores),
             "recommendations": self._generate_recommendations(skill_metadata, trust_scores),
@@ -170,45 +178,76 @@ class SecurityAudit:
             print(f"Error saving report: {e}")
             return False
 
-    def generate_batch_audit_reports(self, skills_data: List[Dict]) -> List[Dict]:
+    def iter_audit_reports(self, skills_data: Iterable[Dict]) -> Iterator[Dict]:
         """
-        批量生成多个技能的安全审计报告
+        流式生成多个技能的安全审计报告
 
         Args:
-            skills_data: 包含技能元数据和信任评分的列表
+            skills_data: 包含技能元数据和信任评分的可迭代对象
 
         Returns:
-            安全审计报告列表
+            安全审计报告迭代器
         """
-        reports = []
         for skill_data in skills_data:
             if "metadata" in skill_data and "trust_scores" in skill_data:
-                report = self.generate_audit_report(
+                yield self.generate_audit_report(
                     skill_data["metadata"],
                     skill_data["trust_scores"]
                 )
-                reports.append(report)
-        return reports
 
-    def generate_summary_report(self, reports: List[Dict]) -> Dict:
+    def generate_batch_audit_reports(self, skills_data: List[Dict]) -> List[Dict]:
+        """
+        批量生成多个技能的安全审计报告
+
+        Args:
+            skills_data: 包含技能元数据和信任评分的列表
+
+        Returns:
+            安全审计报告列表
+        """
+        return list(self.iter_audit_reports(skills_data))
+
+    def generate_summary_report(self, reports: Iterable[Dict], include_details: bool = True) -> Dict:
         """
         生成多个技能的汇总审计报告
 
+        报告逐个累计到汇总中，因此也可以直接传入报告迭代器；
+        include_details为False时不保留明细，内存占用与技能数量无关
+
         Args:
-            reports: 安全审计报告列表
+            reports: 安全审计报告列表或迭代器
+            include_details: 是否在汇总中保留各技能的报告明细
 
         Returns:
             汇总审计报告字典
         """
-        total_skills = len(reports)
-        high_risk_skills = sum(1 for r in reports if r["security_assessment"]["risk_level"] == "高风险")
-        medium_risk_skills = sum(1 for r in reports if r["security_assessment"]["risk_level"] == "中风险")
-        low_risk_skills = sum(1 for r in reports if r["security_assessment"]["risk_level"] == "低风险")
+        total_skills = 0
+        high_risk_skills = 0
+        medium_risk_skills = 0
+        low_risk_skills = 0
+        score_sum = 0
+        compliant_skills = 0
+        detailed_reports = []
+
+        for r in reports:
+            total_skills += 1
+            risk_level = r["security_assessment"]["risk_level"]
+            if risk_level == "高风险":
+                high_risk_skills += 1
+            elif risk_level == "中风险":
+                medium_risk_skills += 1
+            elif risk_level == "低风险":
+                low_risk_skills += 1
+            score_sum += r["trust_scores"].get("total_score", 0)
+            if r["compliance_status"]["overall_compliance"]:
+                compliant_skills += 1
+            if include_details:
+                detailed_reports.append(r)
 
         # 计算平均信任评分
         avg_score = 0
         if total_skills > 0:
-            avg_score = sum(r["trust_scores"].get("total_score", 0) for r in reports) / total_skills
+            avg_score = score_sum / total_skills
 
         return {
             "report_id": self._generate_report_id(),
@@ -219,7 +258,7 @@ class SecurityAudit:
                 "medium_risk_skills": medium_risk_skills,
                 "low_risk_skills": low_risk_skills,
                 "average_trust_score": round(avg_score, 2),
-                "compliance_rate": sum(1 for r in reports if r["compliance_status"]["overall_compliance"]) / total_skills * 100 if total_skills > 0 else 0
+                "compliance_rate": compliant_skills / total_skills * 100 if total_skills > 0 else 0
             },
-            "detailed_reports": reports
+            "detailed_reports": detailed_reports
         }
\ No newline at end of file
@@ -0,0 +1,354 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# inotify事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_MASK_ADD = 0x20000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class SkillWatcher:
+    """
+    技能目录变更监视模块
+    监视技能目录下的文件变化，去抖后按技能名称汇报需要重新审计的技能。
+    Linux上使用inotify，其他平台或inotify不可用时退化为stat轮询
+    """
+
+    def __init__(self, skill_directories: List[str],
+                 extensions: Tuple[str, ...] = (".py", ".json", ".js"),
+                 debounce: float = 0.5, poll_interval: float = 1.0,
+                 use_inotify: Optional[bool] = None):
+        """
+        初始化技能监视器
+
+        Args:
+            skill_directories: 技能目录列表
+            extensions: 关心的文件后缀，其他文件的变化被忽略
+            debounce: 去抖时长（秒），最后一次变化后静默这么久才汇报
+            poll_interval: 轮询模式下两次扫描的间隔（秒）
+            use_inotify: 是否使用inotify，None表示自动选择
+        """
+        self.skill_directories = skill_directories
+        self.extensions = extensions
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        # 监视过程中遇到的问题，如inotify监视数达到上限
+        self.diagnostics = []
+
+        self._inotify_fd = None
+        self._watches = {}
+        # 尚不存在的技能目录：{祖先目录的监视描述符: 祖先目录}，该目录被创建后改为递归监视
+        self._ancestor_watches = {}
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith("linux")
+        if use_inotify:
+            self._init_inotify()
+        self.backend = "inotify" if self._inotify_fd is not None else "polling"
+
+        self._snapshot = self._take_snapshot() if self.backend == "polling" else {}
+
+    def stop(self):
+        """请求停止监视，watch()会在当前等待结束后返回"""
+        self._stop_event.set()
+
+    def close(self):
+        """停止监视并释放inotify资源"""
+        self.stop()
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+            self._watches = {}
+            self._ancestor_watches = {}
+
+    def watch(self, timeout: Optional[float] = None) -> Iterator[List[str]]:
+        """
+        持续监视技能目录，每批去抖后的变化产出一次
+
+        Args:
+            timeout: 最长监视时间（秒），None表示直到调用stop()
+
+        Returns:
+            迭代器，每次产出按名称排序的变化技能列表
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stop_event.is_set():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return
+            changed = self.wait_for_changes(remaining)
+            if changed:
+                yield sorted(changed)
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        等待下一批变化，并在静默debounce秒后返回
+
+        Args:
+            timeout: 等待第一次变化的最长时间（秒），None表示一直等待
+
+        Returns:
+            变化的技能名称集合，超时或停止时返回空集合
+        """
+        changed = self._next_changes(timeout)
+        if not changed:
+            return changed
+
+        # 去抖：持续合并变化，直到静默debounce秒；最长合并10倍去抖时长，避免持续写入时饿死
+        hard_deadline = time.monotonic() + self.debounce * 10
+        while not self._stop_event.is_set():
+            quiet = min(self.debounce, hard_deadline - time.monotonic())
+            if quiet <= 0:
+                break
+            more = self._next_changes(quiet)
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def _next_changes(self, timeout: Optional[float]) -> Set[str]:
+        if self.backend == "inotify":
+            return self._read_inotify(timeout)
+        return self._poll(timeout)
+
+    def _skill_for_path(self, path: str, is_dir: bool = False) -> Optional[str]:
+        """
+        将变化的路径映射为所属技能的名称
+
+        技能是技能目录下的子目录，与轮询后端一致；直接位于技能目录下的文件不属于任何技能
+
+        Args:
+            path: 变化的路径
+            is_dir: 事件是否表明该路径是目录（已删除的目录无法再stat）
+
+        Returns:
+            技能名称，不属于任何技能时返回None
+        """
+        for skill_dir in self.skill_directories:
+            rel = os.path.relpath(path, skill_dir)
+            if rel == os.curdir or rel == os.pardir or rel.startswith(os.pardir + os.sep):
+                continue
+            skill_name, sep, _ = rel.partition(os.sep)
+            if sep or is_dir or os.path.isdir(path):
+                return skill_name
+        return None
+
+    # ---- 轮询后端 ----
+
+    def _take_snapshot(self) -> Dict[str, Dict[str, Tuple[int, int, int]]]:
+        """对所有技能中关心的文件做一次stat快照"""
+        snapshot = {}
+        for skill_dir in self.skill_directories:
+            try:
+                with os.scandir(skill_dir) as it:
+                    skills = [(entry.name, entry.path) for entry in it if entry.is_dir()]
+            except OSError:
+                continue
+            for skill_name, skill_path in skills:
+                files = snapshot.setdefault(skill_name, {})
+                for root, _, names in os.walk(skill_path):
+                    for name in names:
+                        if name.endswith(self.extensions):
+                            file_path = os.path.join(root, name)
+                            try:
+                                st = os.stat(file_path)
+                            except OSError:
+                                continue
+                            files[file_path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def _poll(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stop_event.is_set():
+            snapshot = self._take_snapshot()
+            changed = {name for name in set(snapshot) | set(self._snapshot)
+                       if snapshot.get(name) != self._snapshot.get(name)}
+            self._snapshot = snapshot
+            if changed:
+                return changed
+
+            wait = self.poll_interval
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    break
+            self._stop_event.wait(wait)
+        return set()
+
+    # ---- inotify后端 ----
+
+    def _init_inotify(self):
+        """通过ctypes初始化inotify，失败时保持轮询模式"""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        except (OSError, AttributeError):
+            return
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+        self._libc = libc
+        self._inotify_fd = fd
+        for skill_dir in self.skill_directories:
+            self._watch_skill_dir(skill_dir)
+
+    def _watch_skill_dir(self, skill_dir: str) -> bool:
+        """
+        递归监视技能目录；目录尚不存在时监视最近的已存在祖先目录，等待其被创建
+
+        Returns:
+            技能目录存在并已开始监视时返回True
+        """
+        if os.path.isdir(skill_dir):
+            self._add_watch_recursive(skill_dir)
+            return True
+        child = os.path.abspath(skill_dir)
+        ancestor = os.path.dirname(child)
+        while not os.path.isdir(ancestor) and os.path.dirname(ancestor) != ancestor:
+            child, ancestor = ancestor, os.path.dirname(ancestor)
+        # IN_MASK_ADD 避免覆盖该目录作为其他技能目录的一部分时已有的监视
+        wd = self._add_watch(ancestor, IN_CREATE | IN_MOVED_TO | IN_ONLYDIR | IN_MASK_ADD)
+        if wd < 0:
+            return False
+        self._ancestor_watches[wd] = ancestor
+        # 添加监视之前下一级目录可能已被创建
+        if os.path.isdir(child):
+            return self._watch_skill_dir(skill_dir)
+        return False
+
+    def _add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        """添加单个目录的监视，失败时记录诊断信息并返回负数"""
+        wd = self._libc.inotify_add_watch(self._inotify_fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                self.diagnostics.append({"file": path, "error": "inotify watch limit reached"})
+        return wd
+
+    def _add_watch_recursive(self, path: str):
+        for root, dirs, _ in os.walk(path):
+            wd = self._add_watch(root)
+            if wd < 0:
+                if self.diagnostics and self.diagnostics[-1]["file"] == root:
+                    return
+                continue
+            self._watches[wd] = root
+
+    def _read_inotify(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while not changed and not self._stop_event.is_set():
+            # 分段等待，使stop()能及时生效
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                break
+            readable, _, _ = select.select([self._inotify_fd], [], [], wait)
+            if not readable:
+                continue
+            try:
+                data = os.read(self._inotify_fd, 65536)
+            except BlockingIOError:
+                continue
+            changed |= self._parse_events(data)
+        return changed
+
+    def _parse_events(self, data: bytes) -> Set[str]:
+        changed = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，无法确定具体变化，所有技能都需要重新审计
+                changed |= self._all_skill_names()
+                continue
+            if mask & IN_IGNORED:
+                root = self._watches.pop(wd, None)
+                self._ancestor_watches.pop(wd, None)
+                # 技能目录本身被删除或移走后，重新等待其被创建
+                if root in self.skill_directories and self._watch_skill_dir(root):
+                    changed |= self._skill_names(root)
+                continue
+
+            ancestor = self._ancestor_watches.get(wd)
+            if ancestor is not None and mask & IN_ISDIR:
+                changed |= self._on_ancestor_created(os.path.join(ancestor, name))
+
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name) if name else directory
+            is_dir = bool(mask & IN_ISDIR)
+
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_watch_recursive(path)
+            if is_dir or not name or name.endswith(self.extensions):
+                skill_name = self._skill_for_path(path, is_dir)
+                if skill_name:
+                    changed.add(skill_name)
+        return changed
+
+    def _on_ancestor_created(self, path: str) -> Set[str]:
+        """
+        处理尚不存在的技能目录的祖先目录中新建的目录
+
+        新目录是某个等待中的技能目录或其祖先时重新尝试监视；技能目录出现时其中可能已有技能，
+        全部作为变化汇报
+
+        Returns:
+            新出现的技能目录中的技能名称集合
+        """
+        changed = set()
+        watched = set(self._watches.values())
+        for skill_dir in self.skill_directories:
+            target = os.path.abspath(skill_dir)
+            if skill_dir in watched or (target != path and not target.startswith(path + os.sep)):
+                continue
+            if self._watch_skill_dir(skill_dir):
+                changed |= self._skill_names(skill_dir)
+        return changed
+
+    def _all_skill_names(self) -> Set[str]:
+        names = set()
+        for skill_dir in self.skill_directories:
+            names |= self._skill_names(skill_dir)
+        return names
+
+    @staticmethod
+    def _skill_names(skill_dir: str) -> Set[str]:
+        try:
+            with os.scandir(skill_dir) as it:
+                return {entry.name for entry in it if entry.is_dir()}
+        except OSError:
+            return set()
@@ -0,0 +1,326 @@
+"""
+基于SQLite的Isnad Chain存储后端
+审计记录逐行存放在数据库中，只有被访问的传承链才会读入内存；
+使用WAL模式，多个进程可以在写入的同时并发读取
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from skill_trust_network.modules.chain_store import (
+    ChainStore, GENESIS_DIGEST, link_record, new_chain, record_skill_identity, sequence_records, stored_content_digest,
+    upgrade_chain
+)
+
+# 数据库结构版本，保存在 PRAGMA user_version 中
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chains (
+    skill_hash TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    skill_name TEXT,
+    skill_version TEXT,
+    audit_count INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    head_digest TEXT NOT NULL DEFAULT '',
+    latest_timestamp TEXT,
+    verified_count INTEGER NOT NULL DEFAULT 0,
+    verified_digest TEXT NOT NULL DEFAULT '',
+    verified_score_sum REAL
+);
+CREATE TABLE IF NOT EXISTS audits (
+    id INTEGER PRIMARY KEY,
+    skill_hash TEXT NOT NULL,
+    position INTEGER,
+    auditor TEXT,
+    timestamp TEXT,
+    trust_score REAL,
+    seq INTEGER,
+    content_digest TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chains_name ON chains (skill_name, skill_version);
+CREATE INDEX IF NOT EXISTS idx_chains_latest ON chains (latest_timestamp);
+CREATE INDEX IF NOT EXISTS idx_audits_skill_hash ON audits (skill_hash, id);
+CREATE INDEX IF NOT EXISTS idx_audits_position ON audits (skill_hash, position);
+CREATE INDEX IF NOT EXISTS idx_audits_auditor ON audits (auditor, timestamp);
+CREATE INDEX IF NOT EXISTS idx_audits_timestamp ON audits (timestamp);
+CREATE INDEX IF NOT EXISTS idx_audits_seq ON audits (seq);
+CREATE INDEX IF NOT EXISTS idx_audits_content ON audits (skill_hash, content_digest);
+"""
+
+HEADER_FIELDS = ("created_at", "skill_name", "skill_version", "audit_count", "score_sum", "head_digest",
+                 "latest_timestamp", "verified_count", "verified_digest", "verified_score_sum")
+
+# 语句保持为固定文本，由sqlite3的语句缓存复用预编译结果
+SQL_INSERT_CHAIN = ("INSERT INTO chains (skill_hash, created_at, head_digest, verified_digest) "
+                    "VALUES (?, ?, ?, ?)")
+SQL_UPDATE_AGGREGATES = ("UPDATE chains SET audit_count = ?, score_sum = ?, head_digest = ?, "
+                         "latest_timestamp = ? WHERE skill_hash = ?")
+SQL_UPDATE_IDENTITY = "UPDATE chains SET skill_name = ?, skill_version = ? WHERE skill_hash = ?"
+SQL_UPDATE_CHECKPOINT = ("UPDATE chains SET verified_count = ?, verified_digest = ?, verified_score_sum = ? "
+                         "WHERE skill_hash = ?")
+SQL_INSERT_AUDIT = ("INSERT INTO audits (skill_hash, position, auditor, timestamp, trust_score, seq, "
+                    "content_digest, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+SQL_SELECT_HEADER = "SELECT " + ", ".join(HEADER_FIELDS) + " FROM chains WHERE skill_hash = ?"
+SQL_SELECT_RECORDS = "SELECT record FROM audits WHERE skill_hash = ? AND position >= ? ORDER BY position"
+SQL_SELECT_AUDITORS = "SELECT auditor FROM audits WHERE skill_hash = ? ORDER BY position"
+SQL_SELECT_BY_NAME = "SELECT skill_hash FROM chains WHERE skill_name = ? ORDER BY rowid"
+SQL_SELECT_BY_NAME_VERSION = ("SELECT skill_hash FROM chains WHERE skill_name = ? AND skill_version = ? "
+                              "ORDER BY rowid")
+SQL_SELECT_STALE = ("SELECT skill_hash FROM chains WHERE latest_timestamp < ? "
+                    "ORDER BY latest_timestamp, skill_hash")
+SQL_SELECT_SINCE = "SELECT skill_hash, record FROM audits WHERE seq > ? ORDER BY seq"
+SQL_HAS_CONTENT = "SELECT 1 FROM audits WHERE skill_hash = ? AND content_digest = ? LIMIT 1"
+SQL_MAX_SEQ = "SELECT COALESCE(MAX(seq), 0) FROM audits"
+SQL_SELECT_HASHES = "SELECT skill_hash FROM chains ORDER BY rowid"
+SQL_COUNT_CHAINS = "SELECT COUNT(*) FROM chains"
+
+
+class SQLiteChainStore(ChainStore):
+    """SQLite存储后端，chains属性是按需查询数据库的只读映射"""
+
+    def __init__(self, db_file: str, legacy_json_file: Optional[str] = None):
+        """
+        初始化SQLite存储
+
+        Args:
+            db_file: 数据库文件路径
+            legacy_json_file: 原JSON文件路径，数据库为空且该文件存在时从中导入
+        """
+        self.db_file = db_file
+        self.legacy_json_file = legacy_json_file
+        self.chains = _SQLiteChainsView(self)
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def load(self):
+        with self._lock:
+            if self._conn is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+                self._conn = sqlite3.connect(self.db_file, check_same_thread=False, cached_statements=64)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._init_schema()
+
+            empty = self._conn.execute(SQL_COUNT_CHAINS).fetchone()[0] == 0
+        if empty and self.legacy_json_file and os.path.exists(self.legacy_json_file):
+            self.import_json(self.legacy_json_file)
+
+    def save(self):
+        # 每次写入都在事务中提交，这里只需确保没有未提交的事务
+        with self._lock:
+            self._conn.commit()
+
+    def get_chain(self, skill_hash: str) -> Optional[Dict]:
+        with self._lock:
+            chain = self.get_chain_header(skill_hash)
+            if chain is None:
+                return None
+            chain["audit_chain"] = self.get_records(skill_hash)
+        return chain
+
+    def get_chain_header(self, skill_hash: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(SQL_SELECT_HEADER, (skill_hash,)).fetchone()
+        if row is None:
+            return None
+        header = {"skill_hash": skill_hash}
+        header.update(zip(HEADER_FIELDS, row))
+        return header
+
+    def get_records(self, skill_hash: str, start: int = 0) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(SQL_SELECT_RECORDS, (skill_hash, start)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_auditors(self, skill_hash: str) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(SQL_SELECT_AUDITORS, (skill_hash,))]
+
+    def find_chains(self, skill_name: str, skill_version: Optional[str] = None) -> List[str]:
+        with self._lock:
+            if skill_version is None:
+                rows = self._conn.execute(SQL_SELECT_BY_NAME, (skill_name,))
+            else:
+                rows = self._conn.execute(SQL_SELECT_BY_NAME_VERSION, (skill_name, skill_version))
+            return [row[0] for row in rows]
+
+    def query_audits(self, auditor: Optional[str] = None, since: Optional[str] = None,
+                     until: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        # 由 idx_audits_auditor / idx_audits_timestamp 索引支持的范围查询
+        conditions, params = [], []
+        if auditor is not None:
+            conditions.append("auditor = ?")
+            params.append(auditor)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        sql = "SELECT skill_hash, record FROM audits"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp, skill_hash, position"
+        for skill_hash, record in self._iter_rows(sql, params):
+            yield skill_hash, json.loads(record)
+
+    def stale_chains(self, before: str) -> Iterator[str]:
+        for (skill_hash,) in self._iter_rows(SQL_SELECT_STALE, (before,)):
+            yield skill_hash
+
+    def records_since(self, seq: int) -> Iterator[Tuple[str, Dict]]:
+        for skill_hash, record in self._iter_rows(SQL_SELECT_SINCE, (seq,)):
+            yield skill_hash, json.loads(record)
+
+    def has_content(self, skill_hash: str, content_digest: str) -> bool:
+        # 由 idx_audits_content 索引支持的单行查询
+        with self._lock:
+            return self._conn.execute(SQL_HAS_CONTENT, (skill_hash, content_digest)).fetchone() is not None
+
+    def update_checkpoint(self, skill_hash: str, verified_count: int, verified_digest: str,
+                          verified_score_sum: float):
+        with self._lock, self._conn:
+            self._conn.execute(SQL_UPDATE_CHECKPOINT, (verified_count, verified_digest, verified_score_sum,
+                                                       skill_hash))
+
+    def append_records(self, items: Iterable[Tuple[str, Dict, str]]):
+        with self._lock, self._conn:
+            # 先取得写锁再读取最大序号，其他进程不会分配到相同的序号
+            self._conn.execute("BEGIN IMMEDIATE")
+            (seq,) = self._conn.execute(SQL_MAX_SEQ).fetchone()
+            headers = {}
+            for skill_hash, record, created_at in items:
+                header = headers.get(skill_hash)
+                if header is None:
+                    header = self.get_chain_header(skill_hash)
+                    if header is None:
+                        self._conn.execute(SQL_INSERT_CHAIN,
+                                           (skill_hash, created_at, GENESIS_DIGEST, GENESIS_DIGEST))
+                        header = new_chain(skill_hash, created_at)
+                    headers[skill_hash] = header
+
+                if not header["skill_name"]:
+                    name, version = record_skill_identity(record)
+                    if name:
+                        header["skill_name"], header["skill_version"] = name, version
+                        self._conn.execute(SQL_UPDATE_IDENTITY, (name, version, skill_hash))
+
+                link_record(record, header["head_digest"])
+                seq += 1
+                record["seq"] = seq
+                self._insert_record(skill_hash, header["audit_count"], record)
+
+                header["audit_count"] += 1
+                header["score_sum"] += record.get("trust_score", 0)
+                header["head_digest"] = record["digest"]
+                header["latest_timestamp"] = record.get("timestamp")
+
+            for skill_hash, header in headers.items():
+                self._conn.execute(SQL_UPDATE_AGGREGATES, (
+                    header["audit_count"], header["score_sum"], header["head_digest"],
+                    header["latest_timestamp"], skill_hash
+                ))
+
+    def replace_all(self, chains: Dict):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM audits")
+            self._conn.execute("DELETE FROM chains")
+            for chain in chains.values():
+                upgrade_chain(chain)
+            sequence_records(chains.values())
+            for skill_hash, chain in chains.items():
+                self._insert_chain(skill_hash, chain)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def iter_hashes(self) -> Iterator[str]:
+        """按创建顺序逐个产出技能哈希"""
+        for (skill_hash,) in self._iter_rows(SQL_SELECT_HASHES):
+            yield skill_hash
+
+    def count(self) -> int:
+        """传承链数量"""
+        with self._lock:
+            return self._conn.execute(SQL_COUNT_CHAINS).fetchone()[0]
+
+    def _iter_rows(self, sql: str, params: Iterable = ()) -> Iterator[Tuple]:
+        """分批读取查询结果，避免一次性载入全部行"""
+        with self._lock:
+            cursor = self._conn.execute(sql, tuple(params))
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            yield from rows
+
+    def _insert_chain(self, skill_hash: str, chain: Dict):
+        """插入一条完整的传承链（含聚合字段和全部记录）"""
+        self._conn.execute(SQL_INSERT_CHAIN, (skill_hash, chain.get("created_at", ""),
+                                              GENESIS_DIGEST, GENESIS_DIGEST))
+        for position, record in enumerate(chain["audit_chain"]):
+            self._insert_record(skill_hash, position, record)
+        self._conn.execute(SQL_UPDATE_AGGREGATES, (
+            chain["audit_count"], chain["score_sum"], chain["head_digest"],
+            chain["latest_timestamp"], skill_hash
+        ))
+        self._conn.execute(SQL_UPDATE_CHECKPOINT, (chain["verified_count"], chain["verified_digest"],
+                                                   chain.get("verified_score_sum"), skill_hash))
+        self._conn.execute(SQL_UPDATE_IDENTITY, (chain["skill_name"], chain["skill_version"], skill_hash))
+
+    def _insert_record(self, skill_hash: str, position: int, record: Dict):
+        self._conn.execute(SQL_INSERT_AUDIT, (
+            skill_hash,
+            position,
+            record.get("auditor"),
+            record.get("timestamp"),
+            record.get("trust_score"),
+            record.get("seq"),
+            stored_content_digest(record),
+            json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        ))
+
+    def _init_schema(self):
+        """创建数据库结构，版本1的数据库补上检查点的评分累计，结构版本不符时拒绝打开"""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, 1, SCHEMA_VERSION):
+            raise ValueError(f"Unsupported isnad database schema version {version} in {self.db_file}")
+        if version == 1:
+            # 原有检查点没有评分累计，保持为NULL，下一次校验从第一条记录开始
+            self._conn.execute("ALTER TABLE chains ADD COLUMN verified_score_sum REAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+
+class _SQLiteChainsView(Mapping):
+    """把SQLite中的传承链呈现为只读映射，每次访问只读取一条传承链"""
+
+    def __init__(self, store: SQLiteChainStore):
+        self._store = store
+
+    def __getitem__(self, skill_hash: str) -> Dict:
+        chain = self._store.get_chain(skill_hash)
+        if chain is None:
+            raise KeyError(skill_hash)
+        return chain
+
+    def __contains__(self, skill_hash) -> bool:
+        return self._store.get_chain_header(skill_hash) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return self._store.iter_hashes()
+
+    def __len__(self) -> int:
+        return self._store.count()
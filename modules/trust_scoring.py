@@ -1,4 +1,49 @@
-from typing import Dict, List, Optional
+import json
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from skill_trust_network.modules.score_cache import TrustScoreCache
+from skill_trust_network.modules.factor_matrix import FactorScoreMatrix
+from skill_trust_network.modules.scoring_factors import FactorRegistry, ScoringFactor
+from skill_trust_network.modules.usage_tracker import UsageTracker, DEFAULT_USAGE_SCORE
+from skill_trust_network.modules.author_reputation import AuthorReputationGraph
+from skill_trust_network.modules.code_quality import CodeQualityAnalyzer
+
+# 评分规则的版本，规则变化时递增，使已缓存的评分失效
+SCORING_VERSION = 1
+
+# 参与评分的元数据字段，与技能内容哈希一起构成评分缓存的键
+SCORE_INPUT_FIELDS = ("author", "trust_chain", "permissions")
+
+# 评分因素，顺序与 _compute_trust_score 中累加总评分的顺序一致
+FACTORS = ("author_reputation", "community_audit", "usage_history", "permission_reasonableness", "code_quality")
+
+# 内置因素的 (评分方法, 评分下限, 评分上限)；子类改写评分方法时范围放宽为0-100
+_BUILTIN_FACTORS = {
+    "author_reputation": ("_calculate_author_reputation", 50, 90),
+    "community_audit": ("_calculate_community_audit", 40, 90),
+    "usage_history": ("_calculate_usage_history", 60, 60),
+    "permission_reasonableness": ("_calculate_permission_reasonableness", 40, 90),
+    "code_quality": ("_calculate_code_quality", 40, 70)
+}
+
+# 启用评分缓存时的默认条目数
+DEFAULT_CACHE_SIZE = 1024
+
+# 门限评估判定低于阈值时留出的取整余量，总评分保留两位小数后才与阈值比较
+_GATE_MARGIN = 0.01
+
+# 批量计算以向量化方式复现的方法，子类改写其中任何一个时批量计算退回逐个计算
+_SCALAR_METHODS = ("calculate_trust_score", "_compute_trust_score", "_calculate_author_reputation",
+                   "_calculate_community_audit", "_calculate_usage_history", "_calculate_permission_reasonableness",
+                   "_calculate_code_quality")
+
+# 信任级别的下限，从高到低，与 get_trust_level 一致
+_LEVEL_THRESHOLDS = ((80, "高信任"), (60, "中信任"), (40, "低信任"))
+_LOWEST_LEVEL = "不可信"
+
 
 class TrustScoring:
     """
@@ -6,9 +51,21 @@ class TrustScoring:
     负责计算技能的信任评分，基于多个因素
     """
 
-    def __init__(self):
+    def __init__(self, cache_size: Optional[int] = None, cache_file: Optional[str] = None,
+                 factor_file: Optional[str] = None, usage_tracker: Optional[UsageTracker] = None,
+                 author_graph: Optional[AuthorReputationGraph] = None,
+                 code_analyzer: Optional[CodeQualityAnalyzer] = None):
         """
         初始化信任评分计算器
+
+        Args:
+            cache_size: 评分缓存的最大条目数，0表示不缓存；None表示只在设置了缓存文件或
+                        代码质量分析器时缓存 DEFAULT_CACHE_SIZE 条，内置的其余因素计算比查询缓存更快
+            cache_file: 评分缓存文件路径，为None时只在内存中缓存
+            factor_file: 因素评分矩阵文件路径（.npz），为None时只保存在内存中
+            usage_tracker: 技能使用统计，为None时使用历史评分固定为默认值
+            author_graph: 作者声誉图，为None时只按作者名称评分
+            code_analyzer: 代码质量分析器，为None时只按技能哈希是否存在评分
         """
         # 各因素的权重
         self.weights = {
@@ -18,10 +75,100 @@ class TrustScoring:
             "permission_reasonableness": 0.2,
             "code_quality": 0.15
         }
+        self.usage_tracker = usage_tracker
+        self.author_graph = author_graph
+        self.code_analyzer = code_analyzer
+        # 评分因素注册表，总评分按注册顺序累加
+        self.factor_registry = FactorRegistry(self._builtin_factors())
+        self._builtin_registry_version = self.factor_registry.version
+        if cache_size is None:
+            cache_size = DEFAULT_CACHE_SIZE if cache_file or code_analyzer is not None else 0
+        self.score_cache = TrustScoreCache(cache_size, cache_file) if cache_size > 0 else None
+        # 已评分技能的各因素评分，调整权重时不必重新评估各因素
+        self.factor_matrix = FactorScoreMatrix(FACTORS, factor_file)
+        # ((权重, 注册表版本), 版本标签)，两者不变时复用上次生成的标签
+        self._policy = (None, None)
+        # 参与评分缓存键的元数据字段，随注册的因素变化
+        self._input_fields = SCORE_INPUT_FIELDS
+
+    def _builtin_factors(self) -> List[ScoringFactor]:
+        """
+        生成内置的评分因素，评分函数为本对象的 _calculate_* 方法
+
+        Returns:
+            按FACTORS顺序排列的评分因素列表
+        """
+        factors = []
+        cls = type(self)
+        for name in FACTORS:
+            method, min_score, max_score = _BUILTIN_FACTORS[name]
+            if getattr(cls, method) is not getattr(TrustScoring, method) or \
+                    (name == "usage_history" and self.usage_tracker is not None) or \
+                    (name == "code_quality" and self.code_analyzer is not None):
+                min_score, max_score = 0, 100
+            # 静态分析需要读取和解析源文件，门限评估最后才运行
+            cost = 10.0 if name == "code_quality" and self.code_analyzer is not None else 1.0
+            factors.append(ScoringFactor(name, getattr(self, method), self.weights[name],
+                                         min_score, max_score, cost=cost))
+        return factors
+
+    def register_factor(self, factor: ScoringFactor):
+        """
+        注册评分因素，同名因素（包括内置因素）被原位替换，因素声明的权重成为当前权重
+
+        注册自定义因素后批量计算退回逐个计算，因素评分矩阵也不再记录新的评分
+
+        Args:
+            factor: 评分因素
+        """
+        self.factor_registry.register(factor)
+        self.weights[factor.name] = factor.weight
+
+    def unregister_factor(self, name: str) -> Optional[ScoringFactor]:
+        """
+        注销评分因素，其权重一并删除
+
+        Args:
+            name: 因素名称
+
+        Returns:
+            被注销的评分因素，不存在时返回None
+        """
+        factor = self.factor_registry.unregister(name)
+        if factor is not None:
+            self.weights.pop(name, None)
+        return factor
+
+    def _uses_builtin_factors(self) -> bool:
+        """注册表是否仍是初始化时的内置因素"""
+        return self.factor_registry.version == self._builtin_registry_version
+
+    def policy_version(self) -> str:
+        """
+        评分策略的版本标签，由评分规则版本、评分类和当前权重生成；
+        修改权重或改用子类后，旧的缓存评分不会再被命中
+
+        Returns:
+            版本标签字符串
+        """
+        state = (tuple(self.weights.items()), self.factor_registry.version)
+        if state != self._policy[0]:
+            cls = type(self)
+            policy = f"{SCORING_VERSION}:{cls.__module__}.{cls.__qualname__}:" + \
+                json.dumps(self.weights, sort_keys=True) + ":" + self.factor_registry.signature()
+            # 标签会出现在每个缓存键中，使用策略描述的短摘要
+            self._policy = (state, hashlib.sha256(policy.encode("utf-8")).hexdigest()[:16])
+            extra_fields = self.factor_registry.input_fields()
+            if self.code_analyzer is not None:
+                # 代码质量评分来自技能目录中的源文件
+                extra_fields += ("path",)
+            self._input_fields = SCORE_INPUT_FIELDS + tuple(
+                field for field in dict.fromkeys(extra_fields) if field not in SCORE_INPUT_FIELDS)
+        return self._policy[1]
 
     def calculate_trust_score(self, skill_metadata: Dict) -> Dict:
         """
-        计算技能的信任评分
+        计算技能的信任评分，输入未变化的技能直接使用缓存的评分
 
         Args:
             skill_metadata: 技能元数据字典
@@ -29,15 +176,155 @@ class TrustScoring:
         Returns:
             包含各因素评分和总评分的字典
         """
-        # 计算各因素的评分
-        scores = {
-            "author_reputation": self._calculate_author_reputation(skill_metadata),
-            "community_audit": self._calculate_community_audit(skill_metadata),
-            "usage_history": self._calculate_usage_history(skill_metadata),
-            "permission_reasonableness": self._calculate_permission_reasonableness(skill_metadata),
-            "code_quality": self._calculate_code_quality(skill_metadata)
+        if self.score_cache is None:
+            scores = self._compute_trust_score(skill_metadata)
+            self._record_factors(skill_metadata, scores)
+            return scores
+
+        # 缺少的字段与值为None的字段评分不同，只放入实际存在的字段
+        policy = self.policy_version()
+        fields = [(field, skill_metadata[field]) for field in self._input_fields if field in skill_metadata]
+        if self.usage_tracker is not None:
+            # 使用历史评分随使用事件和时间变化，当前评分作为键的一部分
+            fields.append(("usage_history", self.usage_tracker.usage_score(skill_metadata.get("name"))))
+        if self.author_graph is not None:
+            # 作者评分随传承链的新审计变化，同样作为键的一部分
+            fields.append(("author_reputation", self.author_graph.author_score(skill_metadata.get("author", "unknown"))))
+        key = TrustScoreCache.make_key(skill_metadata.get("hash", ""), fields, policy)
+        scores = self.score_cache.get(key)
+        if scores is None:
+            scores = self._compute_trust_score(skill_metadata)
+            self.score_cache.put(key, scores)
+        self._record_factors(skill_metadata, scores)
+        return scores
+
+    def reweight(self, weights: Dict[str, float], apply: bool = False) -> Dict:
+        """
+        用新的权重对全部已评分技能重新计算总评分，报告信任级别发生变化的技能
+
+        只对因素评分矩阵做一次向量化计算，不重新评估任何技能
+
+        Args:
+            weights: 新的权重 {因素名称: 权重}
+            apply: 是否把新权重设为当前权重
+
+        Returns:
+            包含技能数量、新权重下各信任级别的技能数量和级别变化明细的字典
+        """
+        hashes, names, _ = self.factor_matrix.arrays()
+        old_totals = self.factor_matrix.totals(self.weights)
+        new_totals = self.factor_matrix.totals(weights)
+        if type(self).get_trust_level is TrustScoring.get_trust_level:
+            level_names = [level for _, level in _LEVEL_THRESHOLDS] + [_LOWEST_LEVEL]
+            old_levels = self._trust_levels(old_totals)
+            new_levels = self._trust_levels(new_totals)
+            changed_rows = np.flatnonzero(old_levels != new_levels).tolist()
+            counts = np.bincount(new_levels, minlength=len(level_names)).tolist()
+            level_counts = {level: count for level, count in zip(level_names, counts) if count}
+            old_levels = [level_names[old_levels[index]] for index in changed_rows]
+            new_levels = [level_names[new_levels[index]] for index in changed_rows]
+        else:
+            # 子类改写了信任级别的划分，逐个技能调用 get_trust_level
+            old_levels = [self.get_trust_level(round(total, 2)) for total in old_totals.tolist()]
+            new_levels = [self.get_trust_level(round(total, 2)) for total in new_totals.tolist()]
+            changed_rows = [i for i, (old, new) in enumerate(zip(old_levels, new_levels)) if old != new]
+            level_counts = {}
+            for level in new_levels:
+                level_counts[level] = level_counts.get(level, 0) + 1
+            old_levels = [old_levels[index] for index in changed_rows]
+            new_levels = [new_levels[index] for index in changed_rows]
+
+        old_scores = old_totals[changed_rows].tolist()
+        new_scores = new_totals[changed_rows].tolist()
+        changed = []
+        for i, index in enumerate(changed_rows):
+            changed.append({
+                "skill_hash": hashes[index],
+                "skill_name": names[index],
+                "old_score": round(old_scores[i], 2),
+                "new_score": round(new_scores[i], 2),
+                "old_level": old_levels[i],
+                "new_level": new_levels[i]
+            })
+
+        if apply:
+            self.weights = dict(weights)
+        return {
+            "skill_count": len(hashes),
+            "level_counts": level_counts,
+            "changed": changed
         }
 
+    def save(self) -> bool:
+        """
+        将评分缓存、因素评分矩阵、使用统计和代码分析缓存写回磁盘（未设置文件的部分不做任何事）
+
+        Returns:
+            是否全部保存成功
+        """
+        saved = self.save_score_cache()
+        saved = self.factor_matrix.save() and saved
+        if self.usage_tracker is not None:
+            saved = self.usage_tracker.save() and saved
+        if self.code_analyzer is not None:
+            saved = self.code_analyzer.save() and saved
+        return saved
+
+    def prepare(self, skills_metadata: List[Dict]):
+        """
+        预先分析一批技能的源文件，需要解析的文件一起在进程池中并行处理，
+        之后逐个评分时直接使用分析结果；传入空列表时丢弃上一批未使用的结果；
+        未设置代码质量分析器时不做任何事
+
+        Args:
+            skills_metadata: 技能元数据列表
+        """
+        if self.code_analyzer is None:
+            return
+        self.code_analyzer.prepare(metadata["path"] for metadata in skills_metadata if metadata.get("path"))
+
+    def close(self):
+        """关闭代码质量分析器的进程池"""
+        if self.code_analyzer is not None:
+            self.code_analyzer.close()
+
+    def save_score_cache(self) -> bool:
+        """
+        将评分缓存写回磁盘（未启用缓存或未设置缓存文件时不做任何事）
+
+        Returns:
+            保存是否成功
+        """
+        if self.score_cache is None:
+            return True
+        return self.score_cache.save()
+
+    def get_score_cache_stats(self) -> Optional[Dict]:
+        """
+        获取评分缓存的命中统计
+
+        Returns:
+            命中统计字典，未启用缓存时返回None
+        """
+        if self.score_cache is None:
+            return None
+        return self.score_cache.get_stats()
+
+    def _compute_trust_score(self, skill_metadata: Dict) -> Dict:
+        """
+        不经过缓存计算技能的信任评分
+
+        Args:
+            skill_metadata: 技能元数据字典
+
+        Returns:
+            包含各因素评分和总评分的字典
+        """
+        # 按注册顺序计算各因素的评分
+        scores = {}
+        for factor in self.factor_registry:
+            scores[factor.name] = factor.compute(skill_metadata)
+
         # 计算总评分
         total_score = 0
         for factor, score in scores.items():
@@ -46,6 +333,67 @@ class TrustScoring:
         scores["total_score"] = round(total_score, 2)
         return scores
 
+    def gate_trust_score(self, skill_metadata: Dict, threshold: float) -> Dict:
+        """
+        判断技能的总评分是否低于阈值，只计算做出判断所需的因素
+
+        按成本从低到高逐个计算因素，每一步用剩余因素的评分范围估计总评分的上下限，
+        上下限都落在阈值同一侧时立即返回；全部因素计算完时结果与 calculate_trust_score 一致
+
+        Args:
+            skill_metadata: 技能元数据字典
+            threshold: 总评分阈值
+
+        Returns:
+            包含是否低于阈值、总评分（全部因素计算完时才有）、总评分上下限
+            和已计算因素评分的字典
+        """
+        weights = self.weights
+        # 各因素对总评分的贡献范围，权重为负时上下限互换
+        spans = {}
+        lower = upper = 0
+        for factor in self.factor_registry:
+            weight = weights[factor.name]
+            low, high = sorted((factor.min_score * weight, factor.max_score * weight))
+            spans[factor.name] = (low, high)
+            lower += low
+            upper += high
+
+        scores = {}
+        below_threshold = None
+        for factor in self.factor_registry.evaluation_order(weights):
+            if upper <= threshold - _GATE_MARGIN:
+                below_threshold = True
+                break
+            if lower >= threshold:
+                below_threshold = False
+                break
+            score = factor.compute(skill_metadata)
+            scores[factor.name] = score
+            low, high = spans[factor.name]
+            contribution = score * weights[factor.name]
+            lower += contribution - low
+            upper += contribution - high
+
+        total_score = None
+        if below_threshold is None:
+            # 全部因素都已计算，按注册顺序累加得到与完整评分相同的总评分
+            total = 0
+            for factor in self.factor_registry:
+                total += scores[factor.name] * weights[factor.name]
+            total_score = round(total, 2)
+            below_threshold = total_score < threshold
+            lower = upper = total
+
+        return {
+            "below_threshold": below_threshold,
+            "total_score": total_score,
+            "lower_bound": round(lower, 2),
+            "upper_bound": round(upper, 2),
+            "scores": scores,
+            "skipped": [name for name in self.factor_registry.names() if name not in scores]
+        }
+
     def _calculate_author_reputation(self, skill_metadata: Dict) -> float:
         """
         计算作者声誉评分
@@ -58,8 +406,13 @@ class TrustScoring:
         """
         author = skill_metadata.get("author", "unknown")
 
-        # 这里可以集成实际的作者声誉系统
-        # 暂时基于作者名称进行简单评分
+        # 作者在声誉图中时使用由审计关系传播得到的评分
+        if self.author_graph is not None:
+            score = self.author_graph.author_score(author)
+            if score is not None:
+                return score
+
+        # 否则基于作者名称进行简单评分
         if author == "unknown":
             return 50
         elif author in ["verified", "trusted"]:
@@ -98,10 +451,10 @@ class TrustScoring:
         Returns:
             使用历史评分 (0-100)
         """
-        # 这里可以集成实际的使用统计系统
-        # 暂时返回默认值
-        # 在实际应用中，应基于技能的使用频率、时长等因素计算
-        return 60
+        # 基于衰减后的调用次数和失败率计算，未接入使用统计时返回默认值
+        if self.usage_tracker is None:
+            return DEFAULT_USAGE_SCORE
+        return self.usage_tracker.usage_score(skill_metadata.get("name"))
 
     def _calculate_permission_reasonableness(self, skill_metadata: Dict) -> float:
         """
@@ -136,13 +489,47 @@ class TrustScoring:
         Returns:
             代码质量评分 (0-100)
         """
-        # 这里可以集成实际的代码质量分析工具
-        # 暂时基于哈希值的存在性进行简单评分
+        # 有技能目录时对其中的Python文件做静态分析
+        if self.code_analyzer is not None and skill_metadata.get("path"):
+            score = self.code_analyzer.skill_score(skill_metadata["path"])
+            if score is not None:
+                return score
+
+        # 否则基于哈希值的存在性进行简单评分
         if skill_metadata.get("hash", ""):
             return 70
         else:
             return 40
 
+    def _trust_levels(self, totals: np.ndarray) -> np.ndarray:
+        """
+        向量化计算取整后总评分对应的信任级别
+
+        Args:
+            totals: 未取整的总评分数组
+
+        Returns:
+            信任级别序号数组，0为最高级别，与 _LEVEL_THRESHOLDS 的顺序一致
+        """
+        levels = np.full(len(totals), len(_LEVEL_THRESHOLDS), dtype=np.int64)
+        for index, (threshold, _) in reversed(list(enumerate(_LEVEL_THRESHOLDS))):
+            levels[totals >= threshold] = index
+        # 与阈值相差不到一个取整单位的总评分按Python的round逐个判断，结果与 get_trust_level 一致
+        near = np.zeros(len(totals), dtype=bool)
+        for threshold, _ in _LEVEL_THRESHOLDS:
+            near |= np.abs(totals - threshold) < 0.01
+        for index in np.flatnonzero(near).tolist():
+            rounded = round(totals[index].item(), 2)
+            levels[index] = next((i for i, (threshold, _) in enumerate(_LEVEL_THRESHOLDS) if rounded >= threshold),
+                                 len(_LEVEL_THRESHOLDS))
+        return levels
+
+    def _record_factors(self, skill_metadata: Dict, scores: Dict):
+        """把技能的各因素评分记入因素评分矩阵，技能哈希为空时以名称为键"""
+        key = skill_metadata.get("hash") or skill_metadata.get("name")
+        if key and self._uses_builtin_factors():
+            self.factor_matrix.record(key, skill_metadata.get("name"), scores)
+
     def get_trust_level(self, total_score: float) -> str:
         """
         根据总评分获取信任级别
@@ -162,24 +549,122 @@ class TrustScoring:
         else:
             return "不可信"
 
-    def calculate_batch_trust_scores(self, skills_metadata: List[Dict]) -> List[Dict]:
+    def iter_trust_scores(self, skills_metadata: Iterable[Dict]) -> Iterator[Dict]:
         """
-        批量计算多个技能的信任评分
+        流式计算多个技能的信任评分
 
         Args:
-            skills_metadata: 技能元数据列表
+            skills_metadata: 技能元数据的可迭代对象
 
         Returns:
-            包含各技能评分的列表
+            各技能评分结果的迭代器
         """
-        results = []
         for metadata in skills_metadata:
             scores = self.calculate_trust_score(metadata)
             trust_level = self.get_trust_level(scores["total_score"])
-            result = {
+            yield {
                 "skill_name": metadata.get("name"),
                 "scores": scores,
                 "trust_level": trust_level
             }
-            results.append(result)
-        return results
\ No newline at end of file
+
+    def calculate_batch_trust_scores(self, skills_metadata: List[Dict]) -> List[Dict]:
+        """
+        批量计算多个技能的信任评分
+
+        先把各技能的特征提取为NumPy数组，再一次性向量化计算全部因素评分和总评分，
+        结果与逐个调用 calculate_trust_score 完全相同
+
+        Args:
+            skills_metadata: 技能元数据列表
+
+        Returns:
+            包含各技能评分的列表
+        """
+        skills_metadata = list(skills_metadata)
+        cls = type(self)
+        if not skills_metadata or not self._uses_builtin_factors() or \
+                any(getattr(cls, name) is not getattr(TrustScoring, name) for name in _SCALAR_METHODS):
+            return list(self.iter_trust_scores(skills_metadata))
+
+        columns = self._batch_factor_scores(skills_metadata)
+        # 按因素顺序逐列累加，浮点运算顺序与标量路径相同；BLAS的点积会重排加法，
+        # 末位差异可能改变round的结果
+        total = np.zeros(len(skills_metadata))
+        for factor, column in zip(FACTORS, columns):
+            total += column * self.weights[factor]
+
+        # 各因素评分只有少数几种取值（0-100的整数），把一个技能的评分组合编码为一个整数，
+        # 相同的组合只生成一次评分字典和信任级别，每个技能复制一份
+        key = np.zeros(len(skills_metadata), dtype=np.int64)
+        for column in columns:
+            key = key * 128 + column
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        templates = []
+        for index in first.tolist():
+            scores = {factor: column[index].item() for factor, column in zip(FACTORS, columns)}
+            # 使用Python的round，与np.round的舍入结果在个别值上不同
+            scores["total_score"] = round(total[index].item(), 2)
+            templates.append((scores, self.get_trust_level(scores["total_score"])))
+
+        rows = [tuple(scores[factor] for factor in FACTORS) for scores, _ in templates]
+        inverse = inverse.reshape(-1).tolist()
+        self.factor_matrix.record_rows(
+            (metadata.get("hash") or metadata.get("name"), metadata.get("name"), rows[index])
+            for metadata, index in zip(skills_metadata, inverse)
+            if metadata.get("hash") or metadata.get("name")
+        )
+
+        results = []
+        for metadata, index in zip(skills_metadata, inverse):
+            scores, trust_level = templates[index]
+            results.append({
+                "skill_name": metadata.get("name"),
+                "scores": dict(scores),
+                "trust_level": trust_level
+            })
+        return results
+
+    def _batch_factor_scores(self, skills_metadata: List[Dict]) -> List[np.ndarray]:
+        """
+        向量化计算各因素评分，规则与对应的 _calculate_* 方法相同
+
+        Args:
+            skills_metadata: 技能元数据列表
+
+        Returns:
+            按FACTORS顺序排列的评分数组列表
+        """
+        count = len(skills_metadata)
+        author_names = [metadata.get("author", "unknown") for metadata in skills_metadata]
+        authors = np.empty(count, dtype=object)
+        authors[:] = author_names
+        author_unknown = authors == "unknown"
+        author_trusted = (authors == "verified") | (authors == "trusted")
+        chain_length = np.array([len(chain) if chain else 0 for chain in
+                                 [metadata.get("trust_chain", []) for metadata in skills_metadata]], dtype=np.int64)
+        permission_count = np.array([len(permissions) if permissions else 0 for permissions in
+                                     [metadata.get("permissions", []) for metadata in skills_metadata]],
+                                    dtype=np.int64)
+        has_hash = np.array([bool(metadata.get("hash", "")) for metadata in skills_metadata], dtype=bool)
+
+        author_reputation = np.select([author_unknown, author_trusted], [50, 90], default=70)
+        if self.author_graph is not None:
+            graph_scores = self.author_graph.author_scores(author_names)
+            author_reputation = np.where(graph_scores >= 0, graph_scores, author_reputation)
+        community_audit = np.select([chain_length == 0, chain_length >= 3], [40, 90],
+                                    default=60 + chain_length * 10)
+        if self.usage_tracker is None:
+            usage_history = np.full(count, DEFAULT_USAGE_SCORE, dtype=np.int64)
+        else:
+            usage_history = self.usage_tracker.usage_scores([metadata.get("name") for metadata in skills_metadata])
+        permission_reasonableness = np.select(
+            [permission_count == 0, permission_count <= 2, permission_count <= 5], [90, 80, 60], default=40)
+        code_quality = np.where(has_hash, 70, 40)
+        if self.code_analyzer is not None:
+            paths = [metadata.get("path") for metadata in skills_metadata]
+            analyzed = self.code_analyzer.analyze_skills([path for path in paths if path])
+            analyzed_scores = np.array([analyzed[path]["score"] if path and analyzed[path] is not None else -1
+                                        for path in paths], dtype=np.int64)
+            code_quality = np.where(analyzed_scores >= 0, analyzed_scores, code_quality)
+        return [author_reputation, community_audit, usage_history, permission_reasonableness, code_quality]
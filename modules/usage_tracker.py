@@ -0,0 +1,416 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from skill_trust_network.modules.atomic_file import save_atomically
+
+logger = logging.getLogger(__name__)
+
+# 没有使用记录的技能的使用历史评分，与未接入使用统计时的默认值相同
+DEFAULT_USAGE_SCORE = 60
+
+class UsageTracker:
+    """
+    技能使用统计模块
+    增量消费JSONL格式的技能使用事件，为每个技能维护按指数衰减的调用次数和失败次数；
+    计数保存在按技能编号索引的NumPy数组中，每个技能占用的内存与事件数量无关
+
+    事件格式: {"skill": 技能名称, "event": "invocation" 或 "failure", "ts": Unix时间戳（秒）}
+    """
+
+    # 状态文件格式版本，格式变化时旧文件整体失效
+    STATE_VERSION = 1
+
+    # 读取日志文件时每次处理的字节数
+    CHUNK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, half_life_days: float = 30.0, confidence_events: float = 20.0,
+                 state_file: Optional[str] = None):
+        """
+        初始化技能使用统计
+
+        Args:
+            half_life_days: 计数的半衰期（天），越早的事件权重越低
+            confidence_events: 衰减后的事件数达到该值时，使用记录对评分的影响达到一半
+            state_file: 状态文件路径（.npz），为None时只保存在内存中
+        """
+        self.half_life = half_life_days * 86400.0
+        self.confidence_events = confidence_events
+        self.state_file = state_file
+        # 格式错误或类型未知、被跳过的事件数
+        self.skipped = 0
+        # {技能名称: 数组下标}
+        self._index = {}
+        self._names = []
+        # 每行为一个技能的 (衰减后的调用次数, 衰减后的失败次数)，计数对应_last中的时间
+        self._counts = np.zeros((0, 2), dtype=np.float64)
+        self._last = np.zeros(0, dtype=np.float64)
+        # {日志文件路径: (设备号, inode, 已消费的字节数)}
+        self._offsets = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if state_file:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def ingest_file(self, log_file: str) -> int:
+        """
+        从上次读到的位置继续消费日志文件中的事件，末尾不完整的行留到下次读取；
+        路径指向了另一个文件（设备号或inode变化，即日志被轮转）或文件变短（被截断）时从头开始读
+
+        Args:
+            log_file: JSONL事件日志路径
+
+        Returns:
+            本次消费的事件数
+        """
+        path = os.path.abspath(log_file)
+        count = 0
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                identity = (st.st_dev, st.st_ino)
+                with self._lock:
+                    saved = self._offsets.get(path)
+                offset = saved[2] if saved is not None and saved[:2] == identity else 0
+                if offset > st.st_size:
+                    offset = 0
+                f.seek(offset)
+                pending = b""
+                while True:
+                    chunk = f.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    chunk = pending + chunk
+                    end = chunk.rfind(b"\n") + 1
+                    pending = chunk[end:]
+                    if end:
+                        count += self.ingest_lines(chunk[:end - 1].decode("utf-8", errors="replace").split("\n"))
+                        offset += end
+                        with self._lock:
+                            self._offsets[path] = identity + (offset,)
+                            self._dirty = True
+        except OSError as e:
+            logger.warning("Error reading usage log %s: %s", log_file, e)
+        return count
+
+    def ingest_lines(self, lines: Iterable[str]) -> int:
+        """
+        消费一批JSONL事件行，空行和格式错误的行被跳过
+
+        Args:
+            lines: 事件行
+
+        Returns:
+            消费的事件数
+        """
+        lines = list(lines)
+        try:
+            # 整批拼成一个JSON数组一次解析，远快于逐行解析
+            events = json.loads("[" + ",".join(lines) + "]")
+        except ValueError:
+            events = None
+        if events is None:
+            lines = [line for line in lines if line and not line.isspace()]
+            try:
+                events = json.loads("[" + ",".join(lines) + "]")
+            except ValueError:
+                events = None
+        if events is None:
+            events = []
+            for line in lines:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    events.append(None)
+        return self.ingest_events(events)
+
+    def ingest_events(self, events: Iterable[Dict]) -> int:
+        """
+        消费一批已解析的事件
+
+        Args:
+            events: 事件字典
+
+        Returns:
+            消费的事件数
+        """
+        events = list(events)
+        now = time.time()
+        try:
+            # 事件格式正确时按列提取并批量校验，省去逐个事件的Python分支；
+            # 与 _parse_events 一样，没有时间的事件使用当前时间
+            skills = [event["skill"] for event in events]
+            kinds = np.empty(len(events), dtype=object)
+            kinds[:] = [event["event"] for event in events]
+            times = np.array([event.get("ts", now) for event in events], dtype=np.float64)
+        except (TypeError, KeyError, ValueError, AttributeError):
+            skills, kinds, times = self._parse_events(events, now)
+        failures = kinds == "failure"
+        valid = (failures | (kinds == "invocation")) & np.isfinite(times)
+        if set(map(type, skills)) - {str}:
+            valid &= np.array([type(skill) is str for skill in skills], dtype=bool)
+
+        skipped = len(skills) - int(np.count_nonzero(valid))
+        if skipped:
+            skills = [skill for skill, keep in zip(skills, valid.tolist()) if keep]
+            times = times[valid]
+            failures = failures[valid]
+        skipped += len(events) - len(valid)
+
+        with self._lock:
+            self.skipped += skipped
+            if skills:
+                self._apply(self._indices(skills), times, failures)
+        return len(skills)
+
+    @staticmethod
+    def _parse_events(events: List, now: float) -> Tuple[List, np.ndarray, np.ndarray]:
+        """逐个提取事件的字段，没有时间的事件使用当前时间，丢弃缺少其他字段或时间无法转换为数字的事件"""
+        skills = []
+        kinds = []
+        times = []
+        for event in events:
+            try:
+                timestamp = float(event.get("ts", now))
+                kind = event["event"]
+                skill = event["skill"]
+            except (TypeError, KeyError, ValueError, AttributeError):
+                continue
+            skills.append(skill)
+            kinds.append(kind)
+            times.append(timestamp)
+        kinds_array = np.empty(len(kinds), dtype=object)
+        kinds_array[:] = kinds
+        return skills, kinds_array, np.array(times, dtype=np.float64)
+
+    def record_event(self, skill_name: str, failed: bool = False, timestamp: Optional[float] = None):
+        """
+        记录单个使用事件
+
+        Args:
+            skill_name: 技能名称
+            failed: 是否为失败事件
+            timestamp: 事件时间，为None时使用当前时间
+        """
+        self.ingest_events([{"skill": skill_name, "event": "failure" if failed else "invocation",
+                             "ts": time.time() if timestamp is None else timestamp}])
+
+    def _indices(self, skills: List[str]) -> np.ndarray:
+        """把技能名称映射为数组下标，新技能追加到数组末尾，调用方需持有锁"""
+        index = self._index
+        get = index.get
+        indices = list(map(get, skills))
+        if None in indices:
+            for position, skill in enumerate(skills):
+                if indices[position] is None:
+                    slot = get(skill)
+                    if slot is None:
+                        slot = index[skill] = len(self._names)
+                        self._names.append(skill)
+                    indices[position] = slot
+            self._grow(len(self._names))
+        return np.array(indices, dtype=np.int64)
+
+    def _grow(self, size: int):
+        """按倍数扩大计数数组，新技能的时间为-inf，第一次衰减时得到0"""
+        capacity = len(self._last)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 64)
+        counts = np.zeros((capacity, 2), dtype=np.float64)
+        counts[:len(self._counts)] = self._counts
+        last = np.full(capacity, -np.inf, dtype=np.float64)
+        last[:len(self._last)] = self._last
+        self._counts = counts
+        self._last = last
+
+    def _apply(self, indices: np.ndarray, times: np.ndarray, failures: np.ndarray):
+        """
+        向量化地把一批事件累加进计数，调用方需持有锁
+
+        每个涉及的技能先把已有计数衰减到 max(上次更新时间, 本批最晚事件时间)，
+        再加上本批事件衰减到同一时间后的权重；乱序到达的旧事件权重小于1，不会放大计数
+        """
+        touched, inverse = np.unique(indices, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        latest = np.full(len(touched), -np.inf)
+        np.maximum.at(latest, inverse, times)
+        target = np.maximum(self._last[touched], latest)
+
+        counts = self._counts[touched] * np.exp2((self._last[touched] - target) / self.half_life)[:, None]
+        weights = np.exp2((times - target[inverse]) / self.half_life)
+        counts[:, 0] += np.bincount(inverse, weights=np.where(failures, 0.0, weights), minlength=len(touched))
+        counts[:, 1] += np.bincount(inverse, weights=np.where(failures, weights, 0.0), minlength=len(touched))
+        self._counts[touched] = counts
+        self._last[touched] = target
+        self._dirty = True
+
+    def get_counters(self, skill_name: str, now: Optional[float] = None) -> Tuple[float, float]:
+        """
+        获取技能衰减到指定时间的调用次数和失败次数
+
+        Args:
+            skill_name: 技能名称
+            now: 计算衰减的时间，为None时使用当前时间
+
+        Returns:
+            (调用次数, 失败次数)，没有记录时为 (0.0, 0.0)
+        """
+        with self._lock:
+            slot = self._index.get(skill_name)
+            if slot is None:
+                return 0.0, 0.0
+            invocations, failed = self._counts[slot].tolist()
+            last = self._last[slot].item()
+        if now is None:
+            now = time.time()
+        decay = 2.0 ** (-max(now - last, 0.0) / self.half_life)
+        return invocations * decay, failed * decay
+
+    def usage_score(self, skill_name: str, now: Optional[float] = None) -> int:
+        """
+        计算技能的使用历史评分 (0-100)
+
+        失败率决定可靠性评分（0%为100分，50%及以上为0分），衰减后的事件数越多，
+        评分越接近可靠性评分；没有使用记录时为默认评分
+
+        Args:
+            skill_name: 技能名称
+            now: 计算衰减的时间，为None时使用当前时间
+
+        Returns:
+            使用历史评分
+        """
+        invocations, failed = self.get_counters(skill_name, now)
+        total = invocations + failed
+        if total <= 0:
+            return DEFAULT_USAGE_SCORE
+        reliability = max(0.0, 100.0 - 200.0 * failed / total)
+        confidence = total / (total + self.confidence_events)
+        return round(DEFAULT_USAGE_SCORE + confidence * (reliability - DEFAULT_USAGE_SCORE))
+
+    def usage_scores(self, skill_names: List[str], now: Optional[float] = None) -> np.ndarray:
+        """
+        向量化计算多个技能的使用历史评分，结果与逐个调用 usage_score 相同
+
+        Args:
+            skill_names: 技能名称列表
+            now: 计算衰减的时间，为None时使用当前时间
+
+        Returns:
+            评分数组 (int64)
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            get = self._index.get
+            slots = np.array([get(name, -1) for name in skill_names], dtype=np.int64)
+            known = slots >= 0
+            counts = self._counts[slots[known]]
+            last = self._last[slots[known]]
+
+        scores = np.full(len(skill_names), DEFAULT_USAGE_SCORE, dtype=np.int64)
+        # 衰减系数与 get_counters 一样用Python的幂运算，np.exp2的末位可能不同，会使评分取整结果不一致
+        decay = np.array([2.0 ** exponent for exponent in
+                          (-np.maximum(now - last, 0.0) / self.half_life).tolist()], dtype=np.float64)
+        invocations = counts[:, 0] * decay
+        failed = counts[:, 1] * decay
+        total = invocations + failed
+        with np.errstate(divide="ignore", invalid="ignore"):
+            reliability = np.maximum(0.0, 100.0 - 200.0 * (failed / total))
+            confidence = total / (total + self.confidence_events)
+        values = np.where(total > 0, np.rint(DEFAULT_USAGE_SCORE + confidence * (reliability - DEFAULT_USAGE_SCORE)),
+                          DEFAULT_USAGE_SCORE)
+        scores[known] = values.astype(np.int64)
+        return scores
+
+    def get_stats(self) -> Dict:
+        """
+        获取使用统计的概况
+
+        Returns:
+            包含技能数、跳过的事件数、已消费的日志文件数和计数数组占用字节数的字典
+        """
+        with self._lock:
+            return {
+                "skills": len(self._names),
+                "skipped": self.skipped,
+                "log_files": len(self._offsets),
+                "array_bytes": self._counts.nbytes + self._last.nbytes
+            }
+
+    def load(self):
+        """加载磁盘上的状态，版本不符或文件损坏时从空状态开始"""
+        with self._lock:
+            self._index = {}
+            self._names = []
+            self._counts = np.zeros((0, 2), dtype=np.float64)
+            self._last = np.zeros(0, dtype=np.float64)
+            self._offsets = {}
+            self._dirty = False
+            try:
+                with np.load(self.state_file, allow_pickle=False) as data:
+                    if int(data["version"]) != self.STATE_VERSION:
+                        return
+                    names = data["names"].tolist()
+                    counts = data["counts"]
+                    last = data["last"]
+                    offsets = {path: tuple(position) for path, position in
+                               zip(data["log_files"].tolist(), data["log_positions"].tolist())}
+            except FileNotFoundError:
+                return
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Error loading usage state %s: %s", self.state_file, e)
+                return
+
+            self._names = names
+            self._index = {name: slot for slot, name in enumerate(names)}
+            self._counts = counts.reshape(len(names), 2)
+            self._last = last
+            self._offsets = offsets
+
+    def save(self) -> bool:
+        """
+        将状态原子地写回磁盘（临时文件 + rename），未设置状态文件时不做任何事
+
+        Returns:
+            保存是否成功
+        """
+        if not self.state_file:
+            return True
+        with self._lock:
+            if not self._dirty:
+                return True
+            size = len(self._names)
+            names = np.array(self._names, dtype=str)
+            counts = self._counts[:size].copy()
+            last = self._last[:size].copy()
+            log_files = np.array(list(self._offsets), dtype=str)
+            # 每行为 (设备号, inode, 已消费的字节数)
+            log_positions = np.array(list(self._offsets.values()), dtype=np.int64).reshape(-1, 3)
+            self._dirty = False
+
+        def write(f):
+            np.savez_compressed(
+                f,
+                version=np.array(self.STATE_VERSION),
+                names=names,
+                counts=counts,
+                last=last,
+                log_files=log_files,
+                log_positions=log_positions
+            )
+
+        if save_atomically(self.state_file, write, "usage state", binary=True):
+            return True
+        with self._lock:
+            self._dirty = True
+        return False
@@ -0,0 +1,20 @@
+"""
+测试配置
+仓库根目录就是 skill_trust_network 包本身，未安装时按包名注册，使测试可以用包内的绝对导入
+"""
+
+import os
+import sys
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "skill_trust_network" not in sys.modules:
+    try:
+        import skill_trust_network  # noqa: F401
+    except ImportError:
+        spec = importlib.util.spec_from_file_location(
+            "skill_trust_network", os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["skill_trust_network"] = module
+        spec.loader.exec_module(module)
@@ -0,0 +1,51 @@
+"""作者声誉图评分的测试"""
+
+from skill_trust_network.modules.author_reputation import (
+    AuthorReputationGraph, ENDORSED_MIN_SCORE, MAX_AUTHOR_SCORE, MIN_AUTHOR_SCORE
+)
+
+
+def _record(auditor, author, score=80):
+    return {"auditor": auditor, "trust_score": score, "result": {"skill_info": {"author": author}}}
+
+
+def _graph(records):
+    graph = AuthorReputationGraph()
+    graph.add_records(records)
+    graph.update()
+    return graph
+
+
+def test_tied_authors_get_the_same_score():
+    graph = _graph([
+        ("s1", _record("verified", "alice")),
+        ("s2", _record("verified", "bob")),
+        ("s3", _record("verified", "carol")),
+    ])
+    scores = {author: graph.author_score(author) for author in ("alice", "bob", "carol")}
+    assert len(set(scores.values())) == 1
+    assert scores["alice"] == MAX_AUTHOR_SCORE
+
+
+def test_scores_follow_rank_mass_and_stay_above_name_rule():
+    graph = _graph([
+        ("s1", _record("verified", "alice")),
+        ("s2", _record("verified", "alice")),
+        ("s3", _record("verified", "alice")),
+        ("s4", _record("verified", "bob")),
+        ("s5", _record("nobody", "carol")),
+    ])
+    alice, bob, carol = (graph.author_score(author) for author in ("alice", "bob", "carol"))
+    assert alice == MAX_AUTHOR_SCORE
+    assert ENDORSED_MIN_SCORE <= carol < bob < alice
+
+
+def test_self_audit_is_not_an_endorsement():
+    # 自己审计自己的技能，无论审计记录先于还是晚于作者信息到达
+    graph = _graph([
+        ("s1", {"auditor": "mallory", "trust_score": 100, "result": {}}),
+        ("s1", _record("mallory", "mallory", 100)),
+        ("s2", _record("verified", "alice")),
+    ])
+    assert graph.author_score("mallory") == MIN_AUTHOR_SCORE
+    assert graph.author_score("alice") == MAX_AUTHOR_SCORE
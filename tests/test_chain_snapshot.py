@@ -0,0 +1,48 @@
+"""二进制快照与JSON格式互转的测试"""
+
+import json
+import math
+
+from skill_trust_network.modules.chain_snapshot import (
+    json_to_snapshot, read_snapshot, snapshot_to_json, write_snapshot
+)
+
+
+def _chains():
+    records = [
+        {"auditor": "auditor_a", "timestamp": "2024-01-01T00:00:00", "trust_score": float("nan"),
+         "result": {"total_score": float("inf"), "factors": [1.5, float("-inf")]}},
+        {"auditor": "auditor_b", "timestamp": "2024-01-02T00:00:00", "trust_score": 80,
+         "result": {"total_score": 80}, "note": float("nan")},
+    ]
+    return {"h1": {"skill_hash": "h1", "skill_info": {"name": "weather"}, "audit_chain": records}}
+
+
+def _assert_same(actual, expected):
+    # NaN与自身不相等，按JSON文本比较
+    assert json.dumps(actual, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+
+def test_snapshot_round_trips_non_finite_numbers(tmp_path):
+    snapshot = str(tmp_path / "chains.isnb")
+    write_snapshot(_chains(), snapshot)
+    chains = read_snapshot(snapshot)
+    _assert_same(chains, _chains())
+    assert math.isnan(chains["h1"]["audit_chain"][0]["trust_score"])
+
+
+def test_json_conversion_round_trips_non_finite_numbers(tmp_path):
+    source = tmp_path / "chains.json"
+    source.write_text(json.dumps(_chains()), encoding="utf-8")
+    json_to_snapshot(str(source), str(tmp_path / "chains.isnb"))
+    snapshot_to_json(str(tmp_path / "chains.isnb"), str(tmp_path / "back.json"))
+    with open(tmp_path / "back.json", encoding="utf-8") as f:
+        _assert_same(json.load(f), _chains())
+
+
+def test_snapshot_round_trips_long_auditor_names(tmp_path):
+    snapshot = str(tmp_path / "chains.isnb")
+    chains = _chains()
+    chains["h1"]["audit_chain"][0]["auditor"] = "审" * 30000
+    write_snapshot(chains, snapshot)
+    _assert_same(read_snapshot(snapshot), chains)
@@ -0,0 +1,110 @@
+"""多个写入者共享同一个传承链文件时的合并写入测试"""
+
+import os
+import sys
+import subprocess
+import multiprocessing
+
+import pytest
+
+from skill_trust_network.modules.isnad_chain import IsnadChain
+
+# 整文件存储在写入时与其他写入者合并；追加日志存储在追加和压缩前重放其他写入者的日志
+SHARED_FILE_BACKENDS = ("json", "lazy", "binary", "log")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程中按包名加载仓库，追加一条记录后不调用close直接退出
+_EXIT_WITHOUT_CLOSE = """
+import os, sys, importlib.util
+root, chain_file, storage = sys.argv[1:4]
+spec = importlib.util.spec_from_file_location(
+    "skill_trust_network", os.path.join(root, "__init__.py"), submodule_search_locations=[root])
+module = importlib.util.module_from_spec(spec)
+sys.modules["skill_trust_network"] = module
+spec.loader.exec_module(module)
+from skill_trust_network.modules.isnad_chain import IsnadChain
+isnad = IsnadChain(chain_file, storage=storage, flush_interval=60, group_commit_window=0.001)
+isnad.add_audit_to_chain("unflushed", "exiting_auditor", {"total_score": 42})
+"""
+
+
+def _assert_complete(chain_file, storage, expected):
+    """重新打开存储，检查每条传承链的记录数、链接和序号"""
+    isnad = IsnadChain(chain_file, storage=storage)
+    try:
+        for skill_hash, count in expected.items():
+            result = isnad.verify_isnad_chain(skill_hash, full=True)
+            assert result["verified"], skill_hash
+            assert result["chain_length"] == count, skill_hash
+        seqs = [record["seq"] for _, record in isnad.store.records_since(0)]
+        assert seqs == list(range(1, sum(expected.values()) + 1))
+    finally:
+        isnad.close()
+
+
+@pytest.mark.parametrize("flush_interval", (None, 0.01))
+@pytest.mark.parametrize("storage", SHARED_FILE_BACKENDS)
+def test_two_store_instances_lose_nothing(tmp_path, storage, flush_interval):
+    chain_file = str(tmp_path / "isnad_chains.json")
+    a = IsnadChain(chain_file, storage=storage, flush_interval=flush_interval)
+    b = IsnadChain(chain_file, storage=storage, flush_interval=flush_interval)
+    for i in range(20):
+        a.add_audit_to_chain("shared", "auditor_a", {"total_score": i})
+        b.add_audit_to_chain("shared", "auditor_b", {"total_score": i})
+        b.add_audit_to_chain(f"only_b_{i % 4}", "auditor_b", {"total_score": i})
+        if i % 5 == 0:
+            a.save_chains()
+    a.close()
+    b.close()
+
+    expected = {"shared": 40}
+    expected.update({f"only_b_{i}": 5 for i in range(4)})
+    _assert_complete(chain_file, storage, expected)
+
+
+def _append_in_process(chain_file, storage, auditor, count):
+    isnad = IsnadChain(chain_file, storage=storage)
+    for i in range(count):
+        isnad.add_audit_to_chain("shared", auditor, {"total_score": i})
+    isnad.close()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="requires fork")
+@pytest.mark.parametrize("storage", SHARED_FILE_BACKENDS)
+def test_two_processes_lose_nothing(tmp_path, storage):
+    chain_file = str(tmp_path / "isnad_chains.json")
+    IsnadChain(chain_file, storage=storage).close()
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_append_in_process, args=(chain_file, storage, f"auditor_{n}", 25))
+               for n in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+    _assert_complete(chain_file, storage, {"shared": 50})
+
+
+@pytest.mark.parametrize("storage", SHARED_FILE_BACKENDS)
+def test_pending_appends_flushed_at_exit(tmp_path, storage):
+    chain_file = str(tmp_path / "isnad_chains.json")
+    subprocess.run([sys.executable, "-c", _EXIT_WITHOUT_CLOSE, ROOT, chain_file, storage],
+                   check=True, timeout=60)
+    _assert_complete(chain_file, storage, {"unflushed": 1})
+
+
+def test_log_compaction_keeps_other_writers_appends(tmp_path):
+    chain_file = str(tmp_path / "isnad_chains.json")
+    a = IsnadChain(chain_file, storage="log")
+    b = IsnadChain(chain_file, storage="log")
+    a.add_audit_to_chain("shared", "auditor_a", {"total_score": 1})
+    b.add_audit_to_chain("shared", "auditor_b", {"total_score": 2})
+    # a压缩时b的追加只在日志中，b随后在a的快照之后继续追加
+    a.store.compact()
+    b.add_audit_to_chain("shared", "auditor_b", {"total_score": 3})
+    b.store.compact()
+    a.add_audit_to_chain("shared", "auditor_a", {"total_score": 4})
+    a.close()
+    b.close()
+    _assert_complete(chain_file, "log", {"shared": 4})
@@ -0,0 +1,66 @@
+"""代码质量分析器的测试"""
+
+import os
+import json
+
+from skill_trust_network.modules.code_quality import CodeQualityAnalyzer
+from skill_trust_network.modules.trust_scoring import TrustScoring
+
+
+def _skill(root, name, files):
+    path = root / name
+    path.mkdir()
+    for file_name, source in files.items():
+        (path / file_name).write_text(source, encoding="utf-8")
+    return str(path)
+
+
+def test_prepared_skills_are_scored_without_walking_again(tmp_path, monkeypatch):
+    skill = _skill(tmp_path, "a", {"main.py": "def f():\n    return 1\n"})
+    analyzer = CodeQualityAnalyzer()
+    analyzer.prepare([skill])
+
+    def fail(path):
+        raise AssertionError("skill directory walked again")
+    monkeypatch.setattr(analyzer, "_list_files", fail)
+    assert analyzer.skill_score(skill) == 100
+
+    # 预先分析的结果只使用一次，之后重新分析
+    monkeypatch.undo()
+    assert analyzer.skill_score(skill) == 100
+
+
+def test_save_prunes_files_that_no_longer_exist(tmp_path):
+    cache_file = str(tmp_path / "quality.json")
+    skills = tmp_path / "skills"
+    skills.mkdir()
+    kept = _skill(skills, "kept", {"main.py": "x = 1\n"})
+    gone = _skill(skills, "gone", {"main.py": "y = 2\n", "extra.py": "z = 3\n"})
+    for path in (os.path.join(kept, "main.py"), os.path.join(gone, "main.py"), os.path.join(gone, "extra.py")):
+        os.utime(path, (1000, 1000))
+    analyzer = CodeQualityAnalyzer(cache_file=cache_file)
+    analyzer.analyze_skills([kept, gone])
+    assert analyzer.save()
+
+    # 删除的文件：stat失败时立即去掉，或保存时确认本进程中未见过的文件已不存在
+    os.remove(os.path.join(gone, "extra.py"))
+    assert analyzer._file_digest(os.path.join(gone, "extra.py")) == (None, None)
+    assert analyzer.get_stats()["files"] == 2
+    assert analyzer.save()
+    os.remove(os.path.join(gone, "main.py"))
+    analyzer = CodeQualityAnalyzer(cache_file=cache_file)
+    assert analyzer.save()
+    with open(cache_file, encoding="utf-8") as f:
+        data = json.load(f)
+    assert list(data["files"]) == [os.path.join(kept, "main.py")]
+    assert len(data["results"]) == 1
+
+
+def test_trust_scoring_close_shuts_down_the_pool(tmp_path):
+    skill = _skill(tmp_path, "a", {"m%d.py" % i: "v = %d\n" % i for i in range(CodeQualityAnalyzer.POOL_THRESHOLD)})
+    analyzer = CodeQualityAnalyzer(max_workers=1)
+    scoring = TrustScoring(code_analyzer=analyzer)
+    scoring.prepare([{"path": skill}])
+    assert analyzer._executor is not None
+    scoring.close()
+    assert analyzer._executor is None
@@ -0,0 +1,70 @@
+"""因素评分矩阵重新加权的测试"""
+
+import random
+
+from skill_trust_network.modules.trust_scoring import TrustScoring
+
+NEW_WEIGHTS = {"author_reputation": 0.35, "community_audit": 0.1, "usage_history": 0.05,
+               "permission_reasonableness": 0.3, "code_quality": 0.2}
+
+
+def _skills(count, seed=0):
+    rng = random.Random(seed)
+    skills = []
+    for i in range(count):
+        metadata = {"name": f"skill_{i}", "hash": f"{i:08x}" if rng.random() < 0.8 else ""}
+        metadata["author"] = rng.choice(["unknown", "verified", "alice"])
+        metadata["permissions"] = ["p"] * rng.randrange(8)
+        metadata["trust_chain"] = ["a"] * rng.randrange(5)
+        skills.append(metadata)
+    return skills
+
+
+def _full_rescore(skills, weights):
+    scoring = TrustScoring()
+    scoring.weights = dict(weights)
+    return {metadata["name"]: scoring.calculate_trust_score(metadata)["total_score"] for metadata in skills}
+
+
+def test_reweight_matches_full_rescore(tmp_path):
+    skills = _skills(600)
+    scoring = TrustScoring(factor_file=str(tmp_path / "factors.npz"))
+    scoring.calculate_batch_trust_scores(skills[:300])
+    for metadata in skills[300:]:
+        scoring.calculate_trust_score(metadata)
+    old_totals = _full_rescore(skills, scoring.weights)
+    new_totals = _full_rescore(skills, NEW_WEIGHTS)
+
+    report = scoring.reweight(NEW_WEIGHTS)
+    assert report["skill_count"] == len(skills)
+    level_counts = {}
+    for total in new_totals.values():
+        level = scoring.get_trust_level(total)
+        level_counts[level] = level_counts.get(level, 0) + 1
+    assert report["level_counts"] == level_counts
+
+    expected = {name for name in new_totals
+                if scoring.get_trust_level(old_totals[name]) != scoring.get_trust_level(new_totals[name])}
+    assert expected
+    assert {change["skill_name"] for change in report["changed"]} == expected
+    for change in report["changed"]:
+        assert change["old_score"] == old_totals[change["skill_name"]]
+        assert change["new_score"] == new_totals[change["skill_name"]]
+
+
+def test_reweight_apply_and_persisted_matrix(tmp_path):
+    factor_file = str(tmp_path / "factors.npz")
+    skills = _skills(200, seed=1)
+    scoring = TrustScoring(factor_file=factor_file)
+    scoring.calculate_batch_trust_scores(skills)
+    assert scoring.save()
+
+    # 重新加载的矩阵给出与完整重新评分相同的结果，不需要再次评估任何技能
+    reloaded = TrustScoring(factor_file=factor_file)
+    report = reloaded.reweight(NEW_WEIGHTS, apply=True)
+    assert report["skill_count"] == len(skills)
+    assert reloaded.weights == NEW_WEIGHTS
+    new_totals = _full_rescore(skills, NEW_WEIGHTS)
+    hashes, names, _ = reloaded.factor_matrix.arrays()
+    totals = reloaded.factor_matrix.totals(reloaded.weights).tolist()
+    assert {name: round(total, 2) for name, total in zip(names, totals)} == new_totals
@@ -0,0 +1,90 @@
+"""stat身份文件哈希缓存的测试"""
+
+import os
+
+from skill_trust_network.modules.hash_cache import FileHashCache
+from skill_trust_network.modules.metadata_collector import SkillMetadataCollector
+
+OLD_NS = 1_000_000_000_000_000_000
+
+
+def _write(path, content, mtime_ns=None):
+    path.write_text(content, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(str(path), ns=(mtime_ns, mtime_ns))
+
+
+def _skill(tmp_path):
+    skill = tmp_path / "skills" / "weather"
+    skill.mkdir(parents=True)
+    _write(skill / "main.py", "x = 1\n", OLD_NS)
+    _write(skill / "skill.json", '{"name": "weather"}', OLD_NS)
+    return skill
+
+
+def _hash(tmp_path, cache_file=None):
+    collector = SkillMetadataCollector([str(tmp_path / "skills")], hash_cache_file=cache_file)
+    metadata = collector.collect_metadata("weather")
+    collector._save_hash_cache()
+    return metadata["hash"], collector
+
+
+def test_cached_hash_matches_uncached_and_is_reused(tmp_path):
+    _skill(tmp_path)
+    cache_file = str(tmp_path / "hashes.json")
+    uncached, _ = _hash(tmp_path)
+    first, collector = _hash(tmp_path, cache_file)
+    assert first == uncached
+    assert collector.get_hash_cache_stats()["hits"] == 0
+
+    # 新的收集器从磁盘加载缓存，stat身份未变时不再读取文件
+    second, collector = _hash(tmp_path, cache_file)
+    assert second == uncached
+    assert collector.get_hash_cache_stats()["hits"] == 1
+
+
+def test_stat_change_invalidates_cached_hash(tmp_path):
+    skill = _skill(tmp_path)
+    cache_file = str(tmp_path / "hashes.json")
+    before, _ = _hash(tmp_path, cache_file)
+
+    # 大小不变、内容和mtime变化的文件
+    _write(skill / "main.py", "x = 2\n", OLD_NS + 1)
+    after, collector = _hash(tmp_path, cache_file)
+    assert after != before
+    assert after == _hash(tmp_path)[0]
+    assert collector.get_hash_cache_stats()["hits"] == 0
+
+
+def test_racy_file_is_not_cached(tmp_path):
+    skill = _skill(tmp_path)
+    cache_file = str(tmp_path / "hashes.json")
+    # mtime为当前时间的文件处于时间戳粒度的竞争窗口内
+    _write(skill / "main.py", "x = 1\n")
+    mtime_ns = os.stat(str(skill / "main.py")).st_mtime_ns
+    assert FileHashCache.is_racy(os.stat(str(skill / "main.py")))
+    before, _ = _hash(tmp_path, cache_file)
+
+    # 同一时间戳内的重写无法由stat察觉，因为没有缓存，仍然得到新内容的哈希
+    _write(skill / "main.py", "x = 3\n", mtime_ns)
+    after, collector = _hash(tmp_path, cache_file)
+    assert after != before
+    assert after == _hash(tmp_path)[0]
+    assert collector.get_hash_cache_stats()["hits"] == 0
+
+
+def test_file_digest_keyed_on_stat_identity(tmp_path):
+    path = tmp_path / "a.py"
+    _write(path, "x = 1\n", OLD_NS)
+    cache = FileHashCache(str(tmp_path / "hashes.json"))
+    st = os.stat(str(path))
+    cache.put_file_digest(str(path), st, "d" * 64)
+    assert cache.get_file_digest(str(path), st) == "d" * 64
+
+    _write(path, "x = 2\n", OLD_NS + 1)
+    assert cache.get_file_digest(str(path), os.stat(str(path))) is None
+
+    # 过新的文件不记录
+    _write(path, "x = 3\n")
+    cache.put_file_digest(str(path), os.stat(str(path)), "e" * 64)
+    assert cache.get_file_digest(str(path), os.stat(str(path))) is None
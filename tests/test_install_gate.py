@@ -0,0 +1,75 @@
+"""安装前门限评估与完整评分一致性的测试"""
+
+import json
+
+import pytest
+
+from skill_trust_network.integration.moltbot_integration import INSTALL_MIN_SCORE, MoltbotIntegration
+from skill_trust_network.modules.trust_scoring import TrustScoring
+from skill_trust_network.modules.scoring_factors import ScoringFactor
+
+BASE_SKILLS = [
+    {"author": "unknown", "permissions": ["a"] * 7, "trust_chain": [], "hash": ""},
+    {"author": "alice", "permissions": ["a", "b"], "trust_chain": ["x"], "hash": "h"},
+    {"author": "verified", "permissions": [], "trust_chain": ["x", "y", "z"], "hash": "h"},
+]
+
+
+def _risk(metadata):
+    return metadata["risk"]
+
+
+def _scoring(risk_weight):
+    """内置因素按比例缩小权重，再加上一个0-100的因素，使总评分跨过安装阈值"""
+    scoring = TrustScoring()
+    for name in list(scoring.weights):
+        scoring.weights[name] *= 1 - risk_weight
+    scoring.register_factor(ScoringFactor("risk", _risk, risk_weight, cost=0.5, input_fields=("risk",)))
+    return scoring
+
+
+@pytest.mark.parametrize("risk_weight", [0.4, 0.55, 1 / 3])
+def test_gate_agrees_with_full_score_near_install_threshold(risk_weight):
+    scoring = _scoring(risk_weight)
+    near = 0
+    for base in BASE_SKILLS:
+        # 以0.005的步长扫过风险评分，总评分在阈值附近的两位小数取整边界上逐个出现
+        for step in range(0, 10001):
+            metadata = dict(base, risk=step * 0.005)
+            full = scoring.calculate_trust_score(metadata)["total_score"]
+            gate = scoring.gate_trust_score(metadata, INSTALL_MIN_SCORE)
+            assert gate["below_threshold"] == (full < INSTALL_MIN_SCORE), (metadata, full, gate)
+            if gate["total_score"] is not None:
+                assert gate["total_score"] == full
+            else:
+                # 上下限按不同的顺序累加后取整，允许一个取整单位的误差
+                assert gate["lower_bound"] - 0.011 <= full <= gate["upper_bound"] + 0.011
+            if abs(full - INSTALL_MIN_SCORE) < 0.05:
+                near += 1
+    assert near
+
+
+def test_gate_skips_factors_when_the_outcome_is_decided():
+    scoring = _scoring(0.4)
+    gate = scoring.gate_trust_score(dict(BASE_SKILLS[2], risk=100), INSTALL_MIN_SCORE)
+    assert not gate["below_threshold"]
+    assert gate["skipped"]
+    assert gate["total_score"] is None
+
+
+def test_quick_install_check_matches_full_report(tmp_path):
+    skill = tmp_path / "incoming"
+    skill.mkdir()
+    (skill / "skill.json").write_text(json.dumps({"name": "incoming", "permissions": ["a"] * 7}), encoding="utf-8")
+    (skill / "main.py").write_text("x = 1\n", encoding="utf-8")
+    integration = MoltbotIntegration([str(tmp_path / "skills")])
+    integration.trust_scoring.register_factor(
+        ScoringFactor("risk", lambda metadata: 0, 0.5, cost=0.5))
+    for name in ("author_reputation", "community_audit", "usage_history", "permission_reasonableness",
+                 "code_quality"):
+        integration.trust_scoring.weights[name] *= 0.5
+
+    quick = integration.check_skill_before_install("incoming", str(skill), full_report=False)
+    full = integration.check_skill_before_install("incoming", str(skill), full_report=True)
+    assert full["trust_score"] < INSTALL_MIN_SCORE
+    assert quick["can_install"] == full["can_install"] is False
@@ -0,0 +1,182 @@
+"""传承链记录链接和增量校验的测试"""
+
+import os
+import json
+import sqlite3
+
+import pytest
+
+from skill_trust_network.modules.isnad_chain import IsnadChain
+from skill_trust_network.modules.chain_snapshot import read_snapshot, write_snapshot
+
+BACKENDS = IsnadChain.STORAGE_BACKENDS
+
+SKILL = {"name": "weather", "version": "1.0.0", "author": "trusted_author"}
+
+
+def _audit(score):
+    return {"total_score": score, "skill_info": {"name": SKILL["name"], "version": SKILL["version"]}}
+
+
+def _tamper(chain_file, storage, skill_hash, position):
+    """绕过存储接口直接修改磁盘上的一条审计记录"""
+    base = os.path.splitext(chain_file)[0]
+    if storage == "sqlite":
+        with sqlite3.connect(base + ".sqlite3") as conn:
+            (record,) = conn.execute("SELECT record FROM audits WHERE skill_hash = ? AND position = ?",
+                                     (skill_hash, position)).fetchone()
+            record = json.loads(record)
+            record["trust_score"] = 100
+            conn.execute("UPDATE audits SET record = ?, trust_score = 100 WHERE skill_hash = ? AND position = ?",
+                         (json.dumps(record), skill_hash, position))
+        conn.close()
+    elif storage == "binary":
+        chains = read_snapshot(base + ".isnb")
+        chains[skill_hash]["audit_chain"][position]["trust_score"] = 100
+        write_snapshot(chains, base + ".isnb")
+    elif storage == "log":
+        with open(base + ".wal.jsonl", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        found = [entry for entry in entries if entry["skill_hash"] == skill_hash]
+        found[position]["record"]["trust_score"] = 100
+        with open(base + ".wal.jsonl", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    else:
+        with open(chain_file, encoding="utf-8") as f:
+            chains = json.load(f)
+        chains[skill_hash]["audit_chain"][position]["trust_score"] = 100
+        with open(chain_file, "w", encoding="utf-8") as f:
+            json.dump(chains, f, indent=2, ensure_ascii=False)
+
+
+def _tamper_header(chain_file, storage, skill_hash, score_sum):
+    """绕过存储接口直接修改磁盘上传承链聚合信息中的评分之和"""
+    base = os.path.splitext(chain_file)[0]
+    if storage == "sqlite":
+        with sqlite3.connect(base + ".sqlite3") as conn:
+            conn.execute("UPDATE chains SET score_sum = ? WHERE skill_hash = ?", (score_sum, skill_hash))
+        conn.close()
+    elif storage == "binary":
+        chains = read_snapshot(base + ".isnb")
+        chains[skill_hash]["score_sum"] = score_sum
+        write_snapshot(chains, base + ".isnb")
+    elif storage == "log":
+        with open(base + ".snapshot.jsonl", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        for chain in lines[1:]:
+            if chain["skill_hash"] == skill_hash:
+                chain["score_sum"] = score_sum
+        with open(base + ".snapshot.jsonl", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(line) + "\n" for line in lines)
+    else:
+        with open(chain_file, encoding="utf-8") as f:
+            chains = json.load(f)
+        chains[skill_hash]["score_sum"] = score_sum
+        with open(chain_file, "w", encoding="utf-8") as f:
+            json.dump(chains, f, indent=2, ensure_ascii=False)
+
+
+def _build(chain_file, storage):
+    """写入3条记录并校验（建立检查点），再追加2条记录"""
+    isnad = IsnadChain(chain_file, storage=storage)
+    skill_hash = isnad.create_skill_hash(SKILL)
+    for score in (70, 80, 90):
+        assert isnad.add_audit_to_chain(skill_hash, "auditor_a", _audit(score), SKILL)
+    result = isnad.verify_isnad_chain(skill_hash)
+    assert result["verified"]
+    assert result["chain_length"] == 3
+    assert isnad.store.get_chain_header(skill_hash)["verified_count"] == 3
+    isnad.add_audits_to_chain([(skill_hash, "auditor_b", _audit(60), SKILL),
+                               (skill_hash, "auditor_c", _audit(50), SKILL)])
+    isnad.close()
+    return skill_hash
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_untampered_chain_verifies(tmp_path, storage):
+    chain_file = str(tmp_path / "isnad_chains.json")
+    skill_hash = _build(chain_file, storage)
+
+    isnad = IsnadChain(chain_file, storage=storage)
+    result = isnad.verify_isnad_chain(skill_hash)
+    assert result["verified"]
+    assert result["chain_length"] == 5
+    assert result["average_trust_score"] == 70
+    assert result["auditors"] == ["auditor_a"] * 3 + ["auditor_b", "auditor_c"]
+    assert isnad.verify_isnad_chain(skill_hash, full=True)["verified"]
+    isnad.close()
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_incremental_verify_catches_record_after_checkpoint(tmp_path, storage):
+    chain_file = str(tmp_path / "isnad_chains.json")
+    skill_hash = _build(chain_file, storage)
+    _tamper(chain_file, storage, skill_hash, 3)
+
+    isnad = IsnadChain(chain_file, storage=storage)
+    result = isnad.verify_isnad_chain(skill_hash, full=False)
+    assert not result["verified"]
+    assert result["tampered_index"] == 3
+    # 校验失败时检查点不前进
+    assert not isnad.verify_isnad_chain(skill_hash)["verified"]
+    assert not isnad.get_skill_reputation(SKILL["name"])["isnad_verified"]
+    isnad.close()
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_full_verify_catches_record_before_checkpoint(tmp_path, storage):
+    chain_file = str(tmp_path / "isnad_chains.json")
+    skill_hash = _build(chain_file, storage)
+    _tamper(chain_file, storage, skill_hash, 0)
+
+    isnad = IsnadChain(chain_file, storage=storage)
+    result = isnad.verify_isnad_chain(skill_hash, full=True)
+    assert not result["verified"]
+    assert result["tampered_index"] == 0
+    isnad.close()
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_legacy_json_chain_is_linked_on_load(tmp_path, storage):
+    chain_file = str(tmp_path / "isnad_chains.json")
+    legacy = {
+        "abc": {
+            "skill_hash": "abc",
+            "created_at": "2026-01-01T00:00:00",
+            "audit_chain": [
+                {"auditor": "x", "timestamp": "2026-01-01T00:00:00", "result": _audit(80), "trust_score": 80},
+                {"auditor": "y", "timestamp": "2026-01-02T00:00:00", "result": _audit(60), "trust_score": 60}
+            ]
+        }
+    }
+    with open(chain_file, "w", encoding="utf-8") as f:
+        json.dump(legacy, f)
+
+    isnad = IsnadChain(chain_file, storage=storage)
+    result = isnad.verify_isnad_chain("abc")
+    assert result["verified"]
+    assert result["average_trust_score"] == 70
+    assert isnad.store.find_chains("weather") == ["abc"]
+    assert [record["seq"] for _, record in isnad.store.records_since(0)] == [1, 2]
+    isnad.close()
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_verify_catches_edited_score_sum(tmp_path, storage):
+    chain_file = str(tmp_path / "isnad_chains.json")
+    skill_hash = _build(chain_file, storage)
+    isnad = IsnadChain(chain_file, storage=storage)
+    # 校验全部记录，使篡改发生在检查点之后没有新增记录的情况下
+    assert isnad.verify_isnad_chain(skill_hash)["verified"]
+    if storage == "log":
+        isnad.store.compact()
+    isnad.close()
+    _tamper_header(chain_file, storage, skill_hash, 475)
+
+    isnad = IsnadChain(chain_file, storage=storage)
+    for full in (False, True):
+        result = isnad.verify_isnad_chain(skill_hash, full=full)
+        assert not result["verified"]
+        assert result["average_trust_score"] == 0
+    assert not isnad.get_skill_reputation(SKILL["name"])["isnad_verified"]
+    isnad.close()
@@ -0,0 +1,92 @@
+"""Merkle树技能哈希和增量比较的测试"""
+
+import os
+
+from skill_trust_network.modules.file_hashing import hash_file
+from skill_trust_network.modules.merkle_tree import build_merkle_tree, diff_merkle_trees
+from skill_trust_network.modules.metadata_collector import SkillMetadataCollector
+
+EXTENSIONS = (".py", ".json", ".js")
+OLD_NS = 1_000_000_000_000_000_000
+
+
+def _write(path, content, mtime_ns=OLD_NS):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    os.utime(str(path), ns=(mtime_ns, mtime_ns))
+
+
+class _CountingHasher:
+    def __init__(self):
+        self.paths = []
+
+    def __call__(self, file_path, st):
+        self.paths.append(file_path)
+        return hash_file(file_path)
+
+
+def _skill(root):
+    _write(root / "main.py", "x = 1\n")
+    _write(root / "lib" / "a.py", "a = 1\n")
+    _write(root / "lib" / "b.py", "b = 1\n")
+    _write(root / "data" / "c.json", "{}")
+    return str(root)
+
+
+def test_unchanged_subtrees_are_reused(tmp_path):
+    skill = _skill(tmp_path / "skill")
+    hasher = _CountingHasher()
+    first = build_merkle_tree(skill, EXTENSIONS, hasher)
+    assert len(hasher.paths) == 4
+
+    hasher.paths = []
+    assert build_merkle_tree(skill, EXTENSIONS, hasher, first) is first
+    assert hasher.paths == []
+
+    _write(tmp_path / "skill" / "lib" / "a.py", "a = 2\n", OLD_NS + 1)
+    second = build_merkle_tree(skill, EXTENSIONS, hasher, first)
+    # 只重新读取变化的文件，未变化的目录节点原样复用
+    assert hasher.paths == [os.path.join(skill, "lib", "a.py")]
+    assert second["digest"] != first["digest"]
+    assert second["children"]["data"] is first["children"]["data"]
+    assert second["children"]["lib"]["children"]["b.py"] is first["children"]["lib"]["children"]["b.py"]
+    assert diff_merkle_trees(first, second) == {"added": [], "removed": [], "modified": ["lib/a.py"]}
+
+
+def test_diff_reports_added_and_removed_files(tmp_path):
+    skill = _skill(tmp_path / "skill")
+    first = build_merkle_tree(skill, EXTENSIONS, _CountingHasher())
+    os.remove(os.path.join(skill, "data", "c.json"))
+    _write(tmp_path / "skill" / "lib" / "new.js", "let x = 1;")
+    second = build_merkle_tree(skill, EXTENSIONS, _CountingHasher(), first)
+
+    assert diff_merkle_trees(first, second) == {"added": ["lib/new.js"], "removed": ["data/c.json"], "modified": []}
+    assert diff_merkle_trees(None, first)["added"] == ["data/c.json", "lib/a.py", "lib/b.py", "main.py"]
+
+
+def test_root_digest_depends_only_on_content(tmp_path):
+    one = _skill(tmp_path / "one")
+    # 不同的创建顺序和mtime
+    _write(tmp_path / "two" / "data" / "c.json", "{}", OLD_NS + 5)
+    _write(tmp_path / "two" / "lib" / "b.py", "b = 1\n", OLD_NS + 6)
+    _write(tmp_path / "two" / "lib" / "a.py", "a = 1\n", OLD_NS + 7)
+    _write(tmp_path / "two" / "main.py", "x = 1\n", OLD_NS + 8)
+    two = str(tmp_path / "two")
+    assert build_merkle_tree(one, EXTENSIONS, _CountingHasher())["digest"] == \
+        build_merkle_tree(two, EXTENSIONS, _CountingHasher())["digest"]
+
+
+def test_collector_reports_changed_files_across_runs(tmp_path):
+    _skill(tmp_path / "skills" / "weather")
+    cache_file = str(tmp_path / "hashes.json")
+    collector = SkillMetadataCollector([str(tmp_path / "skills")], hash_cache_file=cache_file, hash_mode="merkle")
+    first = collector.collect_metadata("weather")
+    assert "changed_files" not in first
+    collector._save_hash_cache()
+
+    # 新的收集器从哈希缓存中取得上一棵树
+    _write(tmp_path / "skills" / "weather" / "main.py", "x = 2\n", OLD_NS + 1)
+    collector = SkillMetadataCollector([str(tmp_path / "skills")], hash_cache_file=cache_file, hash_mode="merkle")
+    second = collector.collect_metadata("weather")
+    assert second["hash"] != first["hash"]
+    assert second["changed_files"] == {"added": [], "removed": [], "modified": ["main.py"]}
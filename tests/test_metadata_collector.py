@@ -0,0 +1,30 @@
+"""技能元数据收集和技能哈希的测试"""
+
+import os
+
+import pytest
+
+from skill_trust_network.modules.metadata_collector import SkillMetadataCollector
+
+
+def _skill(root, name, files):
+    path = root / name
+    path.mkdir(parents=True)
+    for file_name, content in files.items():
+        file_path = path / file_name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("hash_mode", SkillMetadataCollector.HASH_MODES)
+def test_unreadable_file_is_reported_as_diagnostic(tmp_path, capsys, hash_mode):
+    skill = _skill(tmp_path / "skills", "weather", {"main.py": "x = 1\n"})
+    broken = skill / "broken.py"
+    os.symlink(str(tmp_path / "missing.py"), str(broken))
+    collector = SkillMetadataCollector([str(tmp_path / "skills")], hash_mode=hash_mode)
+
+    metadata = collector.collect_metadata("weather")
+    assert [d["file"] for d in metadata["diagnostics"]] == [str(broken)]
+    assert metadata["diagnostics"][0]["error"].startswith("FileNotFoundError")
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,107 @@
+"""传承链增量导出/导入（节点间复制）的测试"""
+
+import pytest
+
+from skill_trust_network.modules.isnad_chain import IsnadChain
+
+BACKENDS = IsnadChain.STORAGE_BACKENDS
+
+WEATHER = {"name": "weather", "version": "1.0.0", "author": "trusted_author"}
+CALENDAR = {"name": "calendar", "version": "2.0.0", "author": "trusted_author"}
+
+
+def _audit(skill, score):
+    return {"total_score": score, "skill_info": {"name": skill["name"], "version": skill["version"]}}
+
+
+def _open(tmp_path, node, storage):
+    return IsnadChain(str(tmp_path / node / "isnad_chains.json"), storage=storage)
+
+
+def _add(isnad, skill, scores):
+    skill_hash = isnad.create_skill_hash(skill)
+    for score in scores:
+        assert isnad.add_audit_to_chain(skill_hash, "auditor_a", _audit(skill, score), skill)
+    return skill_hash
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_import_is_idempotent(tmp_path, storage):
+    source = _open(tmp_path, "source", storage)
+    weather = _add(source, WEATHER, (70, 80))
+    calendar = _add(source, CALENDAR, (90,))
+    delta = source.export_delta()
+    source.close()
+    assert [entry["seq"] for entry in delta["records"]] == [1, 2, 3]
+
+    target = _open(tmp_path, "target", storage)
+    assert target.import_delta(delta) == 3
+    assert target.import_delta(delta) == 0
+    target.close()
+
+    # 重新打开后按持久化的内容摘要去重
+    target = _open(tmp_path, "target", storage)
+    assert target.import_delta(delta) == 0
+    assert target.verify_isnad_chain(weather, full=True)["chain_length"] == 2
+    assert target.verify_isnad_chain(calendar, full=True)["chain_length"] == 1
+    assert [record["seq"] for _, record in target.store.records_since(0)] == [1, 2, 3]
+    target.close()
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_import_dedups_by_content_digest(tmp_path, storage):
+    source = _open(tmp_path, "source", storage)
+    _add(source, WEATHER, (70, 80))
+    delta = source.export_delta()
+    source.close()
+
+    # 同一条记录在增量中出现两次，且本地序号不同
+    duplicate = dict(delta["records"][0], seq=99)
+    delta["records"].append(duplicate)
+    target = _open(tmp_path, "target", storage)
+    assert target.import_delta(delta) == 2
+
+    # 只差复制元数据（seq、链接摘要）的记录视为已存在
+    record = dict(delta["records"][1]["record"], seq=7, prev_digest="f" * 64, digest="e" * 64)
+    assert target.import_delta({"records": [dict(delta["records"][1], record=record)]}) == 0
+    target.close()
+
+
+@pytest.mark.parametrize("storage", BACKENDS)
+def test_watermark_advances(tmp_path, storage):
+    source = _open(tmp_path, "source", storage)
+    target = _open(tmp_path, "target", storage)
+    _add(source, WEATHER, (70,))
+    first = source.export_delta()
+    assert first["seq"] == 1
+    assert target.import_delta(first) == 1
+
+    calendar = _add(source, CALENDAR, (60, 65))
+    second = source.export_delta(first["seq"])
+    assert second["since"] == 1
+    assert second["seq"] == 3
+    assert [entry["skill_hash"] for entry in second["records"]] == [calendar, calendar]
+    assert target.import_delta(second) == 2
+
+    # 没有新记录时水位不变
+    third = source.export_delta(second["seq"])
+    assert third["records"] == []
+    assert third["seq"] == second["seq"]
+    assert target.verify_isnad_chain(calendar, full=True)["chain_length"] == 2
+    source.close()
+    target.close()
+
+
+def test_lazy_delta_parses_only_changed_chains(tmp_path):
+    source = _open(tmp_path, "source", "lazy")
+    _add(source, WEATHER, (70, 80))
+    calendar = _add(source, CALENDAR, (90,))
+    delta = source.export_delta()
+    source.close()
+
+    source = _open(tmp_path, "source", "lazy")
+    assert [entry["skill_hash"] for entry in source.export_delta(2)["records"]] == [calendar]
+    # 重复导入只查询记录摘要
+    assert source.import_delta(delta) == 0
+    assert source.store._loaded == {}
+    source.close()
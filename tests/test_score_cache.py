@@ -0,0 +1,66 @@
+"""信任评分缓存键和失效的测试"""
+
+import pytest
+
+from skill_trust_network.modules.trust_scoring import TrustScoring
+from skill_trust_network.modules.scoring_factors import ScoringFactor
+
+SKILL = {"name": "weather", "hash": "abc123", "author": "alice", "permissions": ["net"], "trust_chain": []}
+
+
+def _downloads(metadata):
+    return min(100, metadata.get("downloads", 0))
+
+
+def test_same_inputs_hit_and_changed_fields_miss():
+    scoring = TrustScoring(cache_size=16)
+    first = scoring.calculate_trust_score(dict(SKILL))
+    assert scoring.calculate_trust_score(dict(SKILL)) == first
+    assert scoring.get_score_cache_stats()["hits"] == 1
+
+    # 内容哈希相同，参与评分的字段不同
+    changed = scoring.calculate_trust_score(dict(SKILL, permissions=["net", "fs", "exec"]))
+    assert changed["permission_reasonableness"] == 60
+    assert changed != first
+    # 缺少字段与值为None的字段评分不同，不能共用缓存条目
+    missing = {key: value for key, value in SKILL.items() if key != "author"}
+    assert scoring.calculate_trust_score(missing)["author_reputation"] == 50
+    assert scoring.calculate_trust_score(dict(SKILL, author=None))["author_reputation"] == 70
+    assert scoring.get_score_cache_stats()["hits"] == 1
+
+
+def test_custom_factor_input_fields_join_the_key():
+    scoring = TrustScoring(cache_size=16)
+    scoring.register_factor(ScoringFactor("downloads", _downloads, 0.1, input_fields=("downloads",)))
+    low = scoring.calculate_trust_score(dict(SKILL, downloads=10))
+    high = scoring.calculate_trust_score(dict(SKILL, downloads=90))
+    assert (low["downloads"], high["downloads"]) == (10, 90)
+    assert scoring.get_score_cache_stats()["hits"] == 0
+
+
+def test_registry_and_weight_changes_invalidate_cached_scores():
+    scoring = TrustScoring(cache_size=16)
+    before = scoring.calculate_trust_score(dict(SKILL))
+
+    scoring.register_factor(ScoringFactor("downloads", _downloads, 0.1, input_fields=("downloads",)))
+    registered = scoring.calculate_trust_score(dict(SKILL, downloads=50))
+    assert registered["downloads"] == 50
+    assert registered["total_score"] == pytest.approx(before["total_score"] + 5)
+
+    scoring.unregister_factor("downloads")
+    assert scoring.calculate_trust_score(dict(SKILL)) == before
+
+    scoring.weights["author_reputation"] = 0.3
+    reweighted = scoring.calculate_trust_score(dict(SKILL))
+    assert reweighted["total_score"] == pytest.approx(before["total_score"] + 0.1 * before["author_reputation"])
+
+
+def test_cache_file_round_trip(tmp_path):
+    cache_file = str(tmp_path / "scores.json")
+    scoring = TrustScoring(cache_file=cache_file)
+    first = scoring.calculate_trust_score(dict(SKILL))
+    assert scoring.save_score_cache()
+
+    scoring = TrustScoring(cache_file=cache_file)
+    assert scoring.calculate_trust_score(dict(SKILL)) == first
+    assert scoring.get_score_cache_stats()["hits"] == 1
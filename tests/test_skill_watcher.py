@@ -0,0 +1,68 @@
+"""技能目录监视和增量重新审计的测试"""
+
+import json
+import shutil
+
+from skill_trust_network.integration.moltbot_integration import MoltbotIntegration
+from skill_trust_network.modules.skill_watcher import SkillWatcher
+
+
+def _skills(root, names):
+    for name in names:
+        path = root / name
+        path.mkdir(parents=True)
+        (path / "skill.json").write_text(json.dumps({"name": name, "author": "verified"}), encoding="utf-8")
+        (path / "main.py").write_text("x = 1\n", encoding="utf-8")
+    return str(root)
+
+
+def _polling_watcher(skill_dir):
+    return SkillWatcher([skill_dir], debounce=0.05, poll_interval=0.01, use_inotify=False)
+
+
+def _audited(integration, monkeypatch):
+    audited = []
+    audit_skill = integration.audit_skill
+
+    def record(skill_name):
+        audited.append(skill_name)
+        return audit_skill(skill_name)
+    monkeypatch.setattr(integration, "audit_skill", record)
+    return audited
+
+
+def test_polling_watcher_reaudits_only_the_changed_skill(tmp_path, monkeypatch):
+    skill_dir = _skills(tmp_path / "skills", ["alpha", "beta", "gamma"])
+    integration = MoltbotIntegration([skill_dir])
+    audited = _audited(integration, monkeypatch)
+    watcher = _polling_watcher(skill_dir)
+    assert watcher.backend == "polling"
+
+    (tmp_path / "skills" / "beta" / "main.py").write_text("x = 2\ny = 3\n", encoding="utf-8")
+    # 去抖期间的连续修改合并为一次重新审计
+    (tmp_path / "skills" / "beta" / "helper.py").write_text("z = 4\n", encoding="utf-8")
+    events = list(integration.iter_skill_changes(timeout=1, watcher=watcher))
+
+    assert len(events) == 1
+    event = events[0]
+    assert event["skill_name"] == "beta"
+    assert event["event"] == "updated"
+    assert event["report"]["skill_info"]["name"] == "beta"
+    assert audited == ["beta"]
+
+
+def test_polling_watcher_reports_removed_skill(tmp_path):
+    skill_dir = _skills(tmp_path / "skills", ["alpha", "beta"])
+    integration = MoltbotIntegration([skill_dir])
+    # 先审计一次，使元数据收集器的技能索引包含将被删除的技能
+    assert integration.audit_skill("alpha") is not None
+    watcher = _polling_watcher(skill_dir)
+
+    shutil.rmtree(str(tmp_path / "skills" / "alpha"))
+    events = integration.iter_skill_changes(timeout=5, watcher=watcher)
+    event = next(events)
+    events.close()
+
+    assert event["skill_name"] == "alpha"
+    assert event["event"] == "removed"
+    assert event["report"] is None
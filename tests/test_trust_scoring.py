@@ -0,0 +1,96 @@
+"""信任评分批量计算与逐个计算一致性的测试"""
+
+import random
+
+import pytest
+
+from skill_trust_network.modules.trust_scoring import TrustScoring
+from skill_trust_network.modules.scoring_factors import ScoringFactor
+from skill_trust_network.modules.usage_tracker import UsageTracker
+from skill_trust_network.modules.author_reputation import AuthorReputationGraph
+
+_MISSING = object()
+
+AUTHORS = [_MISSING, None, "", "unknown", "verified", "trusted", "alice", "bob"]
+LISTS = [_MISSING, None, [], ["a"], ["a", "b"], ["a", "b", "c"], list("abcdef")]
+HASHES = [_MISSING, None, "", "abc123"]
+NAMES = ["s0", "s1", "s2", "s3", None]
+
+
+def _fuzz_metadata(count, seed=0):
+    rng = random.Random(seed)
+    skills = []
+    for _ in range(count):
+        metadata = {}
+        for field, values in (("name", NAMES), ("author", AUTHORS), ("permissions", LISTS),
+                              ("trust_chain", LISTS), ("hash", HASHES), ("usage_history", LISTS)):
+            value = rng.choice(values)
+            if value is not _MISSING:
+                metadata[field] = list(value) if isinstance(value, list) else value
+        skills.append(metadata)
+    return skills
+
+
+def _usage_tracker():
+    tracker = UsageTracker()
+    events = [{"skill": "s0", "event": "invocation"}] * 40 + [{"skill": "s1", "event": "failure"}] * 10 + \
+        [{"skill": "s1", "event": "invocation"}] * 5
+    tracker.ingest_events(events)
+    return tracker
+
+
+def _author_graph():
+    graph = AuthorReputationGraph()
+    graph.add_records([
+        ("h1", {"auditor": "verified", "trust_score": 80, "result": {"skill_info": {"author": "alice"}}}),
+        ("h2", {"auditor": "nobody", "trust_score": 60, "result": {"skill_info": {"author": "carol"}}}),
+    ])
+    graph.update()
+    return graph
+
+
+@pytest.mark.parametrize("usage_tracker, author_graph", [
+    (None, None),
+    (_usage_tracker(), None),
+    (None, _author_graph()),
+    (_usage_tracker(), _author_graph()),
+])
+def test_batch_scores_match_scalar_path(usage_tracker, author_graph):
+    skills = _fuzz_metadata(2000)
+    batch = TrustScoring(usage_tracker=usage_tracker, author_graph=author_graph)
+    scalar = TrustScoring(usage_tracker=usage_tracker, author_graph=author_graph)
+
+    results = batch.calculate_batch_trust_scores(skills)
+    assert len(results) == len(skills)
+    for metadata, result in zip(skills, results):
+        scores = scalar.calculate_trust_score(metadata)
+        assert result["scores"] == scores
+        assert result["trust_level"] == scalar.get_trust_level(scores["total_score"])
+        assert result["skill_name"] == metadata.get("name")
+
+
+def test_batch_scores_with_custom_factor_match_scalar_path():
+    def permission_breadth(metadata):
+        return 100 - 10 * len(metadata.get("permissions") or [])
+
+    skills = _fuzz_metadata(500, seed=1)
+    scoring = TrustScoring()
+    scoring.register_factor(ScoringFactor("permission_breadth", permission_breadth, 0.1,
+                                          input_fields=("permissions",)))
+
+    results = scoring.calculate_batch_trust_scores(skills)
+    for metadata, result in zip(skills, results):
+        assert "permission_breadth" in result["scores"]
+        assert result["scores"] == scoring.calculate_trust_score(metadata)
+
+
+def test_batch_scores_with_reweighted_factors_match_scalar_path():
+    skills = _fuzz_metadata(500, seed=2)
+    scoring = TrustScoring()
+    # 不能被二进制精确表示的权重，检查累加顺序与标量路径一致
+    scoring.weights.update({"author_reputation": 0.13, "community_audit": 0.31, "usage_history": 0.07,
+                            "permission_reasonableness": 0.29, "code_quality": 0.2})
+
+    results = scoring.calculate_batch_trust_scores(skills)
+    for metadata, result in zip(skills, results):
+        assert result["scores"] == scoring.calculate_trust_score(metadata)
@@ -0,0 +1,49 @@
+"""技能使用统计的测试"""
+
+import os
+import json
+
+import pytest
+
+from skill_trust_network.modules.usage_tracker import UsageTracker
+
+
+def _write(path, events, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        f.writelines(json.dumps(event) + "\n" for event in events)
+
+
+def test_events_without_ts_match_on_fast_path_and_fallback():
+    fast = UsageTracker()
+    assert fast.ingest_events([{"skill": "a", "event": "invocation"}]) == 1
+
+    # 一个格式错误的事件使整批走逐个解析的路径
+    fallback = UsageTracker()
+    assert fallback.ingest_events([{"skill": "a", "event": "invocation"}, "bad"]) == 1
+
+    # 两批事件各自以消费时的当前时间为时间
+    assert fast.get_counters("a") == pytest.approx(fallback.get_counters("a"))
+    assert fast.get_counters("a")[0] == pytest.approx(1.0)
+    assert fast.skipped == 0
+    assert fallback.skipped == 1
+
+
+def test_rotated_log_is_read_from_start(tmp_path):
+    log_file = str(tmp_path / "usage.jsonl")
+    state_file = str(tmp_path / "usage.npz")
+    _write(log_file, [{"skill": "a", "event": "invocation", "ts": 1000}] * 3)
+    tracker = UsageTracker(state_file=state_file)
+    assert tracker.ingest_file(log_file) == 3
+    assert tracker.save()
+
+    # 轮转：旧文件改名，新文件与旧文件同样大小，只按偏移无法察觉
+    os.rename(log_file, log_file + ".1")
+    _write(log_file, [{"skill": "b", "event": "invocation", "ts": 2000}] * 3)
+    assert os.path.getsize(log_file) == os.path.getsize(log_file + ".1")
+    tracker = UsageTracker(state_file=state_file)
+    assert tracker.ingest_file(log_file) == 3
+    assert tracker.get_counters("b", now=2000) == (3.0, 0.0)
+
+    # 同一个文件继续追加时只读取新增的行
+    _write(log_file, [{"skill": "b", "event": "invocation", "ts": 2000}], mode="a")
+    assert tracker.ingest_file(log_file) == 1